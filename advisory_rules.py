@@ -0,0 +1,195 @@
+from look_through import LOOK_THROUGH_ACCOUNT
+from metal_holdings import HOLDINGS_ACCOUNTS
+from zakat_methods import EQUITY_KEYWORDS
+
+INFO = "info"
+REVIEW = "review"  # Needs expert judgement; the entity is passed on to the LLM advisor
+
+# One template per finding; placeholders are filled from the calculation results and the
+# figures computed by RuleBasedAdvisor.findings
+FINDING_TEMPLATES = {
+    "zakat_due": {
+        "severity": INFO,
+        "title": "Zakat due",
+        "advice": "Zakat of ${zakat_amount:,.2f} is due at {rate_pct:.4g}% of a zakat base of ${zakat_base:,.2f}, "
+                  "which exceeds the nisab of ${nisab_value:,.2f} (rule pack {rule_pack}).",
+        "suggestion": "Pay the zakat to eligible recipients and keep the classified balance sheet and the "
+                      "payment date on file for the next hawl."
+    },
+    "below_nisab": {
+        "severity": INFO,
+        "title": "Below nisab",
+        "advice": "The zakat base of ${zakat_base:,.2f} is below the nisab of ${nisab_value:,.2f}, so no zakat "
+                  "is due for this period.",
+        "suggestion": "Keep the calculation on file; zakat becomes due once the base is at or above the nisab "
+                      "at the end of a hawl."
+    },
+    "near_nisab": {
+        "severity": REVIEW,
+        "title": "Zakat base close to nisab",
+        "advice": "The zakat base is {nisab_distance_pct:+.1f}% from the nisab, so valuation differences or the "
+                  "gold and silver prices used can change whether zakat is due.",
+        "suggestion": "Confirm the valuation of receivables and inventory and the metal prices on the "
+                      "calculation date before concluding."
+    },
+    "liabilities_exceed_assets": {
+        "severity": REVIEW,
+        "title": "Liabilities exceed zakatable assets",
+        "advice": "Deductible liabilities of ${total_deductible_liabilities:,.2f} exceed zakatable assets of "
+                  "${total_zakatable_assets:,.2f}; only obligations falling due within the year are deductible "
+                  "under AAOIFI FAS 9.",
+        "suggestion": "Review the maturity of the deducted liabilities and move long-term portions out of the "
+                      "deduction."
+    },
+    "unclassified_accounts": {
+        "severity": REVIEW,
+        "title": "Unclassified accounts",
+        "advice": "{unclassified_count} account(s) totalling ${unclassified_amount:,.2f} matched no classification "
+                  "rule and were left out of the zakat base: {unclassified_accounts}.",
+        "suggestion": "Classify these accounts explicitly, or add keywords for them to the rule pack."
+    },
+    "unclassified_minor": {
+        "severity": INFO,
+        "title": "Unclassified accounts (immaterial)",
+        "advice": "{unclassified_count} small account(s) totalling ${unclassified_amount:,.2f} matched no "
+                  "classification rule and were left out of the zakat base: {unclassified_accounts}.",
+        "suggestion": "Classify these accounts when the rule pack is next updated."
+    },
+    "receivables_concentration": {
+        "severity": REVIEW,
+        "title": "High share of receivables",
+        "advice": "Receivables make up {receivables_pct:.0f}% of zakatable assets; doubtful receivables may be "
+                  "excluded, so their collectability should be assessed.",
+        "suggestion": "Collect receivables before the calculation date where possible and exclude only debts "
+                      "that are specifically provided for as doubtful."
+    },
+    "investments_at_face_value": {
+        "severity": INFO,
+        "title": "Investments at full value",
+        "advice": "Investments of ${investment_amount:,.2f} are included at full value; for shares held for "
+                  "investment only the investee's zakatable assets are due.",
+        "suggestion": "Value equity held for investment by looking through to issuer fundamentals to avoid "
+                      "overstating the base."
+    },
+    "metal_holdings": {
+        "severity": INFO,
+        "title": "Gold and silver holdings",
+        "advice": "Gold and silver valued by weight and purity contribute ${metal_amount:,.2f} to zakatable assets.",
+        "suggestion": "Update the metal prices to the calculation date before paying."
+    }
+}
+
+
+class RuleBasedAdvisor:
+    """
+    Deterministic advisory checks on a finished calculation.
+
+    Each check produces a finding rendered from FINDING_TEMPLATES. Routine entities get their advice
+    straight from the templates; an entity with any REVIEW finding is flagged, and only then is the
+    (LLM) ZakatComplianceAdvisor asked, with the findings included in its prompt.
+    """
+    def __init__(self, near_nisab_margin=0.1, receivables_share=0.5, unclassified_materiality=0.01,
+                 templates=None):
+        self.near_nisab_margin = near_nisab_margin
+        self.receivables_share = receivables_share
+        # Unclassified accounts below this share of the balance sheet are reported but not flagged
+        self.unclassified_materiality = unclassified_materiality
+        self.templates = templates or FINDING_TEMPLATES
+
+    def _finding(self, code, values):
+        template = self.templates[code]
+        return {
+            "code": code,
+            "severity": template["severity"],
+            "title": template["title"],
+            "message": template["advice"].format(**values),
+            "suggestion": template["suggestion"].format(**values)
+        }
+
+    def findings(self, financial_data, calculation_results):
+        """
+        Findings for one entity, most important first
+        """
+        classified = calculation_results["classified_accounts"]
+        zakatable = classified["zakatable_assets"]
+        nisab_value = calculation_results["nisab_value"]
+        values = dict(calculation_results, rate_pct=calculation_results["zakat_rate"] * 100,
+                      rule_pack=calculation_results.get("rule_pack", "FAS_9@1"))
+        codes = []
+
+        if calculation_results["total_deductible_liabilities"] > calculation_results["total_zakatable_assets"]:
+            codes.append("liabilities_exceed_assets")
+
+        unclassified = {}
+        balance_sheet = financial_data["balance_sheet"]
+        if len(balance_sheet) > sum(len(accounts) for accounts in classified.values()):
+            for account, amount in balance_sheet.items():
+                if any(account in accounts for accounts in classified.values()):
+                    continue
+                account_lower = account.lower()
+                if not any(keyword in account_lower for keyword in EQUITY_KEYWORDS):
+                    unclassified[account] = amount
+        if unclassified:
+            unclassified_amount = sum(unclassified.values())
+            balance_sheet_total = sum(abs(amount) for amount in balance_sheet.values())
+            material = abs(unclassified_amount) > self.unclassified_materiality * balance_sheet_total
+            codes.append("unclassified_accounts" if material else "unclassified_minor")
+            values.update(unclassified_count=len(unclassified), unclassified_amount=unclassified_amount,
+                          unclassified_accounts=", ".join(unclassified))
+
+        if nisab_value and abs(calculation_results["zakat_base"] - nisab_value) <= self.near_nisab_margin * nisab_value:
+            codes.append("near_nisab")
+            values["nisab_distance_pct"] = (calculation_results["zakat_base"] / nisab_value - 1) * 100
+
+        total_zakatable = calculation_results["total_zakatable_assets"]
+        receivables = sum(amount for account, amount in zakatable.items() if "receivable" in account.lower())
+        if total_zakatable > 0 and receivables / total_zakatable >= self.receivables_share:
+            codes.append("receivables_concentration")
+            values["receivables_pct"] = receivables / total_zakatable * 100
+
+        codes.append("zakat_due" if calculation_results["exceeds_nisab"] else "below_nisab")
+
+        investments = sum(amount for account, amount in zakatable.items()
+                          if "investment" in account.lower() and account != LOOK_THROUGH_ACCOUNT)
+        if investments:
+            codes.append("investments_at_face_value")
+            values["investment_amount"] = investments
+
+        metal_amount = sum(zakatable.get(account, 0) for account in HOLDINGS_ACCOUNTS.values())
+        if metal_amount:
+            codes.append("metal_holdings")
+            values["metal_amount"] = metal_amount
+
+        return [self._finding(code, values) for code in codes]
+
+    @staticmethod
+    def needs_review(findings):
+        return any(finding["severity"] == REVIEW for finding in findings)
+
+    @staticmethod
+    def compliance_text(findings):
+        return "\n".join(f"- **{finding['title']}:** {finding['message']}" for finding in findings)
+
+    @staticmethod
+    def optimization_text(findings):
+        return "\n".join(f"- **{finding['title']}:** {finding['suggestion']}" for finding in findings)
+
+    def advise(self, financial_data, calculation_results, llm_advisor=None, force_llm=False):
+        """
+        {"compliance", "optimization", "findings", "needs_review", "source"}. The LLM advisor is
+        only called for flagged entities (or when force_llm is set); otherwise, or without an
+        advisor, the advice comes from the templates.
+        """
+        findings = self.findings(financial_data, calculation_results)
+        needs_review = self.needs_review(findings)
+        advice = {"findings": findings, "needs_review": needs_review}
+        if llm_advisor is not None and (needs_review or force_llm):
+            advice["compliance"] = llm_advisor.get_compliance_advice(financial_data, calculation_results, findings)
+            advice["optimization"] = llm_advisor.get_optimization_suggestions(financial_data, calculation_results,
+                                                                              findings)
+            advice["source"] = "llm"
+        else:
+            advice["compliance"] = self.compliance_text(findings)
+            advice["optimization"] = self.optimization_text(findings)
+            advice["source"] = "rules"
+        return advice
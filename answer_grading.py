@@ -0,0 +1,242 @@
+import csv
+import io
+import math
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from content_search import tokenize
+
+# Journal-entry vocabulary expected in an accounting answer
+JOURNAL_KEYWORDS = {
+    "en": {"debit": ("debit", "dr"), "credit": ("credit", "cr"), "journal": ("journal", "entry", "entries")},
+    "ar": {"debit": ("مدين", "المدين"), "credit": ("دائن", "الدائن"), "journal": ("قيد", "قيود", "اليومية")}
+}
+
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩٫٬", "0123456789.,")
+AMOUNT_PATTERN = re.compile(r"(?<![\w.])(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d+))?\s*(%|k\b|m\b|million|مليون)?", re.IGNORECASE)
+
+FEEDBACK_TEMPLATES = {
+    "empty": {
+        "en": "No answer was submitted. Describe how the transaction should be recognised and give the journal entries.\n\nScore: 0/10",
+        "ar": "لم يتم تقديم أي إجابة. صف كيفية الاعتراف بالمعاملة وقدم قيود اليومية.\n\nالتقييم: 0/10"
+    },
+    "too_short": {
+        "en": "The answer is too short to assess. Explain the accounting treatment step by step and include the journal entries with amounts.\n\nScore: {score}/10",
+        "ar": "الإجابة قصيرة جدًا بحيث لا يمكن تقييمها. اشرح المعالجة المحاسبية خطوة بخطوة وأدرج قيود اليومية مع المبالغ.\n\nالتقييم: {score}/10"
+    },
+    "off_target": {
+        "en": "The answer does not include the key amounts or journal entries of the expected solution. Review the scenario figures and record the debit and credit entries.\n\nScore: {score}/10",
+        "ar": "لا تتضمن الإجابة المبالغ الرئيسية أو قيود اليومية في الحل المتوقع. راجع أرقام السيناريو وسجل القيود المدينة والدائنة.\n\nالتقييم: {score}/10"
+    },
+    "matches_expert": {
+        "en": "Your answer matches the expert solution, including the journal entries and amounts.\n\nScore: 10/10",
+        "ar": "إجابتك تطابق حل الخبير بما في ذلك قيود اليومية والمبالغ.\n\nالتقييم: 10/10"
+    }
+}
+
+
+def extract_amounts(text):
+    """
+    Numeric amounts mentioned in text (Western or Arabic-Indic digits, thousands separators,
+    k/m/million suffixes and percentages)
+    """
+    amounts = set()
+    for whole, fraction, suffix in AMOUNT_PATTERN.findall(text.translate(ARABIC_DIGITS)):
+        value = float(whole.replace(",", "") + ("." + fraction if fraction else ""))
+        suffix = suffix.lower()
+        if suffix == "k":
+            value *= 1000
+        elif suffix in ("m", "million", "مليون"):
+            value *= 1000000
+        amounts.add(round(value, 2))
+    return amounts
+
+
+def cosine_similarity(a_tokens, b_tokens):
+    a, b = Counter(a_tokens), Counter(b_tokens)
+    dot = sum(count * b[token] for token, count in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class PreScore:
+    def __init__(self, score, verdict, amount_recall, keyword_coverage, similarity, feedback=None):
+        self.score = score
+        self.verdict = verdict
+        self.amount_recall = amount_recall
+        self.keyword_coverage = keyword_coverage
+        self.similarity = similarity
+        self.feedback = feedback
+
+    @property
+    def short_circuit(self):
+        """
+        Whether the answer can be graded locally without calling the LLM
+        """
+        return self.feedback is not None
+
+
+class AnswerPreScorer:
+    """
+    Scores a tutorial answer locally against the stored expert solution.
+
+    Combines recall of the expert's amounts, coverage of journal-entry vocabulary and token
+    cosine similarity. Empty, trivially short, clearly off-target and verbatim-expert answers
+    get templated feedback; everything else is left for the LLM.
+    """
+    def __init__(self, min_words=5, off_target_below=2.0, weights=(0.4, 0.3, 0.3)):
+        self.min_words = min_words
+        self.off_target_below = off_target_below
+        self.weights = weights
+
+    def score(self, user_solution, expert_solution, language="English"):
+        lang = "en" if language in ("English", "en") else "ar"
+        user_solution = (user_solution or "").strip()
+        if not user_solution:
+            return PreScore(0, "empty", 0.0, 0.0, 0.0, FEEDBACK_TEMPLATES["empty"][lang])
+
+        user_tokens = tokenize(user_solution)
+        expert_tokens = tokenize(expert_solution or "")
+
+        expert_amounts = extract_amounts(expert_solution or "")
+        amount_recall = (len(expert_amounts & extract_amounts(user_solution)) / len(expert_amounts)
+                         if expert_amounts else 1.0)
+
+        user_vocab = set(user_tokens)
+        expert_vocab = set(expert_tokens)
+        expected = [group for group in JOURNAL_KEYWORDS[lang].values()
+                    if expert_vocab.intersection(tokenize(" ".join(group)))]
+        keyword_coverage = (sum(1 for group in expected if user_vocab.intersection(tokenize(" ".join(group)))) / len(expected)
+                            if expected else 1.0)
+
+        similarity = cosine_similarity(user_tokens, expert_tokens)
+        w_amount, w_keyword, w_similarity = self.weights
+        score = round(10 * (w_amount * amount_recall + w_keyword * keyword_coverage + w_similarity * similarity), 1)
+
+        if user_tokens == expert_tokens and expert_tokens:
+            return PreScore(10, "matches_expert", amount_recall, keyword_coverage, similarity,
+                            FEEDBACK_TEMPLATES["matches_expert"][lang])
+        if len(user_solution.split()) < self.min_words:
+            score = min(score, 1.0)
+            return PreScore(score, "too_short", amount_recall, keyword_coverage, similarity,
+                            FEEDBACK_TEMPLATES["too_short"][lang].format(score=score))
+        if score < self.off_target_below:
+            return PreScore(score, "off_target", amount_recall, keyword_coverage, similarity,
+                            FEEDBACK_TEMPLATES["off_target"][lang].format(score=score))
+        return PreScore(score, "needs_review", amount_recall, keyword_coverage, similarity)
+
+
+OUTPUT_FIELDS = ["submission_id", "standard", "language", "pre_score", "verdict", "graded_by", "feedback"]
+REQUIRED_COLUMNS = ("submission_id", "standard", "answer")
+
+
+class BulkGrader:
+    """
+    Grades a CSV of submissions (submission_id, standard, answer[, language]) concurrently.
+
+    Results are appended to output_path as each submission finishes, and submissions already
+    present there are skipped, so an interrupted run can simply be started again.
+    """
+    def __init__(self, explainer, standards, examples, output_path, concurrency=8):
+        self.explainer = explainer
+        self.standards = standards
+        self.examples = examples
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def completed_ids(self):
+        if not os.path.exists(self.output_path):
+            return set()
+        with open(self.output_path, newline="", encoding="utf-8") as f:
+            return {row["submission_id"] for row in csv.DictReader(f)}
+
+    def grade_csv(self, source, progress=None):
+        """
+        Grade submissions from a path or text stream; progress(done, total) is called from
+        the calling thread. Returns the number of submissions graded in this run; submissions
+        that failed are listed in self.failures and picked up again by the next run.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, newline="", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                rows = list(reader)
+                fieldnames = reader.fieldnames
+        else:
+            if isinstance(source, (bytes, bytearray)):
+                source = io.StringIO(source.decode("utf-8-sig"))
+            reader = csv.DictReader(source)
+            rows = list(reader)
+            fieldnames = reader.fieldnames
+        missing = [column for column in REQUIRED_COLUMNS if column not in (fieldnames or ())]
+        if missing:
+            raise ValueError(f"Submissions CSV is missing required column(s): {', '.join(missing)}")
+
+        done_ids = self.completed_ids()
+        pending = [row for row in rows if str(row["submission_id"]) not in done_ids]
+        total = len(pending)
+        if progress:
+            progress(0, total)
+        if not pending:
+            return 0
+
+        write_header = not os.path.exists(self.output_path)
+        with open(self.output_path, "a", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=OUTPUT_FIELDS)
+            if write_header:
+                writer.writeheader()
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                futures = [pool.submit(self.grade_row, row) for row in pending]
+                graded = 0
+                for done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        result = future.result()
+                    except RuntimeError as e:
+                        self.failures.append(str(e))
+                    else:
+                        with self._lock:
+                            writer.writerow(result)
+                            out.flush()
+                        graded += 1
+                    if progress:
+                        progress(done, total)
+        return graded
+
+    def grade_row(self, row):
+        try:
+            return self._grade_row(row)
+        except Exception as e:
+            # Not recorded as done, so a rerun grades it again
+            raise RuntimeError(f"Grading failed for submission {row.get('submission_id')}: {e}") from e
+
+    def _grade_row(self, row):
+        standard = (row.get("standard") or "").strip()
+        language = "Arabic" if (row.get("language") or "").strip().lower() in ("ar", "arabic") else "English"
+        lang_code = "en" if language == "English" else "ar"
+        result = {"submission_id": row["submission_id"], "standard": standard, "language": lang_code}
+
+        if standard not in self.examples:
+            result.update(pre_score="", verdict="unknown_standard", graded_by="local",
+                          feedback=f"Unknown standard: {standard}")
+            return result
+
+        scenario = self.examples[standard][f"scenario_{lang_code}"]
+        answer = row.get("answer") or ""
+        # Expert solutions are cached per standard and language, so this is one LLM call per standard at most
+        expert_solution = self.explainer.get_explanation(
+            standard=standard,
+            standard_title=self.standards[standard][f"title_{lang_code}"],
+            scenario=scenario,
+            language=language,
+            scenario_key="example"
+        )
+        pre = self.explainer.pre_scorer.score(answer, expert_solution, language)
+        feedback = self.explainer.get_feedback(scenario, answer, expert_solution, language, pre_score=pre)
+
+        result.update(pre_score=pre.score, verdict=pre.verdict,
+                      graded_by="local" if pre.short_circuit else "llm", feedback=feedback)
+        return result
@@ -0,0 +1,186 @@
+import asyncio
+import re
+from datetime import datetime
+
+from langchain.schema import HumanMessage, SystemMessage
+
+from advisory_rules import RuleBasedAdvisor, REVIEW
+from jsonl_journal import append_jsonl_record, read_jsonl_journal
+from llm_scheduler import estimate_tokens, BATCH
+from zakat_calculator import ZakatCalculator, ZakatComplianceAdvisor
+
+ENTITY_MARKER = "### ENTITY"
+ENTITY_SECTION = re.compile(r"^### ENTITY (.+?)\s*$", re.MULTILINE)
+
+
+class AdvisoryResultStore:
+    """
+    Append-only JSON Lines store of completed advisory results.
+
+    Each finished entity is written as one line and flushed to disk straight away, so a
+    job that crashes can be restarted and will skip every entity already on file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._results = {record["entity_id"]: record for record in read_jsonl_journal(path)}
+
+    def __contains__(self, entity_id):
+        return entity_id in self._results
+
+    def __len__(self):
+        return len(self._results)
+
+    def append(self, record):
+        append_jsonl_record(self.path, record)
+        self._results[record["entity_id"]] = record
+
+    def results(self):
+        return dict(self._results)
+
+
+def format_entity_summary(entity_id, calculation_results, findings=()):
+    """
+    Short financial summary of one entity for a (possibly packed) advisory prompt, with the
+    findings the rule-based checks flagged for review
+    """
+    flagged = "".join(f"- Flagged: {finding['title']}: {finding['message']}\n"
+                      for finding in findings if finding["severity"] == REVIEW)
+    return (
+        f"{ENTITY_MARKER} {entity_id}\n"
+        f"- Total zakatable assets: ${calculation_results['total_zakatable_assets']:,.2f}\n"
+        f"- Total deductible liabilities: ${calculation_results['total_deductible_liabilities']:,.2f}\n"
+        f"- Zakat base: ${calculation_results['zakat_base']:,.2f}\n"
+        f"- Nisab threshold: ${calculation_results['nisab_value']:,.2f}\n"
+        f"- Zakat amount due: ${calculation_results['zakat_amount']:,.2f}\n"
+        + flagged
+    )
+
+
+def build_packed_prompt(summaries):
+    """
+    Ask for compliance advice on several entities in one request, answered section by section
+    """
+    return (
+        "As an Islamic Finance expert, analyze the following Zakat calculation results and provide "
+        "concise compliance advice for EACH entity according to AAOIFI FAS 9 standards.\n\n"
+        + "\n".join(summaries) +
+        "\nFor every entity cover: compliance assessment, classification concerns, recommendations "
+        "and relevant Shariah considerations.\n"
+        f"Start each entity's answer with a line '{ENTITY_MARKER} <entity id>' exactly as given above "
+        "and do not add any other such lines."
+    )
+
+
+def parse_packed_response(text):
+    """
+    Split a packed response back into per-entity advice
+    """
+    sections = {}
+    matches = list(ENTITY_SECTION.finditer(text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections[match.group(1).strip()] = text[match.end():end].strip()
+    return sections
+
+
+class BatchAdvisoryJob:
+    """
+    Generates compliance advice for a whole portfolio of entities.
+
+    Routine entities are answered by the rule-based checks without an LLM call. Entities the
+    checks flag for review are packed several to a request (up to max_prompt_tokens), packs are
+    sent with bounded async concurrency at batch priority, and each finished entity is persisted
+    to an AdvisoryResultStore so that a rerun only processes what is still missing.
+    """
+    def __init__(self, store, advisor=None, calculator=None, concurrency=4, pack_size=5,
+                 max_prompt_tokens=3000, max_attempts=3, rules=None):
+        self.store = store
+        self.advisor = advisor or ZakatComplianceAdvisor(priority=BATCH)
+        self.calculator = calculator or ZakatCalculator()
+        self.rules = rules or RuleBasedAdvisor()
+        self.concurrency = concurrency
+        self.pack_size = pack_size
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_attempts = max_attempts
+        self.failures = {}
+
+    def run(self, entities):
+        """
+        Process {entity_id: financial_data}; returns all stored results
+        """
+        return asyncio.run(self.arun(entities))
+
+    async def arun(self, entities):
+        pending = {}
+        for entity_id, financial_data in entities.items():
+            entity_id = str(entity_id)
+            if entity_id in self.store:
+                continue
+            calculation_results = self.calculator.calculate_zakat_amount(financial_data)
+            findings = self.rules.findings(financial_data, calculation_results)
+            if self.rules.needs_review(findings):
+                pending[entity_id] = (calculation_results, findings)
+            else:
+                self._append(entity_id, calculation_results, self.rules.compliance_text(findings), "rules")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._process_pack(pack, semaphore) for pack in self._packs(pending)))
+        return self.store.results()
+
+    def _packs(self, pending):
+        """
+        Greedily group entity summaries while the packed prompt stays within budget
+        """
+        pack, pack_tokens = [], 0
+        for entity_id, (calculation_results, findings) in pending.items():
+            summary = format_entity_summary(entity_id, calculation_results, findings)
+            tokens = estimate_tokens(summary, completion_tokens=0)
+            if pack and (len(pack) >= self.pack_size or pack_tokens + tokens > self.max_prompt_tokens):
+                yield pack
+                pack, pack_tokens = [], 0
+            pack.append((entity_id, calculation_results, summary))
+            pack_tokens += tokens
+        if pack:
+            yield pack
+
+    async def _process_pack(self, pack, semaphore):
+        remaining = {entity_id: (calculation_results, summary) for entity_id, calculation_results, summary in pack}
+        for attempt in range(self.max_attempts):
+            if not remaining:
+                return
+            summaries = [summary for _, summary in remaining.values()]
+            messages = [
+                SystemMessage(content="You are an Islamic Finance expert specializing in Zakat compliance according to AAOIFI standards."),
+                HumanMessage(content=build_packed_prompt(summaries))
+            ]
+            try:
+                async with semaphore:
+                    response = await asyncio.to_thread(self.advisor.ask, messages)
+            except Exception as e:
+                for entity_id in remaining:
+                    self.failures[entity_id] = str(e)
+                continue
+
+            if len(remaining) == 1:
+                sections = parse_packed_response(response.content) or {next(iter(remaining)): response.content}
+            else:
+                sections = parse_packed_response(response.content)
+
+            # Anything the model left out of its answer is retried on the next attempt
+            for entity_id in list(remaining):
+                advice = sections.get(entity_id)
+                if not advice:
+                    self.failures[entity_id] = "missing from packed response"
+                    continue
+                calculation_results = remaining.pop(entity_id)[0]
+                self.failures.pop(entity_id, None)
+                self._append(entity_id, calculation_results, advice, "llm")
+
+    def _append(self, entity_id, calculation_results, advice, source):
+        self.store.append({
+            "entity_id": entity_id,
+            "zakat_amount": calculation_results["zakat_amount"],
+            "advice": advice,
+            "source": source,
+            "completed_at": datetime.now().isoformat(timespec="seconds")
+        })
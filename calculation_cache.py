@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from zakat_core import METAL_PRICES
+
+GENESIS_HASH = "0" * 64
+
+
+def _canonical(value):
+    """
+    Normalise data so that logically equal inputs serialise identically
+    (120000 and 120000.0 hash the same; dict key order does not matter)
+    """
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return repr(float(value))
+    # NumPy scalars and anything else numeric-like
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def canonical_json(value):
+    return json.dumps(_canonical(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def calculation_key(financial_data, standard, prices=None):
+    """
+    Content address of a calculation: hash of financial data, standard config and price snapshot
+    """
+    payload = {
+        "financial_data": financial_data,
+        "standard": standard,
+        "prices": prices if prices is not None else METAL_PRICES
+    }
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+
+class CalculationStore:
+    """
+    Content-addressed store of calculation results and generated documents.
+
+    Objects live on disk under their hash; a SQLite index tracks sizes and last access for
+    size-based LRU eviction. Every stored result is also appended to a hash-chained audit log,
+    so any later edit to a stored result or to the log itself is detected by verify().
+    """
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT NOT NULL, kind TEXT NOT NULL, blob TEXT NOT NULL, size INTEGER NOT NULL,
+                PRIMARY KEY (key, kind)
+            );
+            CREATE TABLE IF NOT EXISTS audit (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, content_hash TEXT NOT NULL,
+                recorded_at TEXT NOT NULL, prev_hash TEXT NOT NULL, chain_hash TEXT NOT NULL
+            );
+        """)
+        self._keys = {row[0] for row in self._db.execute("SELECT key FROM entries")}
+
+    def _object_path(self, digest, suffix):
+        directory = os.path.join(self.root, "objects", digest[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, digest + suffix)
+
+    def __contains__(self, key):
+        """
+        Fast existence check against the in-memory key set (falls back to the index for
+        entries written by other processes)
+        """
+        if key in self._keys:
+            return True
+        with self._lock:
+            found = self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+        if found:
+            self._keys.add(key)
+        return found
+
+    def get(self, key):
+        if key not in self:
+            return None
+        try:
+            with open(self._object_path(key, ".json"), encoding="utf-8") as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (datetime.now().timestamp(), key))
+            self._db.commit()
+        return result
+
+    def put(self, key, result):
+        """
+        Store a calculation result under its input key and record it in the audit trail
+        """
+        # Stored as plain JSON; canonicalisation only applies to the input key
+        data = json.dumps(result, sort_keys=True, ensure_ascii=False, default=float).encode("utf-8")
+        with open(self._object_path(key, ".json"), "wb") as f:
+            f.write(data)
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, size, last_access) VALUES (?, ?, ?)",
+                (key, len(data), datetime.now().timestamp())
+            )
+            self._append_audit(key, content_hash)
+            self._db.commit()
+        self._keys.add(key)
+        self._evict()
+
+    def put_document(self, key, kind, data):
+        """
+        Attach a generated document (e.g. the certificate PDF bytes) to a stored calculation
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, ".bin")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (key, kind, blob, size) VALUES (?, ?, ?, ?)",
+                (key, kind, digest, len(data))
+            )
+            self._db.commit()
+        self._evict()
+        return digest
+
+    def get_document(self, key, kind):
+        with self._lock:
+            row = self._db.execute("SELECT blob FROM documents WHERE key = ? AND kind = ?", (key, kind)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._object_path(row[0], ".bin"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _append_audit(self, key, content_hash):
+        row = self._db.execute("SELECT chain_hash FROM audit ORDER BY seq DESC LIMIT 1").fetchone()
+        prev_hash = row[0] if row else GENESIS_HASH
+        recorded_at = datetime.now().isoformat(timespec="seconds")
+        chain_hash = hashlib.sha256(f"{prev_hash}|{key}|{content_hash}|{recorded_at}".encode("utf-8")).hexdigest()
+        self._db.execute(
+            "INSERT INTO audit (key, content_hash, recorded_at, prev_hash, chain_hash) VALUES (?, ?, ?, ?, ?)",
+            (key, content_hash, recorded_at, prev_hash, chain_hash)
+        )
+
+    def total_bytes(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            documents = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+        return entries + documents
+
+    def _evict(self):
+        """
+        Drop least recently used calculations (and their documents) until under max_bytes
+        """
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT e.key, e.size + COALESCE((SELECT SUM(d.size) FROM documents d WHERE d.key = e.key), 0)
+                FROM entries e ORDER BY e.last_access
+            """).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                blobs = [row[0] for row in self._db.execute("SELECT blob FROM documents WHERE key = ?", (key,))]
+                self._db.execute("DELETE FROM documents WHERE key = ?", (key,))
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._keys.discard(key)
+                self._remove(self._object_path(key, ".json"))
+                for blob in blobs:
+                    # Blobs are shared between identical documents; keep them while still referenced
+                    if self._db.execute("SELECT 1 FROM documents WHERE blob = ?", (blob,)).fetchone() is None:
+                        self._remove(self._object_path(blob, ".bin"))
+                total -= size
+            self._db.commit()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def verify(self):
+        """
+        Check the audit hash chain and that every stored result still matches its audited hash.
+        Returns a list of problems (empty when the store is intact).
+        """
+        problems = []
+        prev_hash = GENESIS_HASH
+        latest = {}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, key, content_hash, recorded_at, prev_hash, chain_hash FROM audit ORDER BY seq"
+            ).fetchall()
+        for seq, key, content_hash, recorded_at, stored_prev, chain_hash in rows:
+            expected = hashlib.sha256(f"{prev_hash}|{key}|{content_hash}|{recorded_at}".encode("utf-8")).hexdigest()
+            if stored_prev != prev_hash or chain_hash != expected:
+                problems.append(f"audit chain broken at entry {seq}")
+            prev_hash = chain_hash
+            latest[key] = content_hash
+
+        for key in list(self._keys):
+            try:
+                with open(self._object_path(key, ".json"), "rb") as f:
+                    actual = hashlib.sha256(f.read()).hexdigest()
+            except FileNotFoundError:
+                problems.append(f"result {key} missing from store")
+                continue
+            if latest.get(key) != actual:
+                problems.append(f"result {key} does not match audit trail")
+        return problems
+
+
+class CachedZakatCalculator:
+    """
+    Wraps ZakatCalculator so identical inputs return the stored result instantly,
+    including the original calculation_date. The key uses the calculator's own price
+    snapshot, so a calculator built with different metal prices never reads stale results.
+    """
+    def __init__(self, calculator, store):
+        self.calculator = calculator
+        self.store = store
+
+    def key_for(self, financial_data):
+        return calculation_key(financial_data, self.calculator.standard, self.calculator.metal_prices)
+
+    def calculate_zakat_amount(self, financial_data):
+        key = self.key_for(financial_data)
+        cached = self.store.get(key)
+        if cached is not None:
+            return cached
+        result = self.calculator.calculate_zakat_amount(financial_data)
+        self.store.put(key, result)
+        return result
+
+    def certificate(self, entity_info, financial_data, doc_generator, filename):
+        """
+        Write the certificate PDF for one entity to filename, reusing the stored document when
+        the calculation inputs and entity details are unchanged
+        """
+        key = self.key_for(financial_data)
+        kind = "certificate:" + hashlib.sha256(canonical_json(entity_info).encode("utf-8")).hexdigest()
+        data = self.store.get_document(key, kind)
+        if data is None:
+            calculation_results = self.calculate_zakat_amount(financial_data)
+            filename = doc_generator.generate_zakat_certificate(entity_info, calculation_results, filename)
+            with open(filename, "rb") as f:
+                self.store.put_document(key, kind, f.read())
+        else:
+            with open(filename, "wb") as f:
+                f.write(data)
+        return filename
+
+    def changed_entities(self, entities):
+        """
+        Entity ids from {entity_id: financial_data} whose inputs are not in the store yet
+        """
+        return [entity_id for entity_id, financial_data in entities.items() if self.key_for(financial_data) not in self.store]
+
+    def calculate_portfolio(self, entities):
+        """
+        Calculate {entity_id: financial_data}, computing only entities whose inputs changed
+        """
+        return {entity_id: self.calculate_zakat_amount(financial_data) for entity_id, financial_data in entities.items()}
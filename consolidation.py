@@ -0,0 +1,268 @@
+from datetime import datetime
+
+from rule_packs import CATEGORIES
+from zakat_core import ZakatCalculator
+
+
+class ConsolidationNode:
+    """
+    One entity in the group tree with its own classified totals and the cached subtotal
+    of its whole subtree
+    """
+    def __init__(self, entity_id, financial_data, parent=None):
+        self.entity_id = entity_id
+        self.financial_data = financial_data
+        self.parent = parent
+        self.children = []
+        self.own_totals = None
+        self.subtotal = None
+        self.eliminated = None
+        self.unmatched = None
+        self.size = 1
+        # Intercompany (creditor, debtor) pairs whose lowest common ancestor is this node
+        self.eliminations = set()
+
+    def path_to_root(self):
+        node = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+def intercompany_balances(financial_data):
+    """
+    Intercompany balances declared alongside the balance sheet:
+    {"intercompany": {"receivables": {counterparty: amount}, "payables": {counterparty: amount}}}
+    """
+    intercompany = financial_data.get("intercompany", {})
+    return intercompany.get("receivables", {}), intercompany.get("payables", {})
+
+
+def intercompany_pairs(entity_id, financial_data):
+    """
+    (creditor, debtor) pairs an entity declares, from either side of the balance
+    """
+    receivables, payables = intercompany_balances(financial_data)
+    return {(entity_id, counterparty) for counterparty in receivables} | \
+        {(counterparty, entity_id) for counterparty in payables}
+
+
+class GroupConsolidator:
+    """
+    Consolidates zakat for a holding group.
+
+    Entities form a tree; each node caches the classified totals of its subtree. Intercompany
+    receivables and payables are eliminated at the lowest common ancestor of the two entities,
+    i.e. at the first level where both sides are inside the consolidated perimeter. Only the
+    amount both sides agree on is eliminated; a one-sided or mismatched balance stays in the
+    totals and is reported as unmatched. Updating one subsidiary only recomputes the nodes on
+    its path to the root.
+
+    Intercompany balances are assumed to be included in the entity's receivable and payable
+    accounts, so eliminated receivables reduce zakatable assets and eliminated payables reduce
+    deductible liabilities.
+    """
+    def __init__(self, calculator=None):
+        self.calculator = calculator or ZakatCalculator()
+        self.nodes = {}
+        self.recomputed_nodes = 0
+        self._structure_dirty = True
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy, calculator=None):
+        """
+        Build from nested {"entity_id": ..., "financial_data": ..., "children": [...]} dicts
+        """
+        consolidator = cls(calculator)
+        stack = [(hierarchy, None)]
+        while stack:
+            item, parent_id = stack.pop()
+            consolidator.add_entity(item["entity_id"], item.get("financial_data", {"balance_sheet": {}}), parent_id)
+            stack.extend((child, item["entity_id"]) for child in reversed(item.get("children", [])))
+        return consolidator
+
+    def add_entity(self, entity_id, financial_data, parent_id=None):
+        if entity_id in self.nodes:
+            raise ValueError(f"Entity {entity_id} is already in the group")
+        parent = None
+        if parent_id is not None:
+            if parent_id not in self.nodes:
+                raise ValueError(f"Unknown parent entity {parent_id}")
+            parent = self.nodes[parent_id]
+        node = ConsolidationNode(entity_id, financial_data, parent)
+        if parent is not None:
+            parent.children.append(node)
+        self.nodes[entity_id] = node
+        self._structure_dirty = True
+        return node
+
+    def update_entity(self, entity_id, financial_data):
+        """
+        Replace one entity's ledger; only the path from it to the root is invalidated
+        """
+        node = self.nodes[entity_id]
+        old_counterparties = self._counterparties(node.financial_data)
+        node.financial_data = financial_data
+        node.own_totals = None
+        if not self._structure_dirty and self._counterparties(financial_data) != old_counterparties:
+            self._reassign_entity(node)
+        for ancestor in node.path_to_root():
+            ancestor.subtotal = None
+
+    @staticmethod
+    def _counterparties(financial_data):
+        receivables, payables = intercompany_balances(financial_data)
+        return set(receivables), set(payables)
+
+    def _pair_balances(self, creditor, debtor):
+        """
+        (receivable the creditor reports, payable the debtor reports) for one pair
+        """
+        receivables, _ = intercompany_balances(self.nodes[creditor].financial_data)
+        _, payables = intercompany_balances(self.nodes[debtor].financial_data)
+        return receivables.get(debtor, 0), payables.get(creditor, 0)
+
+    def _declared(self, pair):
+        creditor, debtor = pair
+        return pair in intercompany_pairs(creditor, self.nodes[creditor].financial_data) or \
+            pair in intercompany_pairs(debtor, self.nodes[debtor].financial_data)
+
+    def roots(self):
+        return [node for node in self.nodes.values() if node.parent is None]
+
+    def _lowest_common_ancestor(self, a, b):
+        ancestors = {id(node) for node in a.path_to_root()}
+        for node in b.path_to_root():
+            if id(node) in ancestors:
+                return node
+        return None
+
+    def _assign_eliminations(self):
+        for node in self.nodes.values():
+            node.eliminations = set()
+            node.subtotal = None
+        for node in self.nodes.values():
+            self._assign_entity(node)
+        self._structure_dirty = False
+
+    def _assign_entity(self, node):
+        for pair in intercompany_pairs(node.entity_id, node.financial_data):
+            counterparty = pair[1] if pair[0] == node.entity_id else pair[0]
+            other = self.nodes.get(counterparty)
+            if other is None or other is node:
+                continue  # Balances with entities outside the group are not eliminated
+            lca = self._lowest_common_ancestor(node, other)
+            if lca is not None:
+                lca.eliminations.add(pair)
+
+    def _reassign_entity(self, node):
+        # Any node holding this entity's pairs is one of its ancestors, so already on the dirty path;
+        # a pair is kept while either side still declares it
+        for ancestor in node.path_to_root():
+            ancestor.eliminations = {pair for pair in ancestor.eliminations
+                                     if node.entity_id not in pair or self._declared(pair)}
+        self._assign_entity(node)
+
+    def _own_totals(self, node):
+        if node.own_totals is None:
+            classified = self.calculator.classify_accounts(node.financial_data)
+            node.own_totals = {category: sum(classified[category].values()) for category in CATEGORIES}
+        return node.own_totals
+
+    def subtotal(self, entity_id):
+        """
+        Classified totals of the entity's subtree after intercompany elimination
+        """
+        if self._structure_dirty:
+            self._assign_eliminations()
+        return self._subtotal(self.nodes[entity_id])
+
+    def _subtotal(self, node):
+        # Iterative post-order so deep groups do not hit the recursion limit
+        stack = [(node, False)]
+        while stack:
+            current, children_done = stack.pop()
+            if current.subtotal is not None:
+                continue
+            if not children_done:
+                stack.append((current, True))
+                stack.extend((child, False) for child in current.children if child.subtotal is None)
+                continue
+
+            totals = dict(self._own_totals(current))
+            for child in current.children:
+                for category in CATEGORIES:
+                    totals[category] += child.subtotal[category]
+
+            # Child subtotals already net out their own internal balances; only pairs that
+            # meet at this node are eliminated here, by the amount both sides report
+            matched = unmatched = 0
+            for creditor, debtor in current.eliminations:
+                receivable, payable = self._pair_balances(creditor, debtor)
+                matched += max(0, min(receivable, payable))
+                unmatched += abs(receivable - payable)
+            totals["zakatable_assets"] -= matched
+            totals["deductible_liabilities"] -= matched
+
+            eliminated = {"receivables": matched, "payables": matched}
+            for child in current.children:
+                for kind in eliminated:
+                    eliminated[kind] += child.eliminated[kind]
+                unmatched += child.unmatched
+
+            current.eliminated = eliminated
+            current.unmatched = unmatched
+            current.size = 1 + sum(child.size for child in current.children)
+            current.subtotal = totals
+            self.recomputed_nodes += 1
+        return node.subtotal
+
+    def intercompany_differences(self):
+        """
+        Pairs where one side's receivable does not match the other side's payable, including
+        balances only one side reports; only the matched part of these is eliminated
+        """
+        pairs = set()
+        for node in self.nodes.values():
+            pairs |= {pair for pair in intercompany_pairs(node.entity_id, node.financial_data)
+                      if pair[0] in self.nodes and pair[1] in self.nodes and pair[0] != pair[1]}
+        differences = []
+        for creditor, debtor in sorted(pairs):
+            receivable, payable = self._pair_balances(creditor, debtor)
+            if abs(payable - receivable) > 0.005:
+                differences.append({"receivable_entity": creditor, "payable_entity": debtor,
+                                    "receivable": receivable, "payable": payable, "difference": receivable - payable})
+        return differences
+
+    def consolidate(self, entity_id=None):
+        """
+        Zakat calculation for the subtree rooted at entity_id (the group root by default),
+        in the same shape as ZakatCalculator.calculate_zakat_amount minus the per-account breakdown
+        """
+        if entity_id is None:
+            roots = self.roots()
+            if len(roots) != 1:
+                raise ValueError("Group has more than one root; pass entity_id")
+            entity_id = roots[0].entity_id
+
+        totals = self.subtotal(entity_id)
+        node = self.nodes[entity_id]
+        zakat_base = totals["zakatable_assets"] - totals["deductible_liabilities"]
+        exceeds_nisab = zakat_base >= self.calculator.nisab_value
+        return {
+            "entity_id": entity_id,
+            "entities_consolidated": node.size,
+            "classified_totals": dict(totals),
+            "eliminated_intercompany": dict(node.eliminated),
+            "unmatched_intercompany": node.unmatched,
+            "total_zakatable_assets": totals["zakatable_assets"],
+            "total_deductible_liabilities": totals["deductible_liabilities"],
+            "zakat_base": zakat_base,
+            "zakat_due": exceeds_nisab,
+            "exceeds_nisab": exceeds_nisab,
+            "zakat_amount": zakat_base * self.calculator.rate if exceeds_nisab else 0,
+            "nisab_value": self.calculator.nisab_value,
+            "zakat_rate": self.calculator.rate,
+            "calculation_date": datetime.now().strftime("%Y-%m-%d")
+        }
+
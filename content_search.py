@@ -0,0 +1,217 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+# Arabic normalisation tables
+ARABIC_DIACRITICS = re.compile("[\u064B-\u0652\u0670\u0640]")  # tashkeel, superscript alef, tatweel
+ARABIC_CHAR_MAP = str.maketrans({
+    "\u0623": "\u0627",  # alef with hamza above -> alef
+    "\u0625": "\u0627",  # alef with hamza below -> alef
+    "\u0622": "\u0627",  # alef with madda -> alef
+    "\u0671": "\u0627",  # alef wasla -> alef
+    "\u0629": "\u0647",  # ta marbuta -> ha
+    "\u0649": "\u064A",  # alef maqsura -> ya
+    "\u0624": "\u0648",  # hamza on waw -> waw
+    "\u0626": "\u064A"   # hamza on ya -> ya
+})
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+def normalize_arabic(text):
+    """
+    Strip diacritics and tatweel and unify alef, ta marbuta, alef maqsura and hamza carriers
+    """
+    return ARABIC_DIACRITICS.sub("", text).translate(ARABIC_CHAR_MAP)
+
+
+def tokenize(text):
+    """
+    Normalised search tokens for English or Arabic text
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(normalize_arabic(text.lower())):
+        for prefix in ARABIC_PREFIXES:
+            # Drop the definite article (and attached conjunctions) so "الإجارة" matches "إجارة"
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        if len(token) > 1 or token.isdigit():
+            tokens.append(token)
+    return tokens
+
+
+class Document:
+    __slots__ = ("doc_id", "kind", "key", "language", "title", "text")
+
+    def __init__(self, doc_id, kind, key, language, title, text):
+        self.doc_id = doc_id
+        self.kind = kind
+        self.key = key
+        self.language = language
+        self.title = title
+        self.text = text
+
+
+class SearchHit:
+    __slots__ = ("document", "score", "snippet")
+
+    def __init__(self, document, score, snippet):
+        self.document = document
+        self.score = score
+        self.snippet = snippet
+
+
+class ContentStore:
+    """
+    In-memory inverted index over standards, examples, glossary terms and cached explanations.
+
+    Postings map each normalised token to {doc_id: term frequency}; queries are ranked with BM25.
+    Documents can be added incrementally (e.g. each new LLM explanation) without a rebuild.
+    """
+    def __init__(self):
+        self.documents = []
+        self.postings = defaultdict(dict)
+        self.doc_lengths = []
+        self.total_length = 0
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add_document(self, kind, key, language, title, text):
+        tokens = tokenize(f"{title} {text}")
+        with self._lock:
+            doc_id = len(self.documents)
+            self.documents.append(Document(doc_id, kind, key, language, title, text))
+            self._keys.add((kind, key, language))
+            for token, count in Counter(tokens).items():
+                self.postings[token][doc_id] = count
+            self.doc_lengths.append(len(tokens))
+            self.total_length += len(tokens)
+        return doc_id
+
+    def __len__(self):
+        return len(self.documents)
+
+    def contains(self, kind, key, language):
+        return (kind, key, language) in self._keys
+
+    def search(self, query, language=None, kinds=None, limit=10):
+        """
+        Ranked documents matching query, optionally restricted to a language ("en"/"ar") and kinds
+        """
+        query_tokens = set(tokenize(query))
+        if not query_tokens or not self.documents:
+            return []
+
+        n_docs = len(self.documents)
+        avg_length = self.total_length / n_docs or 1
+        scores = defaultdict(float)
+        with self._lock:
+            for token in query_tokens:
+                postings = self.postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    length_norm = 1 - B + B * self.doc_lengths[doc_id] / avg_length
+                    scores[doc_id] += idf * tf * (K1 + 1) / (tf + K1 * length_norm)
+
+        hits = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            document = self.documents[doc_id]
+            if language and document.language != language:
+                continue
+            if kinds and document.kind not in kinds:
+                continue
+            hits.append(SearchHit(document, score, _snippet(document.text, query_tokens)))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def to_dict(self):
+        """
+        Plain-data form of the index for the compiled JSON copy
+        """
+        with self._lock:
+            return {
+                "documents": [[document.kind, document.key, document.language, document.title, document.text]
+                              for document in self.documents],
+                "postings": {token: list(postings.items()) for token, postings in self.postings.items()},
+                "doc_lengths": list(self.doc_lengths)
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        for doc_id, (kind, key, language, title, text) in enumerate(data["documents"]):
+            store.documents.append(Document(doc_id, kind, key, language, title, text))
+            store._keys.add((kind, key, language))
+        for token, postings in data["postings"].items():
+            store.postings[token] = dict((doc_id, tf) for doc_id, tf in postings)
+        store.doc_lengths = list(data["doc_lengths"])
+        store.total_length = sum(store.doc_lengths)
+        return store
+
+
+def _snippet(text, query_tokens, width=160):
+    """
+    Short excerpt of text around the first query match
+    """
+    text = " ".join(text.split())
+    for match in TOKEN_PATTERN.finditer(text):
+        if query_tokens.intersection(tokenize(match.group())):
+            start = max(0, match.start() - width // 3)
+            return ("..." if start else "") + text[start:start + width] + ("..." if start + width < len(text) else "")
+    return text[:width] + ("..." if len(text) > width else "")
+
+
+def build_content_store(standards, examples, glossary_terms):
+    """
+    Index the standards, example scenarios and glossary in both languages
+    """
+    store = ContentStore()
+    for code, standard in standards.items():
+        for lang in ("en", "ar"):
+            store.add_document("standard", code, lang, f"{code} - {standard[f'title_{lang}']}",
+                               standard[f"description_{lang}"])
+    for code, example in examples.items():
+        for lang in ("en", "ar"):
+            store.add_document("example", code, lang, f"{code} - {example[f'title_{lang}']}",
+                               example[f"scenario_{lang}"])
+    for term, definitions in glossary_terms.items():
+        for lang in ("en", "ar"):
+            store.add_document("glossary", term, lang, term, definitions[lang])
+    return store
+
+
+def compile_content_store(standards, examples, glossary_terms, path=None):
+    """
+    Build the content store, reusing a compiled copy at path when its sources have not changed.
+    The copy is plain JSON, so a file planted at path can at worst fail to load, not run code.
+    """
+    fingerprint = hashlib.sha256(repr((standards, examples, glossary_terms)).encode("utf-8")).hexdigest()
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                compiled = json.load(f)
+            if compiled.get("fingerprint") == fingerprint:
+                return ContentStore.from_dict(compiled["store"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass  # Stale or unreadable compiled store; rebuild below
+
+    store = build_content_store(standards, examples, glossary_terms)
+    if path:
+        # Written to a temporary file first so a concurrent reader never sees half an index
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "store": store.to_dict()}, f, ensure_ascii=False)
+        os.replace(temporary, path)
+    return store
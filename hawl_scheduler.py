@@ -0,0 +1,327 @@
+import argparse
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from math import ceil
+
+import numpy as np
+
+try:
+    from hijri_converter import Gregorian, Hijri
+except ImportError:  # Umm al-Qura dates are optional; the tabular Islamic calendar is used otherwise
+    Gregorian = Hijri = None
+
+from advisory_rules import RuleBasedAdvisor
+from jsonl_journal import append_jsonl_record, read_jsonl_journal
+from llm_scheduler import BATCH
+from zakat_calculator import RULE_PACKS, ZakatCalculator, ZakatComplianceAdvisor, ZakatDocumentGenerator
+
+# Work done for each entity ahead of its hawl end, in order; each stage is journaled when it
+# finishes so an interrupted job resumes at the next one
+STAGES = ("calculation", "advisory", "certificate")
+
+_ISLAMIC_EPOCH = 1948440  # Julian day number of 1 Muharram 1 AH (tabular calendar)
+_JDN_OFFSET = 1721425  # date.toordinal() + _JDN_OFFSET is the Julian day number
+
+
+def _tabular_to_jdn(year, month, day):
+    return day + ceil(29.5 * (month - 1)) + (year - 1) * 354 + (3 + 11 * year) // 30 + _ISLAMIC_EPOCH - 1
+
+
+def _tabular_month_length(year, month):
+    if month == 12:
+        return _tabular_to_jdn(year + 1, 1, 1) - _tabular_to_jdn(year, 12, 1)
+    return _tabular_to_jdn(year, month + 1, 1) - _tabular_to_jdn(year, month, 1)
+
+
+def to_hijri(day):
+    """
+    (year, month, day) in the Hijri calendar for a Gregorian date
+    """
+    if Gregorian is not None:
+        hijri = Gregorian(day.year, day.month, day.day).to_hijri()
+        return hijri.year, hijri.month, hijri.day
+    jdn = day.toordinal() + _JDN_OFFSET
+    year = (30 * (jdn - _ISLAMIC_EPOCH) + 10646) // 10631
+    month = min(12, ceil((jdn - (29 + _tabular_to_jdn(year, 1, 1))) / 29.5) + 1)
+    return year, month, jdn - _tabular_to_jdn(year, month, 1) + 1
+
+
+def from_hijri(year, month, day):
+    """
+    Gregorian date of a Hijri date; day 30 falls back to the 29th in a 29-day month
+    """
+    if Hijri is not None:
+        hijri = Hijri(year, month, min(day, 29))
+        day = min(day, hijri.month_length())
+        return date(*Hijri(year, month, day).to_gregorian().datetuple())
+    day = min(day, _tabular_month_length(year, month))
+    return date.fromordinal(_tabular_to_jdn(year, month, day) - _JDN_OFFSET)
+
+
+def next_hawl_due(hawl_month, hawl_day, on_or_after):
+    """
+    First date on or after on_or_after on which a hawl ending on hawl_month/hawl_day completes
+    """
+    year = to_hijri(on_or_after)[0]
+    due = from_hijri(year, hawl_month, hawl_day)
+    return due if due >= on_or_after else from_hijri(year + 1, hawl_month, hawl_day)
+
+
+def hawl_anniversary(entity):
+    """
+    Hijri (month, day) an entity's hawl ends on, from "hawl_hijri" [month, day] or the
+    Gregorian "hawl_start" date
+    """
+    if "hawl_hijri" in entity:
+        month, day = entity["hawl_hijri"]
+        return int(month), int(day)
+    _, month, day = to_hijri(date.fromisoformat(str(entity["hawl_start"])[:10]))
+    return month, day
+
+
+class HawlIndex:
+    """
+    Entities indexed by the Hijri date their hawl ends on.
+
+    Anniversaries are stored as parallel arrays; due dates are resolved once per distinct
+    (month, day) pair, of which there are at most a few hundred however many entities share them.
+    """
+    def __init__(self, entities):
+        self.entity_ids = np.array([str(entity_id) for entity_id in entities], dtype=object)
+        anniversaries = np.array([hawl_anniversary(entity) for entity in entities.values()],
+                                 dtype=np.int64).reshape(-1, 2)
+        self._pairs, self._pair_codes = np.unique(anniversaries, axis=0, return_inverse=True)
+        self._pair_codes = self._pair_codes.reshape(-1)
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def due_dates(self, on_or_after):
+        """
+        Next hawl end (as date ordinals) of every entity, aligned with entity_ids
+        """
+        pair_due = np.array([next_hawl_due(month, day, on_or_after).toordinal() for month, day in self._pairs],
+                            dtype=np.int64)
+        return pair_due[self._pair_codes] if len(pair_due) else np.zeros(0, dtype=np.int64)
+
+    def upcoming(self, start, end):
+        """
+        [(due date, entity_id)] of the hawls ending between start and end inclusive, earliest first
+        """
+        due = self.due_dates(start)
+        selected = np.flatnonzero(due <= end.toordinal())
+        selected = selected[np.argsort(due[selected], kind="stable")]
+        return [(date.fromordinal(int(due[i])), self.entity_ids[i]) for i in selected]
+
+
+class HawlQueue:
+    """
+    Append-only JSON Lines journal of scheduled zakat runs.
+
+    Every plan and every finished stage is one flushed line, so workers that stop part way (a
+    crash or a deploy) pick up from the last completed stage when the journal is reopened.
+    Jobs are keyed "<entity_id>@<due date>", one per entity per hawl.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        for record in read_jsonl_journal(path):
+            self._apply(record)
+
+    def _apply(self, record):
+        if record["event"] == "planned":
+            self._jobs[record["job"]] = {"job": record["job"], "entity_id": record["entity_id"],
+                                         "due": record["due"], "run_on": record["run_on"], "stages": {},
+                                         "error": None}
+        elif record["event"] == "done":
+            job = self._jobs[record["job"]]
+            job["stages"][record["stage"]] = record["result"]
+            job["error"] = None
+        elif record["event"] == "failed":
+            self._jobs[record["job"]]["error"] = record["error"]
+
+    def _append(self, record):
+        with self._lock:
+            append_jsonl_record(self.path, record)
+            self._apply(record)
+
+    def __contains__(self, job):
+        return job in self._jobs
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def plan(self, entity_id, due, run_on):
+        self._append({"event": "planned", "job": f"{entity_id}@{due.isoformat()}", "entity_id": entity_id,
+                      "due": due.isoformat(), "run_on": run_on.isoformat()})
+
+    def record(self, job, stage, result):
+        self._append({"event": "done", "job": job, "stage": stage, "result": result,
+                      "completed_at": datetime.now().isoformat(timespec="seconds")})
+
+    def fail(self, job, stage, error):
+        self._append({"event": "failed", "job": job, "stage": stage, "error": error})
+
+    def jobs(self):
+        with self._lock:
+            return [dict(job, stages=dict(job["stages"])) for job in self._jobs.values()]
+
+    def pending(self, day):
+        """
+        Unfinished jobs planned to run on or before day, earliest due date first
+        """
+        day = day.isoformat()
+        return sorted((job for job in self.jobs() if job["run_on"] <= day and len(job["stages"]) < len(STAGES)),
+                      key=lambda job: (job["due"], job["run_on"], job["job"]))
+
+    def loads(self, start, days):
+        """
+        Jobs planned per day for the days days from start
+        """
+        loads = np.zeros(days, dtype=np.int64)
+        origin = start.toordinal()
+        for job in self.jobs():
+            offset = date.fromisoformat(job["run_on"]).toordinal() - origin
+            if 0 <= offset < days:
+                loads[offset] += 1
+        return loads
+
+
+class HawlScheduler:
+    """
+    Spreads portfolio zakat runs across the lunar year.
+
+    Each entity's hawl end is looked up in a HawlIndex; hawls ending within horizon_days are
+    planned onto the least loaded day of the lead_days before the due date (never more than
+    daily_capacity jobs a day where the window allows it), so year-end peaks are flattened before
+    they reach the LLM and PDF stages. run_day then works through the jobs due to run, with
+    calculation, rule-based advisory (the LLM only for flagged entities) and the certificate
+    journaled stage by stage in a HawlQueue.
+    """
+    def __init__(self, queue, entities, daily_capacity=50, lead_days=30, horizon_days=60, llm_advisor=None,
+                 rules=None, doc_generator=None, certificate_dir=None):
+        self.queue = queue
+        # Certificates are written next to the journal, one file per job, so neither entities
+        # sharing a display name nor successive hawls of one entity overwrite each other
+        self.certificate_dir = certificate_dir or os.path.splitext(queue.path)[0] + "_certificates"
+        self.entities = {str(entity_id): entity for entity_id, entity in entities.items()}
+        self.index = HawlIndex(self.entities)
+        self.daily_capacity = daily_capacity
+        self.lead_days = lead_days
+        self.horizon_days = horizon_days
+        # Without an API key the advisory stage runs on the rule-based checks alone
+        if llm_advisor is None and os.getenv("OPENAI_API_KEY"):
+            llm_advisor = ZakatComplianceAdvisor(priority=BATCH)
+        self.llm_advisor = llm_advisor
+        self.rules = rules or RuleBasedAdvisor()
+        self.doc_generator = doc_generator or ZakatDocumentGenerator()
+        self.over_capacity = []
+
+    def schedule(self, today=None):
+        """
+        Plan every hawl ending within the horizon that is not queued yet; returns the new jobs
+        as [(entity_id, due, run_on)]
+        """
+        today = today or date.today()
+        origin = today.toordinal()
+        end = today + timedelta(days=self.horizon_days)
+        loads = self.queue.loads(today, self.horizon_days + 1)
+        planned = []
+        for due, entity_id in self.index.upcoming(today, end):
+            if f"{entity_id}@{due.isoformat()}" in self.queue:
+                continue
+            # Window of days the work may run on: lead_days before the due date, up to the day before
+            latest = max(due.toordinal() - origin - 1, 0)
+            earliest = max(latest - self.lead_days + 1, 0)
+            offset = earliest + int(np.argmin(loads[earliest:latest + 1]))
+            if loads[offset] >= self.daily_capacity:
+                # The window is full; fall back to the least loaded day from today
+                offset = int(np.argmin(loads[:latest + 1]))
+                if loads[offset] >= self.daily_capacity:
+                    self.over_capacity.append((entity_id, due))
+            loads[offset] += 1
+            run_on = date.fromordinal(origin + offset)
+            self.queue.plan(entity_id, due, run_on)
+            planned.append((entity_id, due, run_on))
+        return planned
+
+    def run_day(self, today=None, workers=4):
+        """
+        Schedule, then run up to daily_capacity pending jobs (including any left over from earlier
+        days); returns {"planned", "completed", "failed", "remaining"}
+        """
+        today = today or date.today()
+        planned = self.schedule(today)
+        pending = self.queue.pending(today)
+        batch = pending[:self.daily_capacity]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(self._run_job, batch))
+        return {"planned": len(planned), "completed": outcomes.count(True), "failed": outcomes.count(False),
+                "remaining": len(pending) - len(batch)}
+
+    def _run_job(self, job):
+        entity = self.entities.get(job["entity_id"])
+        if entity is None:
+            self.queue.fail(job["job"], STAGES[0], "entity no longer in the portfolio")
+            return False
+        stages = job["stages"]
+        for stage in STAGES:
+            if stage in stages:
+                continue
+            try:
+                stages[stage] = getattr(self, f"_{stage}")(job, entity, stages)
+            except Exception as e:
+                self.queue.fail(job["job"], stage, f"{type(e).__name__}: {e}")
+                return False
+            self.queue.record(job["job"], stage, stages[stage])
+        return True
+
+    def _calculation(self, job, entity, stages):
+        rule_pack = RULE_PACKS.resolve(entity.get("rule_pack", "FAS_9"))
+        return ZakatCalculator(rule_pack=rule_pack).calculate_zakat_amount(entity["financial_data"])
+
+    def _advisory(self, job, entity, stages):
+        advice = self.rules.advise(entity["financial_data"], stages["calculation"], self.llm_advisor)
+        # The advisor reports provider failures as text; journaling that as done would never retry it
+        for key in ("compliance", "optimization"):
+            if advice["source"] == "llm" and advice[key].startswith(ZakatComplianceAdvisor.ERROR_PREFIX):
+                raise RuntimeError(advice[key])
+        return {key: advice[key] for key in ("source", "needs_review", "compliance", "optimization")}
+
+    def _certificate(self, job, entity, stages):
+        due_year = to_hijri(date.fromisoformat(job["due"]))[0]
+        entity_info = {"name": job["entity_id"], "zakat_year": f"{due_year} AH", **entity.get("entity_info", {})}
+        os.makedirs(self.certificate_dir, exist_ok=True)
+        filename = os.path.join(self.certificate_dir, re.sub(r"[^\w.@-]", "_", job["job"]) + ".pdf")
+        return {"path": self.doc_generator.generate_zakat_certificate(entity_info, stages["calculation"], filename)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the zakat work scheduled for today ahead of each entity's hawl")
+    parser.add_argument("entities", help="JSON file of {entity_id: {financial_data, hawl_start or hawl_hijri, "
+                                         "entity_info, rule_pack}}")
+    parser.add_argument("queue", help="JSON Lines journal of scheduled runs (created if missing)")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Run as of this date (YYYY-MM-DD)")
+    parser.add_argument("--capacity", type=int, default=50, help="Entities processed per day")
+    parser.add_argument("--lead-days", type=int, default=30, help="Days before the hawl end work may start")
+    parser.add_argument("--horizon-days", type=int, default=60, help="How far ahead hawl ends are scheduled")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.entities, encoding="utf-8") as f:
+        entities = json.load(f)
+    scheduler = HawlScheduler(HawlQueue(args.queue), entities, daily_capacity=args.capacity,
+                              lead_days=args.lead_days, horizon_days=args.horizon_days)
+    summary = scheduler.run_day(args.date, workers=args.workers)
+    print(json.dumps(summary))
+    for entity_id, due in scheduler.over_capacity:
+        print(f"Over capacity: {entity_id} due {due.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
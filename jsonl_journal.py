@@ -0,0 +1,35 @@
+import json
+import os
+
+
+def read_jsonl_journal(path):
+    """
+    Records of an append-only JSON Lines journal, in order ([] if it does not exist yet)
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "rb+") as f:
+        complete = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                # A crash mid-write leaves a truncated final line; it is cut off so the next record
+                # starts on a fresh line, and whatever it described is redone
+                f.truncate(complete)
+                break
+            complete += len(line)
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def append_jsonl_record(path, record):
+    """
+    Append one record and flush it to disk before returning
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
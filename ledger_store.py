@@ -0,0 +1,155 @@
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ACCOUNT_DTYPE = np.int32
+AMOUNT_DTYPE = np.float64
+
+
+def _segment_key(entity_id, period):
+    return f"{entity_id}\x1f{period}"
+
+
+class LedgerWriter:
+    """
+    Writes journal lines into the on-disk columnar ledger format.
+
+    Account names are dictionary-encoded to int32 ids and amounts stored as float64, each in its
+    own raw column file. Lines are appended per (entity, period) chunk and the row ranges of each
+    chunk are recorded in the metadata, so readers can slice an entity or period without sorting
+    or scanning. Reopening an existing ledger appends to it.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.meta = _read_meta(path) or {"version": FORMAT_VERSION, "rows": 0, "accounts": [], "segments": {}}
+        self._account_ids = {name: i for i, name in enumerate(self.meta["accounts"])}
+        self._account_file = self._open_column("account_ids.i4", ACCOUNT_DTYPE)
+        self._amount_file = self._open_column("amounts.f8", AMOUNT_DTYPE)
+
+    def _open_column(self, filename, dtype):
+        f = open(os.path.join(self.path, filename), "ab")
+        # Drop rows left behind by an interrupted write that never reached the metadata
+        f.truncate(self.meta["rows"] * np.dtype(dtype).itemsize)
+        f.seek(0, os.SEEK_END)
+        return f
+
+    def append(self, entity_id, period, accounts, amounts):
+        """
+        Append journal lines for one entity and period; accounts are names, amounts are
+        positive balance contributions as in a balance_sheet dict
+        """
+        amounts = np.ascontiguousarray(amounts, dtype=AMOUNT_DTYPE)
+        names, inverse = np.unique(np.asarray(accounts, dtype=object).astype(str), return_inverse=True)
+        if len(inverse) != len(amounts):
+            raise ValueError("accounts and amounts must have the same length")
+
+        # Encode the distinct names of this chunk once, then map every line in one vectorised step
+        codes = np.fromiter((self._intern(name) for name in names), dtype=ACCOUNT_DTYPE, count=len(names))
+        codes[inverse].astype(ACCOUNT_DTYPE).tofile(self._account_file)
+        amounts.tofile(self._amount_file)
+
+        start = self.meta["rows"]
+        stop = start + len(amounts)
+        self.meta["segments"].setdefault(_segment_key(entity_id, period), []).append([start, stop])
+        self.meta["rows"] = stop
+
+    def _intern(self, name):
+        account_id = self._account_ids.get(name)
+        if account_id is None:
+            account_id = len(self.meta["accounts"])
+            self._account_ids[name] = account_id
+            self.meta["accounts"].append(name)
+        return account_id
+
+    def close(self):
+        self._account_file.close()
+        self._amount_file.close()
+        # Metadata is written last and atomically, so a crashed write never exposes partial rows
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_meta(path):
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported ledger format version {meta.get('version')}")
+    return meta
+
+
+class LedgerStore:
+    """
+    Read-only, memory-mapped view of a ledger written by LedgerWriter.
+
+    Opening only reads the small metadata file and maps the column files, so it is near-instant
+    regardless of size; pages are loaded by the OS as slices are touched.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError(f"No ledger at {path}")
+        rows = self.meta["rows"]
+        self.accounts = self.meta["accounts"]
+        self.account_ids = self._map("account_ids.i4", ACCOUNT_DTYPE, rows)
+        self.amounts = self._map("amounts.f8", AMOUNT_DTYPE, rows)
+        self._segments = {}
+        for key, ranges in self.meta["segments"].items():
+            entity_id, period = key.split("\x1f", 1)
+            self._segments.setdefault(entity_id, {})[period] = ranges
+
+    def _map(self, filename, dtype, rows):
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        # Only the rows covered by the metadata are visible, even if a later append was interrupted
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode="r", shape=(rows,))
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def entities(self):
+        return list(self._segments)
+
+    def periods(self, entity_id):
+        return list(self._segments.get(str(entity_id), {}))
+
+    def slices(self, entity_id, period=None):
+        """
+        Zero-copy (account_ids, amounts) views for an entity, optionally limited to one period
+        """
+        by_period = self._segments.get(str(entity_id), {})
+        periods = [str(period)] if period is not None else list(by_period)
+        for p in periods:
+            for start, stop in by_period.get(p, []):
+                yield self.account_ids[start:stop], self.amounts[start:stop]
+
+    def balances(self, entity_id, period=None, chunk_rows=1 << 20):
+        """
+        Per-account balances for an entity (and period), summed in bounded-size chunks
+        """
+        totals = np.zeros(len(self.accounts), dtype=AMOUNT_DTYPE)
+        for account_ids, amounts in self.slices(entity_id, period):
+            for i in range(0, len(amounts), chunk_rows):
+                totals += np.bincount(account_ids[i:i + chunk_rows], weights=amounts[i:i + chunk_rows],
+                                      minlength=len(self.accounts))
+        return {self.accounts[i]: float(totals[i]) for i in np.flatnonzero(totals)}
+
+    def financial_data(self, entity_id, period=None):
+        """
+        financial_data dict in the shape ZakatCalculator expects
+        """
+        return {"balance_sheet": self.balances(entity_id, period)}
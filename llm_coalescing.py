@@ -0,0 +1,80 @@
+import hashlib
+import threading
+
+
+class _InFlightCall:
+    """
+    Holds the outcome of one upstream call while followers wait on it
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests so that only one reaches the LLM provider.
+
+    The first caller for a key runs the upstream call; callers arriving with the same key
+    while it is still in flight block until it finishes and share its result (or its error).
+    Nothing is cached once the call completes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() for key, or wait for the identical call already in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.upstream_calls += 1
+            else:
+                self.coalesced_calls += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """
+        Number of distinct keys currently being fetched upstream
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+def prompt_key(model, prompt):
+    """
+    Build a coalescing key from the model settings and the fully rendered prompt
+    """
+    model_name = getattr(model, "model_name", type(model).__name__)
+    temperature = getattr(model, "temperature", None)
+    raw = f"{model_name}|{temperature}|{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Process-wide instance shared by every Streamlit session. It lives in an imported
+# module because Streamlit re-executes the main script (and its globals) on each rerun.
+default_flight = SingleFlight()
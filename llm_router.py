@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from langchain.callbacks import get_openai_callback
+from langchain.chat_models import ChatOpenAI
+
+from llm_scheduler import INTERACTIVE, estimate_tokens, get_scheduler
+
+TIMEOUT_ERRORS = {"Timeout", "APITimeoutError", "ReadTimeout", "ConnectTimeout", "TimeoutError"}
+
+
+def is_timeout(error):
+    return isinstance(error, TimeoutError) or type(error).__name__ in TIMEOUT_ERRORS
+
+
+def estimate_prompt_tokens(text, language="English"):
+    """
+    Rough prompt size; Arabic script tokenises at about 2 characters per token against 4 for English
+    """
+    chars_per_token = 2 if language == "ar" or language.startswith("Arabic") else 4
+    return len(text) // chars_per_token
+
+
+def _percentile(ordered, pct):
+    return ordered[int(pct / 100 * (len(ordered) - 1))] if ordered else 0.0
+
+
+class ModelTier:
+    """
+    A model configuration requests can be routed to.
+
+    timeout bounds a single call; latency_budget is the p95 latency (seconds) the tier is expected
+    to meet. When a call times out, or the tier's recent p95 exceeds its budget, requests move to
+    the fallback tier.
+    """
+    def __init__(self, name, model_name, timeout=60.0, latency_budget=None, fallback=None, chat_model=None):
+        self.name = name
+        self.model_name = model_name
+        self.timeout = timeout
+        self.latency_budget = latency_budget
+        self.fallback = fallback
+        self._chat_models = {}
+        self._injected = chat_model
+        self._lock = threading.Lock()
+
+    def chat_model(self, temperature=0.0):
+        if self._injected is not None:
+            return self._injected
+        with self._lock:
+            model = self._chat_models.get(temperature)
+            if model is None:
+                # Retries are owned by the shared scheduler; the timeout is what triggers fallback
+                model = self._chat_models[temperature] = ChatOpenAI(
+                    model_name=self.model_name, temperature=temperature, request_timeout=self.timeout,
+                    max_retries=1, openai_api_key=os.getenv("OPENAI_API_KEY", "dummy_key")
+                )
+            return model
+
+
+class RouteRule:
+    """
+    Sends matching requests to a tier; None for a condition means "any"
+    """
+    def __init__(self, tier, features=None, languages=None, max_prompt_tokens=None):
+        self.tier = tier
+        self.features = set(features) if features else None
+        self.languages = set(languages) if languages else None
+        self.max_prompt_tokens = max_prompt_tokens
+
+    def matches(self, feature, language, prompt_tokens):
+        return ((self.features is None or feature in self.features)
+                and (self.languages is None or language in self.languages)
+                and (self.max_prompt_tokens is None or prompt_tokens <= self.max_prompt_tokens))
+
+
+class _TierStats:
+    def __init__(self, window_seconds):
+        # (recorded_at, seconds) pairs; samples older than window_seconds are dropped, so a burst of
+        # slow calls stops counting against the tier once it has aged out
+        self.window_seconds = window_seconds
+        self.samples = deque(maxlen=500)
+        self.counts = {"requests": 0, "errors": 0, "timeouts": 0, "fallbacks": 0, "budget_reroutes": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0}
+
+    def latencies(self, now):
+        while self.samples and now - self.samples[0][0] > self.window_seconds:
+            self.samples.popleft()
+        return sorted(seconds for _, seconds in self.samples)
+
+
+class ModelRouter:
+    """
+    Chooses a model tier per request from its feature, language and prompt size.
+
+    Rules are checked in order and the first match picks the tier (default_tier otherwise). Calls
+    run through the shared scheduler; a call that times out is retried immediately on the tier's
+    fallback, and while a tier's p95 latency over the last window_seconds is over its budget new
+    requests go straight to the fallback, with every probe_every-th request still sent to the tier
+    to detect recovery.
+    """
+    def __init__(self, tiers, rules=(), default_tier=None, scheduler=None, min_samples=20, probe_every=10,
+                 window_seconds=300.0, clock=time.monotonic):
+        self.tiers = {tier.name: tier for tier in tiers}
+        self.rules = list(rules)
+        self.default_tier = default_tier or tiers[0].name
+        self.scheduler = scheduler or get_scheduler()
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {name: _TierStats(window_seconds) for name in self.tiers}
+        self._budget_skips = {name: 0 for name in self.tiers}
+
+        for tier in tiers:
+            seen = {tier.name}
+            while tier.fallback is not None:
+                if tier.fallback not in self.tiers or tier.fallback in seen:
+                    raise ValueError(f"Invalid fallback chain from tier {tier.name}")
+                seen.add(tier.fallback)
+                tier = self.tiers[tier.fallback]
+
+    @classmethod
+    def from_config(cls, config, scheduler=None):
+        """
+        Build from {"tiers": [{"name", "model_name", "timeout", "latency_budget", "fallback"}],
+        "rules": [{"tier", "features", "languages", "max_prompt_tokens"}], "default_tier": ...}
+        """
+        tiers = [ModelTier(**tier) for tier in config["tiers"]]
+        rules = [RouteRule(**rule) for rule in config.get("rules", [])]
+        return cls(tiers, rules, config.get("default_tier"), scheduler=scheduler)
+
+    def _over_budget(self, tier):
+        if tier.latency_budget is None or tier.fallback is None:
+            return False
+        latencies = self._stats[tier.name].latencies(self.clock())
+        if len(latencies) < self.min_samples or _percentile(latencies, 95) <= tier.latency_budget:
+            return False
+        self._budget_skips[tier.name] += 1
+        # Let an occasional request through so the tier can show it has recovered
+        return self._budget_skips[tier.name] % self.probe_every != 0
+
+    def select(self, feature, prompt, language="English"):
+        """
+        Tier chosen by the rules alone, before latency budgets are considered
+        """
+        prompt_tokens = estimate_prompt_tokens(prompt, language)
+        name = next((rule.tier for rule in self.rules if rule.matches(feature, language, prompt_tokens)),
+                    self.default_tier)
+        return self.tiers[name]
+
+    def route(self, feature, prompt, language="English"):
+        tier = self.select(feature, prompt, language)
+        with self._lock:
+            while self._over_budget(tier):
+                self._stats[tier.name].counts["budget_reroutes"] += 1
+                tier = self.tiers[tier.fallback]
+        return tier
+
+    def run(self, feature, prompt, invoke, language="English", priority=INTERACTIVE, temperature=0.0,
+            scheduler=None):
+        """
+        Route and execute invoke(chat_model) through the scheduler; prompt is the rendered text
+        used for routing and token estimates
+        """
+        tier = self.route(feature, prompt, language)
+        return (scheduler or self.scheduler).run(
+            lambda: self._call(tier, invoke, prompt, temperature),
+            priority=priority,
+            tokens=estimate_tokens(prompt)
+        )
+
+    def _call(self, tier, invoke, prompt, temperature):
+        while True:
+            start = self.clock()
+            try:
+                with get_openai_callback() as usage:
+                    result = invoke(tier.chat_model(temperature))
+            except Exception as e:
+                timed_out = is_timeout(e)
+                self._record(tier, self.clock() - start, error=True, timeout=timed_out)
+                if timed_out and tier.fallback is not None:
+                    with self._lock:
+                        self._stats[tier.name].counts["fallbacks"] += 1
+                    tier = self.tiers[tier.fallback]
+                    continue
+                raise
+            completion = getattr(result, "content", result)
+            self._record(tier, self.clock() - start,
+                         prompt_tokens=usage.prompt_tokens or estimate_tokens(prompt, completion_tokens=0),
+                         completion_tokens=usage.completion_tokens or estimate_tokens(str(completion), 0))
+            return result
+
+    def _record(self, tier, seconds, error=False, timeout=False, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            stats = self._stats[tier.name]
+            # A timed-out call counts as taking the full timeout, so repeated timeouts trip the budget
+            stats.samples.append((self.clock(), tier.timeout if timeout else seconds))
+            stats.counts["requests"] += 1
+            stats.counts["errors"] += int(error)
+            stats.counts["timeouts"] += int(timeout)
+            stats.counts["prompt_tokens"] += prompt_tokens
+            stats.counts["completion_tokens"] += completion_tokens
+
+    def metrics(self):
+        """
+        Per-tier call counts, latency percentiles (calls in the last window_seconds) and token totals
+        """
+        with self._lock:
+            metrics = {}
+            for name, stats in self._stats.items():
+                ordered = stats.latencies(self.clock())
+                metrics[name] = {
+                    "model_name": self.tiers[name].model_name,
+                    **stats.counts,
+                    "p50_seconds": _percentile(ordered, 50),
+                    "p95_seconds": _percentile(ordered, 95),
+                    "max_seconds": ordered[-1] if ordered else 0.0,
+                    "latency_budget": self.tiers[name].latency_budget
+                }
+            return metrics
+
+
+def default_router_config():
+    """
+    Two tiers: "quality" (GPT-4) falling back to "fast" (GPT-3.5). The zakat advisor features
+    stay on "fast", the model they used before routing, as do short custom questions and short
+    feedback prompts; tutorial explanations use "quality". Models, timeouts and budgets come
+    from the environment.
+    """
+    return {
+        "tiers": [
+            {"name": "quality", "model_name": os.getenv("LLM_QUALITY_MODEL", "gpt-4"),
+             "timeout": float(os.getenv("LLM_QUALITY_TIMEOUT", 60)),
+             "latency_budget": float(os.getenv("LLM_QUALITY_LATENCY_BUDGET", 30)), "fallback": "fast"},
+            {"name": "fast", "model_name": os.getenv("LLM_FAST_MODEL", "gpt-3.5-turbo"),
+             "timeout": float(os.getenv("LLM_FAST_TIMEOUT", 20)),
+             "latency_budget": float(os.getenv("LLM_FAST_LATENCY_BUDGET", 10))}
+        ],
+        "rules": [
+            {"tier": "fast", "features": ["compliance_advice", "optimization", "advisory"]},
+            {"tier": "fast", "features": ["custom_question"], "max_prompt_tokens": 250},
+            {"tier": "fast", "features": ["feedback"], "max_prompt_tokens": 400}
+        ],
+        "default_tier": "quality"
+    }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """
+    Process-wide router; LLM_ROUTER_CONFIG may point to a JSON file replacing the default tiers and rules
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            config_path = os.getenv("LLM_ROUTER_CONFIG")
+            if config_path:
+                with open(config_path, encoding="utf-8") as f:
+                    config = json.load(f)
+            else:
+                config = default_router_config()
+            _router = ModelRouter.from_config(config)
+        return _router
@@ -0,0 +1,229 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Request priorities (lower value is served first)
+INTERACTIVE = 0
+BATCH = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Errors that are worth retrying with backoff rather than surfacing to the user
+RETRYABLE_ERRORS = {"RateLimitError", "ServiceUnavailableError", "Timeout", "APITimeoutError",
+                    "APIConnectionError", "TryAgain"}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text, completion_tokens=500):
+    """
+    Rough token estimate for a prompt (about 4 characters per token) plus the expected completion
+    """
+    return len(text) // 4 + completion_tokens
+
+
+def is_retryable(error):
+    """
+    Whether an LLM provider error is transient (rate limits, timeouts, 5xx)
+    """
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS or "429" in str(error)
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at capacity per minute
+    """
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Seconds until amount tokens are available (0 if they are available now)
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Job:
+    def __init__(self, fn, priority, tokens, enqueued):
+        self.fn = fn
+        self.priority = priority
+        self.tokens = tokens
+        self.future = Future()
+        self.attempt = 0
+        self.enqueued = enqueued
+
+
+class LLMScheduler:
+    """
+    Process-wide gate in front of the LLM provider.
+
+    Jobs are queued by priority (interactive before batch), released only when both the
+    requests-per-minute and tokens-per-minute buckets allow it, and retried with jittered
+    exponential backoff on transient provider errors. clock and rng (anything with uniform())
+    can be replaced to drive the buckets and the retry jitter deterministically.
+    """
+    def __init__(self, requests_per_minute=60, tokens_per_minute=40000, max_concurrency=8,
+                 max_retries=5, base_delay=1.0, max_delay=30.0, clock=time.monotonic, rng=random):
+        self.clock = clock
+        self.rng = rng
+        self.request_bucket = TokenBucket(requests_per_minute, clock)
+        self.token_bucket = TokenBucket(tokens_per_minute, clock)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "retries": 0}
+        self._waits = {name: deque(maxlen=1000) for name in PRIORITY_NAMES.values()}
+
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-scheduler", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, fn, priority=INTERACTIVE, tokens=1000):
+        """
+        Queue fn() for execution and return a Future with its result
+        """
+        job = _Job(fn, priority, tokens, self.clock())
+        with self._cond:
+            self._stats["submitted"] += 1
+        self._enqueue(job)
+        return job.future
+
+    def run(self, fn, priority=INTERACTIVE, tokens=1000):
+        """
+        Queue fn() and block until it completes
+        """
+        return self.submit(fn, priority, tokens).result()
+
+    def _enqueue(self, job):
+        with self._cond:
+            heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+            self._cond.notify()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue or self._in_flight >= self.max_concurrency:
+                    self._cond.wait()
+
+                # Always re-peek so that a newly arrived interactive job overtakes waiting batch work
+                job = self._queue[0][2]
+                delay = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(job.tokens))
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+
+                heapq.heappop(self._queue)
+                self.request_bucket.consume(1)
+                self.token_bucket.consume(job.tokens)
+                self._in_flight += 1
+                self._waits[PRIORITY_NAMES.get(job.priority, "batch")].append(self.clock() - job.enqueued)
+
+            threading.Thread(target=self._execute, args=(job,), daemon=True).start()
+
+    def _execute(self, job):
+        retry_delay = None
+        try:
+            result = job.fn()
+        except Exception as e:
+            if is_retryable(e) and job.attempt < self.max_retries:
+                # Full jitter keeps retries from many sessions from synchronising
+                retry_delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** job.attempt))
+                job.attempt += 1
+            else:
+                job.future.set_exception(e)
+                self._record("failed")
+        else:
+            job.future.set_result(result)
+            self._record("completed")
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+        if retry_delay is not None:
+            self._record("retries")
+            timer = threading.Timer(retry_delay, self._requeue, args=(job,))
+            timer.daemon = True
+            timer.start()
+
+    def _requeue(self, job):
+        job.enqueued = self.clock()
+        self._enqueue(job)
+
+    def _record(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def metrics(self):
+        """
+        Snapshot of queue depth, in-flight requests, outcome counters and queue wait times
+        """
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _, _ in self._queue:
+                depth[PRIORITY_NAMES.get(priority, "batch")] += 1
+            waits = {}
+            for name, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[name] = {
+                    "count": len(ordered),
+                    "avg_seconds": sum(ordered) / len(ordered) if ordered else 0.0,
+                    "p95_seconds": ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0,
+                    "max_seconds": ordered[-1] if ordered else 0.0
+                }
+            return {
+                "queue_depth": sum(depth.values()),
+                "queue_depth_by_priority": depth,
+                "in_flight": self._in_flight,
+                "wait_time": waits,
+                **self._stats
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Return the process-wide scheduler, configured from LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE and LLM_MAX_CONCURRENCY
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", 60)),
+                tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", 40000)),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+            )
+        return _scheduler
@@ -0,0 +1,187 @@
+"""
+Local OpenAI-compatible stand-in for load testing without spending real tokens.
+
+Serves POST /v1/chat/completions with configurable latency, token generation rate and
+error injection. Point the apps at it with OPENAI_API_BASE=http://127.0.0.1:8001/v1.
+
+    python llm_stub_server.py --port 8001 --latency 0.3 --token-rate 50 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = ("Under AAOIFI FAS 9 the zakat base is measured using the net assets method and "
+          "zakatable assets are reduced by current liabilities that are due within the year").split()
+
+
+class StubConfig:
+    def __init__(self, latency=0.2, token_rate=50.0, completion_tokens=200, error_rate=0.0,
+                 rate_limit_share=0.7, model="stub-gpt"):
+        self.latency = latency  # seconds before the first token
+        self.token_rate = token_rate  # completion tokens generated per second (0 = instant)
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate  # probability of an injected error
+        self.rate_limit_share = rate_limit_share  # share of injected errors that are 429s (the rest are 500s)
+        self.model = model
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, error=False, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors,
+                    "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+
+def _completion_text(n_tokens):
+    # Words are roughly one token each for this filler
+    return " ".join(FILLER[i % len(FILLER)] for i in range(n_tokens)) + "."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.config.model, "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        config = self.server.config
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+        time.sleep(config.latency)
+
+        if random.random() < config.error_rate:
+            self.server.stats.record(error=True, prompt_tokens=prompt_tokens)
+            if random.random() < config.rate_limit_share:
+                self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error",
+                                                "code": "rate_limit_exceeded"}})
+            else:
+                self._send_json(500, {"error": {"message": "Internal server error (stub)", "type": "server_error"}})
+            return
+
+        completion_tokens = min(int(request.get("max_tokens") or config.completion_tokens), config.completion_tokens)
+        if config.token_rate > 0:
+            time.sleep(completion_tokens / config.token_rate)
+        self.server.stats.record(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", config.model),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": _completion_text(completion_tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+class StubLLMServer:
+    """
+    Threaded stub server that can run in the background of a test or load run
+    """
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or StubConfig()
+        self.httpd.stats = StubStats()
+        self._thread = None
+
+    @property
+    def config(self):
+        return self.httpd.config
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="llm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="completion tokens per second (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 429/500")
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.token_rate, args.completion_tokens, args.error_rate)
+    server = StubLLMServer(args.host, args.port, config)
+    print(f"Stub LLM server listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
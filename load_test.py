@@ -0,0 +1,246 @@
+"""
+Concurrent-session load harness for the zakat and tutorial flows.
+
+Simulates N users driving the same code paths as the Streamlit apps against an
+OpenAI-compatible endpoint (by default a local stub started in-process) and reports
+throughput, latency percentiles and memory per session.
+
+    python load_test.py --users 50 --duration 60 --flow both
+    python load_test.py --users 20 --base-url http://127.0.0.1:8001/v1
+"""
+import argparse
+import os
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+from langchain.chat_models import ChatOpenAI
+
+from llm_scheduler import LLMScheduler
+from llm_stub_server import StubConfig, StubLLMServer
+from zakat_calculator import ZakatCalculator, ZakatComplianceAdvisor, create_sample_financial_data
+
+# Answers of varying quality, so both the local pre-scorer and the LLM feedback path are exercised
+SAMPLE_ANSWERS = [
+    "",
+    "Not sure",
+    "Debit work in progress and credit cash for each instalment paid, then recognise revenue on delivery.",
+    "Record the asset at cost including freight, debit Ijarah asset 492,000 and credit cash 492,000.",
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class SessionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.flows = 0
+
+    def record(self, operation, seconds):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+
+    def error(self, operation):
+        with self._lock:
+            self.errors[operation] += 1
+
+
+def _timed(stats, operation, fn):
+    start = time.perf_counter()
+    try:
+        return fn()
+    except Exception:
+        stats.error(operation)
+        return None
+    finally:
+        stats.record(operation, time.perf_counter() - start)
+
+
+def _vary(financial_data, rng):
+    """
+    Perturb the sample balance sheet so sessions do not all submit identical data
+    """
+    return {"balance_sheet": {account: value * rng.uniform(0.8, 1.2)
+                              for account, value in financial_data["balance_sheet"].items()}}
+
+
+class VirtualUser:
+    """
+    One simulated session holding the objects a Streamlit session would create
+    """
+    def __init__(self, user_id, chat_model, scheduler, flows, explanation_cache):
+        self.rng = random.Random(user_id)
+        self.flows = flows
+        self.calculator = ZakatCalculator()
+        self.advisor = ZakatComplianceAdvisor(llm=chat_model, scheduler=scheduler)
+        self.explainer = None
+        if "tutorial" in flows:
+            # Imported lazily: the tutorial module reads its API key at import time
+            import tutorial
+            self.tutorial = tutorial
+            self.explainer = tutorial.IslamicFinanceStandardsExplainer(
+                chat_model=chat_model, scheduler=scheduler, explanation_cache=explanation_cache
+            )
+
+    def run_zakat_flow(self, stats):
+        financial_data = _vary(create_sample_financial_data(), self.rng)
+        results = _timed(stats, "zakat.calculate", lambda: self.calculator.calculate_zakat_amount(financial_data))
+        if results is None:
+            return
+        for operation, fn in (("zakat.compliance_advice", self.advisor.get_compliance_advice),
+                              ("zakat.optimization", self.advisor.get_optimization_suggestions)):
+            advice = _timed(stats, operation, lambda: fn(financial_data, results))
+            # The advisor reports provider failures as text rather than raising
+            if advice is None or advice.startswith(ZakatComplianceAdvisor.ERROR_PREFIX):
+                stats.error(operation)
+
+    def run_tutorial_flow(self, stats):
+        standard = self.rng.choice(list(self.tutorial.standards))
+        language = self.rng.choice(["English", "Arabic"])
+        lang_code = "en" if language == "English" else "ar"
+        scenario = self.tutorial.examples[standard][f"scenario_{lang_code}"]
+        expert = _timed(stats, "tutorial.explanation", lambda: self.explainer.get_explanation(
+            standard=standard,
+            standard_title=self.tutorial.standards[standard][f"title_{lang_code}"],
+            scenario=scenario,
+            language=language,
+            scenario_key="example"
+        ))
+        if expert is None:
+            return
+        answer = self.rng.choice(SAMPLE_ANSWERS)
+        _timed(stats, "tutorial.feedback", lambda: self.explainer.get_feedback(scenario, answer, expert, language))
+
+    def run(self, stats, deadline, think_time):
+        while time.monotonic() < deadline:
+            flow = self.rng.choice(self.flows)
+            start = time.perf_counter()
+            if flow == "zakat":
+                self.run_zakat_flow(stats)
+            else:
+                self.run_tutorial_flow(stats)
+            stats.record(f"flow.{flow}", time.perf_counter() - start)
+            with stats._lock:
+                stats.flows += 1
+            time.sleep(self.rng.uniform(0, think_time))
+
+
+def run_load_test(users, duration, flows, base_url, think_time=1.0, requests_per_minute=100000,
+                  tokens_per_minute=100000000):
+    """
+    Drive users concurrent sessions for duration seconds; returns a report dict
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    chat_model = ChatOpenAI(openai_api_base=base_url, openai_api_key=os.environ["OPENAI_API_KEY"],
+                            temperature=0, max_retries=1, request_timeout=60)
+    scheduler = LLMScheduler(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                             max_concurrency=users)
+    stats = SessionStats()
+    explanation_cache = {}
+    if "tutorial" in flows:
+        import tutorial  # Import before measuring so module setup is not charged to sessions
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    sessions = [VirtualUser(i, chat_model, scheduler, flows, explanation_cache) for i in range(users)]
+    after_setup, _ = tracemalloc.get_traced_memory()
+
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=session.run, args=(stats, deadline, think_time), daemon=True)
+               for session in sessions]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    operations = {}
+    for operation, samples in sorted(stats.latencies.items()):
+        ordered = sorted(samples)
+        operations[operation] = {
+            "count": len(ordered),
+            "errors": stats.errors.get(operation, 0),
+            "throughput_per_s": len(ordered) / elapsed,
+            "p50_ms": percentile(ordered, 50) * 1000,
+            "p95_ms": percentile(ordered, 95) * 1000,
+            "p99_ms": percentile(ordered, 99) * 1000
+        }
+    return {
+        "users": users,
+        "elapsed_s": elapsed,
+        "flows_completed": stats.flows,
+        "flows_per_s": stats.flows / elapsed,
+        "operations": operations,
+        "memory": {
+            "session_setup_kib_per_user": (after_setup - baseline) / users / 1024,
+            "steady_kib_per_user": (current - baseline) / users / 1024,
+            "peak_traced_mib": peak / 1024 / 1024,
+            "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        },
+        "scheduler": scheduler.metrics()
+    }
+
+
+def print_report(report):
+    print(f"\n{report['users']} users, {report['elapsed_s']:.1f}s, "
+          f"{report['flows_completed']} flows ({report['flows_per_s']:.2f}/s)\n")
+    print(f"{'operation':<28}{'count':>8}{'errors':>8}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation, row in report["operations"].items():
+        print(f"{operation:<28}{row['count']:>8}{row['errors']:>8}{row['throughput_per_s']:>9.2f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    memory = report["memory"]
+    print(f"\nMemory: {memory['session_setup_kib_per_user']:.1f} KiB/session at setup, "
+          f"{memory['steady_kib_per_user']:.1f} KiB/session at end, "
+          f"peak traced {memory['peak_traced_mib']:.1f} MiB, max RSS {memory['max_rss_mib']:.1f} MiB")
+    scheduler = report["scheduler"]
+    print(f"Scheduler: {scheduler['retries']} retries, {scheduler['failed']} failed, "
+          f"interactive wait p95 {scheduler['wait_time']['interactive']['p95_seconds'] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the zakat and tutorial apps")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--flow", choices=["zakat", "tutorial", "both"], default="both")
+    parser.add_argument("--think-time", type=float, default=1.0, help="max seconds between flows per user")
+    parser.add_argument("--base-url", help="existing OpenAI-compatible endpoint (default: start a local stub)")
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--stub-token-rate", type=float, default=50.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=100000, help="scheduler requests per minute")
+    parser.add_argument("--tpm", type=int, default=100000000, help="scheduler tokens per minute")
+    args = parser.parse_args()
+
+    flows = ["zakat", "tutorial"] if args.flow == "both" else [args.flow]
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        config = StubConfig(latency=args.stub_latency, token_rate=args.stub_token_rate, error_rate=args.stub_error_rate)
+        server = StubLLMServer(config=config).start()
+        base_url = server.base_url
+        print(f"Started stub LLM server on {base_url}")
+
+    try:
+        report = run_load_test(args.users, args.duration, flows, base_url, args.think_time, args.rpm, args.tpm)
+    finally:
+        if server is not None:
+            print(f"Stub server stats: {server.stats.snapshot()}")
+            server.stop()
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Balance sheet components that make up an issuer's zakatable assets when the fundamentals
+# table does not carry a precomputed zakatable_assets column
+ZAKATABLE_COMPONENTS = ("cash", "receivables", "inventory", "short_term_investments")
+
+# How each position was valued
+LOOK_THROUGH = "look_through"
+MARKET_VALUE = "market_value"  # held for trading, zakatable at market value
+NO_FUNDAMENTALS = "no_fundamentals"  # no usable fundamentals; conservatively taken at market value
+
+LOOK_THROUGH_ACCOUNT = "Investments - zakatable share (look-through)"
+
+
+def _to_days(values):
+    """
+    Dates (strings, date objects or datetime64) as int64 days since epoch
+    """
+    return pd.to_datetime(values).values.astype("datetime64[D]").astype(np.int64)
+
+
+class IssuerFundamentals:
+    """
+    Locally cached issuer fundamentals, one row per (issuer, as_of) report.
+
+    Zakatable assets per share are computed for every report once, when the table is loaded.
+    Resolving which report applies on a calculation date is an as-of join done for all issuers
+    at once and memoised per date, so any number of entities valued on the same date share it.
+    """
+    def __init__(self, frame, max_age_days=None, memo_size=64):
+        frame = frame.copy()
+        if "zakatable_assets" not in frame:
+            components = [column for column in ZAKATABLE_COMPONENTS if column in frame]
+            if not components:
+                raise ValueError("Fundamentals need zakatable_assets or its components "
+                                 f"({', '.join(ZAKATABLE_COMPONENTS)})")
+            frame["zakatable_assets"] = frame[components].fillna(0).sum(axis=1)
+        frame["as_of_days"] = _to_days(frame["as_of"])
+        frame = frame.sort_values(["issuer_id", "as_of_days"], kind="stable").reset_index(drop=True)
+
+        self.frame = frame
+        self.max_age_days = max_age_days
+        self.issuers = pd.Index(frame["issuer_id"].unique())
+        self._issuer_codes = self.issuers.get_indexer(frame["issuer_id"]).astype(np.int64)
+        self._as_of_days = frame["as_of_days"].to_numpy(np.int64)
+        # Composite sort key so one searchsorted finds the latest report per issuer
+        self._day_offset = int(self._as_of_days.min()) if len(frame) else 0
+        self._keys = (self._issuer_codes << 32) | (self._as_of_days - self._day_offset)
+
+        shares = frame["shares_outstanding"].to_numpy(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_share = frame["zakatable_assets"].to_numpy(np.float64) / shares
+        self.zakatable_per_share = np.where(shares > 0, per_share, np.nan)
+
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+        return cls(frame, **kwargs)
+
+    def per_share_on(self, calculation_date):
+        """
+        Zakatable assets per share for every issuer on a date (NaN where no usable report),
+        aligned with self.issuers
+        """
+        day = int(_to_days([calculation_date])[0])
+        with self._lock:
+            cached = self._memo.get(day)
+            if cached is not None:
+                self._memo.move_to_end(day)
+                self.memo_hits += 1
+                return cached
+        self.memo_misses += 1
+
+        codes = np.arange(len(self.issuers), dtype=np.int64)
+        if len(codes) == 0 or day < self._day_offset:
+            per_share = np.full(len(codes), np.nan)  # Date precedes every report
+        else:
+            rows = np.searchsorted(self._keys, (codes << 32) | (day - self._day_offset), side="right") - 1
+            # -1 means the date precedes issuer 0's first report; clipping alone would select that report
+            found = rows >= 0
+            rows = np.clip(rows, 0, None)
+            valid = found & (self._issuer_codes[rows] == codes) & (self._as_of_days[rows] <= day)
+            if self.max_age_days is not None:
+                valid &= day - self._as_of_days[rows] <= self.max_age_days
+            per_share = np.where(valid, self.zakatable_per_share[rows], np.nan)
+        per_share.flags.writeable = False
+
+        with self._lock:
+            self._memo[day] = per_share
+            while len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return per_share
+
+
+_fundamentals_cache = {}
+_fundamentals_lock = threading.Lock()
+
+
+def load_fundamentals(path, **kwargs):
+    """
+    IssuerFundamentals for a CSV/Parquet file, shared process-wide and reloaded when the file changes
+    """
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns, tuple(sorted(kwargs.items())))
+    with _fundamentals_lock:
+        fundamentals = _fundamentals_cache.get(key)
+        if fundamentals is None:
+            for stale in [k for k in _fundamentals_cache if k[0] == key[0]]:
+                del _fundamentals_cache[stale]
+            fundamentals = _fundamentals_cache[key] = IssuerFundamentals.from_file(path, **kwargs)
+        return fundamentals
+
+
+class LookThroughCalculator:
+    """
+    Values equity positions for zakat by looking through to the investee.
+
+    Positions held as investments contribute their share of the issuer's zakatable assets
+    (quantity x zakatable assets per share); positions held for trading are zakatable at market
+    value. Positions whose issuer has no usable report fall back to market value, matching the
+    face-value treatment of classify_accounts. Positions are a DataFrame with issuer_id, quantity
+    and market_value, and optionally entity_id, intent ("investment" or "trading") and
+    calculation_date (otherwise the date passed to apply).
+    """
+    def __init__(self, fundamentals):
+        self.fundamentals = fundamentals
+
+    def apply(self, positions, calculation_date=None):
+        """
+        Positions with zakatable_per_share, zakatable_amount and valuation columns added
+        """
+        positions = positions.reset_index(drop=True)
+        n = len(positions)
+        issuer_codes = self.fundamentals.issuers.get_indexer(positions["issuer_id"])
+
+        if "calculation_date" in positions:
+            days, inverse = np.unique(_to_days(positions["calculation_date"]), return_inverse=True)
+            dates = days.astype("datetime64[D]")
+        else:
+            dates = np.array([np.datetime64(calculation_date or date.today(), "D")])
+            inverse = np.zeros(n, dtype=np.int64)
+
+        # One memoised per-issuer vector per distinct date, then a single gather for all positions
+        per_share_matrix = np.vstack([self.fundamentals.per_share_on(d) for d in dates])
+        known = issuer_codes >= 0
+        per_share = np.full(n, np.nan)
+        per_share[known] = per_share_matrix[inverse[known], issuer_codes[known]]
+
+        quantity = positions["quantity"].to_numpy(np.float64)
+        market_value = positions["market_value"].to_numpy(np.float64)
+        trading = (positions["intent"].astype(str).str.lower() == "trading").to_numpy() \
+            if "intent" in positions else np.zeros(n, dtype=bool)
+        has_fundamentals = ~np.isnan(per_share)
+        looked_through = ~trading & has_fundamentals
+
+        result = positions.copy()
+        result["zakatable_per_share"] = per_share
+        result["zakatable_amount"] = np.where(looked_through, quantity * np.nan_to_num(per_share), market_value)
+        result["valuation"] = np.where(looked_through, LOOK_THROUGH,
+                                       np.where(trading, MARKET_VALUE, NO_FUNDAMENTALS))
+        return result
+
+    def entity_totals(self, positions, calculation_date=None):
+        """
+        Zakatable amount, market value and position counts per entity_id
+        """
+        valued = self.apply(positions, calculation_date)
+        return valued.groupby("entity_id", sort=False).agg(
+            zakatable_amount=("zakatable_amount", "sum"),
+            market_value=("market_value", "sum"),
+            positions=("issuer_id", "size"),
+            without_fundamentals=("valuation", lambda v: int((v == NO_FUNDAMENTALS).sum()))
+        )
+
+    def adjust_financial_data(self, financial_data, positions, calculation_date=None, replace_accounts=None):
+        """
+        Copy of financial_data in which the investment accounts covered by the positions are
+        replaced by their look-through zakatable amount.
+
+        replace_accounts defaults to every balance sheet account whose name contains "investment",
+        the keyword classify_accounts uses to take them at face value.
+        """
+        balance_sheet = dict(financial_data["balance_sheet"])
+        if replace_accounts is None:
+            replace_accounts = [account for account in balance_sheet if "investment" in account.lower()]
+        for account in replace_accounts:
+            balance_sheet.pop(account, None)
+        balance_sheet[LOOK_THROUGH_ACCOUNT] = float(self.apply(positions, calculation_date)["zakatable_amount"].sum())
+        return {**financial_data, "balance_sheet": balance_sheet}
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from zakat_core import METAL_PRICES
+
+METALS = ("gold", "silver")
+
+# Grams per unit; ounces for bullion are troy ounces
+UNIT_GRAMS = {
+    "g": 1.0,
+    "gram": 1.0,
+    "grams": 1.0,
+    "kg": 1000.0,
+    "oz": 31.1034768,
+    "ozt": 31.1034768,
+    "tola": 11.6638038
+}
+
+# Accounts the valued holdings are added under; the names match the "gold"/"silver" keywords
+# of the rule packs so they are classified as zakatable assets
+HOLDINGS_ACCOUNTS = {
+    "gold": "Gold holdings (valued by weight)",
+    "silver": "Silver holdings (valued by weight)"
+}
+
+
+def _codes(values, vocabulary, label):
+    """
+    Map a column of names to integer codes with one pandas lookup, rejecting unknown names
+    """
+    normalised = pd.Series(values, dtype="string").str.strip().str.lower()
+    codes = pd.Index(vocabulary).get_indexer(normalised)
+    if (codes < 0).any():
+        unknown = sorted(set(normalised[codes < 0].fillna("<missing>")))
+        raise ValueError(f"Unknown {label}: {', '.join(unknown[:10])}")
+    return codes
+
+
+def fineness_from(karat=None, fineness=None):
+    """
+    Fineness (0-1] from karat (out of 24) and/or fineness given as a fraction or in parts per
+    thousand; karat wins where both are present
+    """
+    if karat is None and fineness is None:
+        raise ValueError("Holdings need a karat or fineness column")
+    result = np.full(len(karat if karat is not None else fineness), np.nan)
+    if fineness is not None:
+        fineness = np.asarray(fineness, dtype=np.float64)
+        result = np.where(fineness > 1, fineness / 1000, fineness)
+    if karat is not None:
+        karat = np.asarray(karat, dtype=np.float64)
+        result = np.where(np.isnan(karat), result, karat / 24)
+    invalid = ~((result > 0) & (result <= 1))
+    if invalid.any():
+        raise ValueError(f"{int(invalid.sum())} holdings have a missing or out-of-range karat/fineness")
+    return result
+
+
+class MetalHoldings:
+    """
+    Physical gold and silver items (bars, coins, jewellery stock) recorded by weight and purity.
+
+    Built from a DataFrame (or CSV) with metal, weight and karat and/or fineness columns and an
+    optional unit column (default grams). Items are held as parallel arrays and valued together:
+    pure metal weight = weight x grams per unit x fineness, value = pure weight x price per gram.
+    """
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        n = len(self.frame)
+        self.metal_codes = _codes(self.frame["metal"], METALS, "metal")
+        units = self.frame["unit"] if "unit" in self.frame else np.full(n, "g")
+        unit_codes = _codes(units, list(UNIT_GRAMS), "unit")
+        grams_per_unit = np.fromiter(UNIT_GRAMS.values(), dtype=np.float64)
+        weights = self.frame["weight"].to_numpy(np.float64)
+        if (weights < 0).any() or np.isnan(weights).any():
+            raise ValueError("Holding weights must be present and non-negative")
+        self.fineness = fineness_from(
+            self.frame["karat"] if "karat" in self.frame else None,
+            self.frame["fineness"] if "fineness" in self.frame else None
+        )
+        self.pure_grams = weights * grams_per_unit[unit_codes] * self.fineness
+
+    @classmethod
+    def from_csv(cls, path_or_buffer):
+        return cls(pd.read_csv(path_or_buffer))
+
+    def __len__(self):
+        return len(self.pure_grams)
+
+    def _prices(self, prices):
+        prices = prices or METAL_PRICES
+        return np.array([prices[f"{metal}_per_gram"] for metal in METALS], dtype=np.float64)
+
+    def values(self, prices=None):
+        """
+        Market value of every item at the given per-gram prices (METAL_PRICES by default)
+        """
+        return self.pure_grams * self._prices(prices)[self.metal_codes]
+
+    def valued(self, prices=None):
+        """
+        The holdings with pure_grams, price_per_gram and value columns added
+        """
+        unit_prices = self._prices(prices)[self.metal_codes]
+        result = self.frame.copy()
+        result["fineness"] = self.fineness
+        result["pure_grams"] = self.pure_grams
+        result["price_per_gram"] = unit_prices
+        result["value"] = self.pure_grams * unit_prices
+        return result
+
+    def totals(self, prices=None):
+        """
+        {metal: {"pure_grams": ..., "value": ...}} summed over all items
+        """
+        pure = np.bincount(self.metal_codes, weights=self.pure_grams, minlength=len(METALS))
+        value = np.bincount(self.metal_codes, weights=self.values(prices), minlength=len(METALS))
+        return {metal: {"pure_grams": float(pure[i]), "value": float(value[i])} for i, metal in enumerate(METALS)}
+
+    def add_to_financial_data(self, financial_data, prices=None):
+        """
+        Copy of financial_data with the valued holdings added to the balance sheet as zakatable
+        gold and silver accounts
+        """
+        balance_sheet = dict(financial_data["balance_sheet"])
+        for metal, total in self.totals(prices).items():
+            if total["value"]:
+                account = HOLDINGS_ACCOUNTS[metal]
+                balance_sheet[account] = balance_sheet.get(account, 0) + total["value"]
+        return {**financial_data, "balance_sheet": balance_sheet}
@@ -0,0 +1,174 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class TableColumn:
+    """
+    Column definition for PDFTable; width is in mm, or None to size from the data
+    """
+    def __init__(self, header, width=None, align="L", formatter=None):
+        self.header = header
+        self.width = width
+        self.align = align
+        self.formatter = formatter or str
+
+
+def currency(value):
+    return f"${value:,.2f}"
+
+
+class PDFTable:
+    """
+    Table renderer for FPDF documents.
+
+    Column widths are computed once (from fixed widths or a sample of the rows), rows are drawn
+    straight from an iterator without being collected first, and page breaks are handled by the
+    table itself: the header is repeated on every page and, for amount columns, a carried-forward
+    subtotal closes each page and is brought forward on the next.
+    """
+    def __init__(self, pdf, columns, row_height=6, font=("Arial", "", 10), header_font=("Arial", "B", 10),
+                 total_columns=(), carry_forward=False, header_fill=(230, 230, 230)):
+        self.pdf = pdf
+        self.columns = columns
+        self.row_height = row_height
+        self.font = font
+        self.header_font = header_font
+        self.total_columns = tuple(total_columns)
+        self.carry_forward = carry_forward and bool(self.total_columns)
+        self.header_fill = header_fill
+        self.widths = None
+        self.rows_rendered = 0
+        self._running = {}
+        self._in_body = False
+        self._char_widths = {}
+
+    def compute_widths(self, sample_rows=()):
+        """
+        Fix column widths: explicit widths are kept and the remaining page width is shared
+        between auto-sized columns in proportion to their widest sampled text
+        """
+        pdf = self.pdf
+        available = pdf.w - pdf.l_margin - pdf.r_margin
+        fixed = sum(column.width for column in self.columns if column.width)
+        auto = [i for i, column in enumerate(self.columns) if not column.width]
+
+        pdf.set_font(*self.font)
+        natural = {}
+        for i in auto:
+            column = self.columns[i]
+            texts = [column.header] + [column.formatter(row[i]) for row in sample_rows]
+            natural[i] = max(pdf.get_string_width(text) for text in texts) + 2
+
+        remaining = max(available - fixed, 0)
+        total_natural = sum(natural.values()) or 1
+        self.widths = [
+            column.width if column.width else remaining * natural[i] / total_natural
+            for i, column in enumerate(self.columns)
+        ]
+        return self.widths
+
+    def _fit(self, text, width):
+        """
+        Truncate text with an ellipsis so it stays inside its cell
+        """
+        pdf = self.pdf
+        key = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        char_widths = self._char_widths.get(key)
+        if char_widths is None:
+            char_widths = self._char_widths[key] = {ch: pdf.get_string_width(ch) for ch in "W."}
+
+        limit = width - 2 * pdf.c_margin
+        if len(text) * char_widths["W"] <= limit:
+            return text  # Fast path: cannot overflow even if every character were as wide as "W"
+        for ch in set(text).difference(char_widths):
+            char_widths[ch] = pdf.get_string_width(ch)
+        cumulative = list(accumulate(map(char_widths.__getitem__, text)))
+        if cumulative[-1] <= limit:
+            return text
+        return text[:bisect_right(cumulative, limit - 3 * char_widths["."])] + "..."
+
+    def header(self):
+        pdf = self.pdf
+        pdf.set_font(*self.header_font)
+        pdf.set_fill_color(*self.header_fill)
+        for column, width in zip(self.columns, self.widths):
+            pdf.cell(width, self.row_height + 1, self._fit(column.header, width), border="B", ln=0,
+                     align=column.align, fill=1)
+        pdf.ln()
+        pdf.set_font(*self.font)
+
+    def _line(self, values, bold=False, border=0):
+        pdf = self.pdf
+        if bold:
+            pdf.set_font(self.font[0], "B", self.font[2])
+        last = len(self.columns) - 1
+        for i, (column, width, value) in enumerate(zip(self.columns, self.widths, values)):
+            text = "" if value is None else (value if isinstance(value, str) else column.formatter(value))
+            pdf.cell(width, self.row_height, self._fit(text, width), border=border, ln=1 if i == last else 0,
+                     align=column.align)
+        if bold:
+            pdf.set_font(*self.font)
+
+    def _labelled(self, label, amounts):
+        values = [None] * len(self.columns)
+        values[0] = label
+        for i in self.total_columns:
+            values[i] = amounts.get(i, 0)
+        return values
+
+    def _ensure_space(self, rows_needed=1):
+        """
+        Start a new page (with carried-forward totals and repeated header) if the next rows do not fit
+        """
+        pdf = self.pdf
+        carry = self.carry_forward and self._in_body
+        reserve = self.row_height if carry else 0
+        if pdf.get_y() + rows_needed * self.row_height + reserve <= pdf.page_break_trigger:
+            return
+        if carry:
+            self._line(self._labelled("Carried forward", self._running), bold=True, border="T")
+        pdf.add_page()
+        if self._in_body:
+            self.header()
+        if carry:
+            self._line(self._labelled("Brought forward", self._running), bold=True)
+
+    def render(self, rows, subtotal_label=None, sample_size=200):
+        """
+        Draw a table from an iterable of row tuples; optionally finish with a bold subtotal row.
+        Returns the column totals.
+        """
+        rows = iter(rows)
+        sample = []
+        if self.widths is None:
+            for row in rows:
+                sample.append(row)
+                if len(sample) >= sample_size:
+                    break
+            self.compute_widths(sample)
+
+        pdf = self.pdf
+        # fpdf's automatic page break would split rows from their header, so the table paginates itself
+        auto_page_break, break_margin = pdf.auto_page_break, pdf.b_margin
+        pdf.set_auto_page_break(False, break_margin)
+        self._running = {i: 0 for i in self.total_columns}
+        self._in_body = False
+        try:
+            # Keep the header together with at least one row
+            self._ensure_space(2)
+            self.header()
+            self._in_body = True
+            for source in (sample, rows):
+                for row in source:
+                    self._ensure_space()
+                    for i in self.total_columns:
+                        self._running[i] += row[i]
+                    self._line(row)
+                    self.rows_rendered += 1
+            if subtotal_label is not None:
+                self._ensure_space()
+                self._line(self._labelled(subtotal_label, self._running), bold=True, border="T")
+        finally:
+            self._in_body = False
+            pdf.set_auto_page_break(auto_page_break, break_margin)
+        return dict(self._running)
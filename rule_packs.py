@@ -0,0 +1,255 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+CATEGORIES = (
+    "zakatable_assets",
+    "non_zakatable_assets",
+    "deductible_liabilities",
+    "non_deductible_liabilities"
+)
+
+NISAB_BASES = ("higher", "lower", "gold", "silver")
+
+DEFAULT_RULE_PACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_packs")
+
+
+class RulePack:
+    """
+    A versioned zakat regime compiled for fast use.
+
+    The definition has the shape of an AAOIFI_STANDARDS entry plus "id", "version", an optional
+    "nisab_basis" and ordered "classification_rules" ({"category": ..., "keywords": [...]}; the
+    first category with a matching keyword wins). Keywords are compiled into one regex per
+    category and account names are memoised, so classifying a recurring account is a dict lookup.
+    """
+    MEMO_LIMIT = 100000
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.id = definition["id"]
+        self.version = str(definition.get("version", "1"))
+        self.rate = float(definition["rate"])
+        self.nisab_gold = float(definition.get("nisab_gold", 0))
+        self.nisab_silver = float(definition.get("nisab_silver", 0))
+        self.nisab_basis = definition.get("nisab_basis", "higher")
+        if self.nisab_basis not in NISAB_BASES:
+            raise ValueError(f"Rule pack {self.id}: nisab_basis must be one of {', '.join(NISAB_BASES)}")
+
+        self._patterns = []
+        for rule in definition["classification_rules"]:
+            if rule["category"] not in CATEGORIES:
+                raise ValueError(f"Rule pack {self.id}: unknown category {rule['category']}")
+            # An empty list (or an empty keyword) would compile to a pattern that matches every account
+            if not rule["keywords"] or not all(rule["keywords"]):
+                raise ValueError(f"Rule pack {self.id}: {rule['category']} rule needs non-empty keywords")
+            keywords = [re.escape(keyword.lower()) for keyword in rule["keywords"]]
+            self._patterns.append((rule["category"], re.compile("|".join(keywords))))
+        self._memo = {}
+
+    @property
+    def key(self):
+        return f"{self.id}@{self.version}"
+
+    def classify(self, account):
+        """
+        Category of one account name, or None if no rule matches
+        """
+        try:
+            return self._memo[account]
+        except KeyError:
+            pass
+        account_lower = account.lower()
+        category = next((category for category, pattern in self._patterns if pattern.search(account_lower)), None)
+        if len(self._memo) >= self.MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[account] = category
+        return category
+
+    def classify_accounts(self, balance_sheet):
+        classified = {category: {} for category in CATEGORIES}
+        classify = self.classify
+        for account, value in balance_sheet.items():
+            category = classify(account)
+            if category is not None:
+                classified[category][account] = value
+        return classified
+
+    def nisab_value(self, prices):
+        gold = self.nisab_gold * prices["gold_per_gram"]
+        silver = self.nisab_silver * prices["silver_per_gram"]
+        return {"higher": max(gold, silver), "lower": min(gold, silver), "gold": gold, "silver": silver}[self.nisab_basis]
+
+    def __repr__(self):
+        return f"RulePack({self.key!r}, rate={self.rate}, nisab_basis={self.nisab_basis!r})"
+
+
+class RulePackRegistry:
+    """
+    Compiled rule packs, cached by (pack id, version).
+
+    Packs come from built-in definitions and from *.json files in a directory. The directory is
+    rescanned at most every check_interval seconds when a pack is requested, and only files whose
+    modification time changed are re-read and recompiled, so a pack can be edited or added while
+    the Streamlit server and batch workers keep running. Without an explicit version, get()
+    returns the highest version currently defined for that id.
+
+    Built-in packs are kept apart from file packs: a file may not redefine a built-in id and
+    version, and scans never remove built-ins. A version that disappears from the directory
+    (its file bumped to a newer version, or deleted) stays available to callers that ask for
+    it explicitly, so runs pinned to "ID@version" are not broken part way through.
+    """
+    def __init__(self, directory=None, check_interval=2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._builtin = {}  # (id, version) -> RulePack
+        self._file_packs = {}  # path -> RulePack currently defined by that file
+        self._retired = {}  # (id, version) -> RulePack no longer defined by any file
+        self._packs = {}  # (id, version) -> RulePack currently defined (built-ins and files)
+        self._file_mtimes = {}
+        self._last_scan = None
+        self.errors = {}  # path -> message for pack files that failed to load
+
+    def register(self, definition):
+        """
+        Add a built-in pack; re-registering an identical definition keeps the compiled pack
+        """
+        with self._lock:
+            existing = self._builtin.get((definition["id"], str(definition.get("version", "1"))))
+            if existing is not None and existing.definition == definition:
+                return existing
+        pack = RulePack(definition)
+        with self._lock:
+            self._builtin[(pack.id, pack.version)] = pack
+            self._rebuild()
+        return pack
+
+    def _rebuild(self):
+        # Called with self._lock held; built-ins take precedence over any file
+        packs = {(pack.id, pack.version): pack for pack in self._file_packs.values()}
+        packs.update(self._builtin)
+        for key in packs:
+            self._retired.pop(key, None)
+        self._packs = packs
+
+    def refresh(self, force=False):
+        """
+        Reload pack files that were added, changed or removed since the last scan
+        """
+        now = time.monotonic()
+        if not self.directory or (not force and self._last_scan is not None
+                                  and now - self._last_scan < self.check_interval):
+            return
+        # One thread rescans; the others carry on with the packs already loaded
+        if not self._scan_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_scan = now
+            self._scan()
+        finally:
+            self._scan_lock.release()
+
+    def _scan(self):
+        paths = set(glob.glob(os.path.join(self.directory, "*.json")))
+        changed = False
+
+        for path in set(self._file_mtimes) - paths:
+            with self._lock:
+                self._retire(self._file_packs.pop(path, None))
+                del self._file_mtimes[path]
+            self.errors.pop(path, None)
+            changed = True
+
+        for path in sorted(paths):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self._file_mtimes.get(path) == mtime:
+                continue
+            self._file_mtimes[path] = mtime
+            try:
+                with open(path, encoding="utf-8") as f:
+                    pack = RulePack(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep serving the previously loaded version until the file is fixed
+                self.errors[path] = f"{type(e).__name__}: {e}"
+                continue
+            if (pack.id, pack.version) in self._builtin:
+                self.errors[path] = f"{pack.key} is a built-in rule pack; give the file a new id or version"
+                continue
+            self.errors.pop(path, None)
+            with self._lock:
+                previous = self._file_packs.get(path)
+                self._file_packs[path] = pack
+                if previous is not None and previous.key != pack.key:
+                    self._retire(previous)
+            changed = True
+
+        if changed:
+            with self._lock:
+                self._rebuild()
+
+    def _retire(self, pack):
+        # Called with self._lock held
+        if pack is not None and pack.key not in {p.key for p in self._file_packs.values()}:
+            self._retired[(pack.id, pack.version)] = pack
+
+    def get(self, pack_id, version=None):
+        self.refresh()
+        with self._lock:
+            if version is not None:
+                key = (pack_id, str(version))
+                pack = self._packs.get(key) or self._retired.get(key)
+            else:
+                versions = [pack for (key, _), pack in self._packs.items() if key == pack_id]
+                pack = max(versions, key=lambda p: _version_key(p.version)) if versions else None
+        if pack is None:
+            raise KeyError(f"Unknown rule pack {pack_id}" + (f" version {version}" if version is not None else ""))
+        return pack
+
+    def resolve(self, selection):
+        """
+        Pack for a selection given as "ID", "ID@version", (id, version) or a RulePack
+        """
+        if isinstance(selection, RulePack):
+            return selection
+        if isinstance(selection, (tuple, list)):
+            return self.get(*selection)
+        pack_id, _, version = selection.partition("@")
+        return self.get(pack_id, version or None)
+
+    def available(self):
+        """
+        {pack id: [versions]} currently defined by built-ins and pack files
+        """
+        self.refresh()
+        with self._lock:
+            packs = {}
+            for pack_id, version in sorted(self._packs):
+                packs.setdefault(pack_id, []).append(version)
+        return {pack_id: sorted(versions, key=_version_key) for pack_id, versions in packs.items()}
+
+
+def _version_key(version):
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"[.\-]", version))
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_rule_pack_registry():
+    """
+    Process-wide registry shared by every session and worker, reading RULE_PACKS_DIR
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = RulePackRegistry(os.getenv("RULE_PACKS_DIR", DEFAULT_RULE_PACKS_DIR))
+        return _default_registry
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")  # tutorial copies the key into the environment on import
+
+
+class FakeChatModel:
+    model_name = "fake"
+    temperature = 0.5
+
+
+@pytest.fixture
+def explainer(monkeypatch):
+    """
+    Tutorial explainer pinned to a fake model. run_chain is replaced so nothing reaches a provider:
+    each call is recorded in explainer.calls as (feature, inputs) and answered by
+    explainer.replies[feature](**inputs), which tests can override
+    """
+    from llm_coalescing import SingleFlight
+    from translation import LocalTranslationBackend, TranslationPipeline
+    from tutorial import IslamicFinanceStandardsExplainer
+
+    explainer = IslamicFinanceStandardsExplainer(chat_model=FakeChatModel(), flight=SingleFlight(),
+                                                 scheduler=object(),
+                                                 translator=TranslationPipeline(LocalTranslationBackend()))
+    explainer.calls = []
+    explainer.replies = {"explanation": lambda **inputs: f"Explanation of {inputs['scenario']}"}
+
+    def run_chain(prompt, rendered_prompt, feature, language="English", **inputs):
+        explainer.calls.append((feature, inputs))
+        return explainer.replies[feature](**inputs)
+
+    monkeypatch.setattr(explainer, "run_chain", run_chain)
+    return explainer
@@ -0,0 +1,86 @@
+import pytest
+
+from advisory_rules import INFO, REVIEW, RuleBasedAdvisor
+from zakat_calculator import ZakatCalculator, create_sample_financial_data
+
+
+class CountingAdvisor:
+    def __init__(self):
+        self.calls = []
+
+    def get_compliance_advice(self, financial_data, calculation_results, findings=None):
+        self.calls.append("compliance")
+        return "LLM compliance advice"
+
+    def get_optimization_suggestions(self, financial_data, calculation_results, findings=None):
+        self.calls.append("optimization")
+        return "LLM optimization suggestions"
+
+
+def analyse(balance_sheet, advisor=None, **kwargs):
+    financial_data = {"balance_sheet": balance_sheet}
+    results = ZakatCalculator().calculate_zakat_amount(financial_data)
+    return RuleBasedAdvisor().advise(financial_data, results, advisor, **kwargs)
+
+
+def codes(advice):
+    return {finding["code"]: finding["severity"] for finding in advice["findings"]}
+
+
+def test_below_nisab_is_answered_from_the_rules():
+    advisor = CountingAdvisor()
+    advice = analyse({"Cash": 1000.0}, advisor)
+    assert codes(advice) == {"below_nisab": INFO}
+    assert advice["source"] == "rules"
+    assert not advice["needs_review"]
+    assert advisor.calls == []
+    assert "below the nisab" in advice["compliance"]
+
+
+@pytest.mark.parametrize("balance_sheet, code, severity", [
+    ({"Cash": 6000.0}, "near_nisab", REVIEW),
+    ({"Cash": 10000.0, "Trade payables": 20000.0}, "liabilities_exceed_assets", REVIEW),
+    ({"Cash": 100000.0, "Trade receivables": 150000.0}, "receivables_concentration", REVIEW),
+    ({"Cash": 100000.0, "Suspense account": 50000.0}, "unclassified_accounts", REVIEW),
+    ({"Cash": 100000.0, "Suspense account": 100.0}, "unclassified_minor", INFO),
+])
+def test_checks_report_the_expected_finding(balance_sheet, code, severity):
+    found = codes(analyse(balance_sheet))
+    assert found[code] == severity
+
+
+def test_equity_accounts_are_not_reported_as_unclassified():
+    found = codes(analyse({"Cash": 100000.0, "Retained earnings": 50000.0}))
+    assert "unclassified_accounts" not in found
+    assert "unclassified_minor" not in found
+
+
+def test_sample_data_is_routine():
+    financial_data = create_sample_financial_data()
+    results = ZakatCalculator().calculate_zakat_amount(financial_data)
+    advisor = RuleBasedAdvisor()
+    assert not advisor.needs_review(advisor.findings(financial_data, results))
+
+
+def test_llm_is_only_called_for_flagged_entities_or_when_forced():
+    advisor = CountingAdvisor()
+    routine = analyse({"Cash": 100000.0}, advisor)
+    assert routine["source"] == "rules"
+    assert advisor.calls == []
+
+    flagged = analyse({"Cash": 100000.0, "Suspense account": 50000.0}, advisor)
+    assert flagged["needs_review"]
+    assert flagged["source"] == "llm"
+    assert flagged["compliance"] == "LLM compliance advice"
+    assert advisor.calls == ["compliance", "optimization"]
+
+    forced = analyse({"Cash": 100000.0}, advisor, force_llm=True)
+    assert forced["source"] == "llm"
+    assert len(advisor.calls) == 4
+
+
+def test_flagged_entity_without_an_advisor_falls_back_to_the_rules():
+    advice = analyse({"Cash": 6000.0})
+    assert advice["needs_review"]
+    assert advice["source"] == "rules"
+    assert "close to nisab" in advice["compliance"]
@@ -0,0 +1,67 @@
+import csv
+import os
+
+import pytest
+
+from answer_grading import AnswerPreScorer, BulkGrader
+from tutorial import examples, standards
+
+LONG_ANSWER = "Debit the investment account and credit cash for the capital contributed by the bank partner"
+
+
+class CountingPreScorer(AnswerPreScorer):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def score(self, user_solution, expert_solution, language="English"):
+        self.calls += 1
+        return super().score(user_solution, expert_solution, language)
+
+
+@pytest.fixture
+def grader(tmp_path, explainer):
+    explainer.pre_scorer = CountingPreScorer()
+    explainer.replies = {
+        "explanation": lambda **inputs: "Debit the Musharaka investment 1,000,000 and credit cash 1,000,000 "
+                                        "as a journal entry.",
+        "feedback": lambda **inputs: "Good answer.\n\nScore: 7/10"
+    }
+    return BulkGrader(explainer, standards, examples, str(tmp_path / "grades.csv"), concurrency=2)
+
+
+def read_grades(grader):
+    with open(grader.output_path, newline="", encoding="utf-8") as f:
+        return {row["submission_id"]: row for row in csv.DictReader(f)}
+
+
+def test_answer_is_pre_scored_once(grader):
+    standard = next(iter(examples))
+    source = f"submission_id,standard,answer\n1,{standard},{LONG_ANSWER}\n2,{standard},\n"
+
+    assert grader.grade_csv(source.encode("utf-8")) == 2
+
+    assert grader.explainer.pre_scorer.calls == 2
+    grades = read_grades(grader)
+    assert grades["1"]["graded_by"] == "llm"
+    assert grades["2"]["verdict"] == "empty"
+    assert [feature for feature, inputs in grader.explainer.calls].count("feedback") == 1
+
+
+def test_missing_cell_values_do_not_abort_the_run(grader):
+    standard = next(iter(examples))
+    # Row 2 is short, so csv leaves its answer and language as None
+    source = f"submission_id,standard,answer,language\n1,{standard},{LONG_ANSWER},en\n2,{standard}\n3\n"
+
+    assert grader.grade_csv(source.encode("utf-8")) == 3
+
+    grades = read_grades(grader)
+    assert grades["2"]["verdict"] == "empty"
+    assert grades["3"]["verdict"] == "unknown_standard"
+    assert grader.failures == []
+
+
+def test_missing_required_column_is_reported_up_front(grader):
+    with pytest.raises(ValueError, match="standard"):
+        grader.grade_csv(b"submission_id,answer\n1,some answer\n")
+    assert not os.path.exists(grader.output_path)
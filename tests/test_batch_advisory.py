@@ -0,0 +1,129 @@
+import json
+import random
+import re
+import threading
+
+import pytest
+
+from batch_advisory import AdvisoryResultStore, BatchAdvisoryJob, ENTITY_MARKER
+from llm_scheduler import LLMScheduler
+from zakat_calculator import ZakatComplianceAdvisor
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """
+    Answers packed prompts section by section, with injected provider errors and dropped entities
+    """
+    def __init__(self, seed=0, error_rate=0.0, drop_rate=0.0):
+        self.rng = random.Random(seed)
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def __call__(self, messages):
+        entity_ids = re.findall(rf"^{ENTITY_MARKER} (\S+)$", messages[-1].content, re.MULTILINE)
+        with self._lock:
+            self.requested.append(entity_ids)
+            roll = self.rng.random()
+            dropped = {entity_id for entity_id in entity_ids if self.rng.random() < self.drop_rate}
+        if roll < self.error_rate / 2:
+            raise RateLimitError("429 rate limited")  # retried by the scheduler
+        if roll < self.error_rate:
+            raise ValueError("malformed response")  # retried by the job on its next attempt
+        return FakeResponse("\n".join(f"{ENTITY_MARKER} {entity_id}\nAdvice for {entity_id}."
+                                      for entity_id in entity_ids if entity_id not in dropped))
+
+
+def flagged_entities(count):
+    # A material unclassified account flags every entity for LLM review
+    return {f"E{i}": {"balance_sheet": {"Cash": 100000.0 + i, "Mystery account": 50000.0}} for i in range(count)}
+
+
+def make_job(store_path, llm, max_attempts=10):
+    scheduler = LLMScheduler(requests_per_minute=100000, tokens_per_minute=10 ** 9, base_delay=0.001,
+                             max_delay=0.01)
+    advisor = ZakatComplianceAdvisor(llm=llm, scheduler=scheduler)
+    return BatchAdvisoryJob(AdvisoryResultStore(str(store_path)), advisor=advisor, pack_size=4,
+                            max_attempts=max_attempts)
+
+
+def test_random_errors_and_dropped_entities_are_retried(tmp_path):
+    entities = flagged_entities(40)
+    llm = FakeLLM(seed=1, error_rate=0.3, drop_rate=0.2)
+    job = make_job(tmp_path / "results.jsonl", llm)
+
+    results = job.run(entities)
+
+    assert set(results) == set(entities)
+    assert job.failures == {}
+    assert all(record["advice"] == f"Advice for {entity_id}." for entity_id, record in results.items())
+    assert all(record["source"] == "llm" for record in results.values())
+
+
+def test_entity_dropped_on_every_attempt_is_reported(tmp_path):
+    llm = FakeLLM(drop_rate=1.0)
+    job = make_job(tmp_path / "results.jsonl", llm, max_attempts=2)
+
+    results = job.run(flagged_entities(3))
+
+    assert results == {}
+    assert set(job.failures) == {"E0", "E1", "E2"}
+    assert all(message == "missing from packed response" for message in job.failures.values())
+
+
+def test_truncated_final_line_is_redone(tmp_path):
+    path = tmp_path / "results.jsonl"
+    complete = {"entity_id": "E0", "zakat_amount": 2500.0, "advice": "Stored advice.", "source": "llm",
+                "completed_at": "2025-01-01T00:00:00"}
+    path.write_text(json.dumps(complete) + "\n" + '{"entity_id": "E1", "zakat_am', encoding="utf-8")
+    llm = FakeLLM()
+    job = make_job(path, llm)
+
+    results = job.run(flagged_entities(2))
+
+    assert [entity_ids for entity_ids in llm.requested] == [["E1"]]
+    assert results["E0"]["advice"] == "Stored advice."
+    assert results["E1"]["advice"] == "Advice for E1."
+    # The reloaded store sees both entities despite the partial line left in the file
+    assert set(AdvisoryResultStore(str(path)).results()) == {"E0", "E1"}
+
+
+def test_restart_skips_stored_entities(tmp_path):
+    path = tmp_path / "results.jsonl"
+    entities = flagged_entities(10)
+    first = FakeLLM(drop_rate=0.5, seed=3)
+    make_job(path, first, max_attempts=1).run(entities)
+    stored = set(AdvisoryResultStore(str(path)).results())
+    assert 0 < len(stored) < len(entities)
+
+    second = FakeLLM()
+    results = make_job(path, second).run(entities)
+
+    requested = {entity_id for entity_ids in second.requested for entity_id in entity_ids}
+    assert requested == set(entities) - stored
+    assert set(results) == set(entities)
+
+
+def test_routine_entities_do_not_call_the_llm(tmp_path):
+    llm = FakeLLM()
+    routine = {"R0": {"balance_sheet": {"Cash at bank": 500000.0, "Accounts payable": 20000.0}}}
+
+    results = make_job(tmp_path / "results.jsonl", llm).run(routine)
+
+    assert llm.requested == []
+    assert results["R0"]["source"] == "rules"
+
+
+@pytest.fixture(autouse=True)
+def _no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
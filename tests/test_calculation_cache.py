@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from calculation_cache import CachedZakatCalculator, CalculationStore, calculation_key
+from zakat_calculator import ZakatCalculator, ZakatDocumentGenerator
+
+FINANCIAL_DATA = {"balance_sheet": {"Cash at bank": 120000, "Accounts payable": 20000}}
+
+
+class CountingCalculator(ZakatCalculator):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def calculate_zakat_amount(self, financial_data):
+        self.calls += 1
+        return super().calculate_zakat_amount(financial_data)
+
+
+class CountingDocuments(ZakatDocumentGenerator):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_zakat_certificate(self, entity_info, calculation_results, filename=None):
+        self.calls += 1
+        return super().generate_zakat_certificate(entity_info, calculation_results, filename)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CalculationStore(str(tmp_path / "store"))
+
+
+def test_identical_inputs_are_served_from_the_store(store):
+    calculator = CountingCalculator()
+    cached = CachedZakatCalculator(calculator, store)
+    first = cached.calculate_zakat_amount(FINANCIAL_DATA)
+    # Equal values in another key order and number type hash the same
+    again = cached.calculate_zakat_amount({"balance_sheet": {"Accounts payable": 20000.0, "Cash at bank": 120000.0}})
+    assert again == first
+    assert calculator.calls == 1
+
+    changed = cached.calculate_zakat_amount({"balance_sheet": {"Cash at bank": 130000}})
+    assert changed["zakat_base"] == 130000
+    assert calculator.calls == 2
+
+
+def test_new_prices_invalidate_results(store):
+    current = CachedZakatCalculator(CountingCalculator(), store)
+    repriced = CachedZakatCalculator(CountingCalculator(metal_prices={"gold_per_gram": 100, "silver_per_gram": 1}),
+                                     store)
+    assert current.key_for(FINANCIAL_DATA) != repriced.key_for(FINANCIAL_DATA)
+
+    current.calculate_zakat_amount(FINANCIAL_DATA)
+    assert repriced.changed_entities({"A": FINANCIAL_DATA}) == ["A"]
+    result = repriced.calculate_zakat_amount(FINANCIAL_DATA)
+    assert result["nisab_value"] == 8500
+    assert repriced.calculator.calls == 1
+
+
+def test_key_uses_the_calculator_price_snapshot():
+    calculator = ZakatCalculator()
+    assert CachedZakatCalculator(calculator, None).key_for(FINANCIAL_DATA) == \
+        calculation_key(FINANCIAL_DATA, calculator.standard, calculator.metal_prices)
+
+
+def test_audit_chain_detects_tampering(store):
+    cached = CachedZakatCalculator(ZakatCalculator(), store)
+    cached.calculate_portfolio({"A": FINANCIAL_DATA, "B": {"balance_sheet": {"Cash": 50000}}})
+    assert store.verify() == []
+
+    key = cached.key_for(FINANCIAL_DATA)
+    with open(store._object_path(key, ".json"), "w", encoding="utf-8") as f:
+        f.write('{"zakat_amount": 0}')
+    assert store.verify() == [f"result {key} does not match audit trail"]
+
+
+def test_audit_log_edits_break_the_chain(store, tmp_path):
+    cached = CachedZakatCalculator(ZakatCalculator(), store)
+    cached.calculate_zakat_amount(FINANCIAL_DATA)
+    cached.calculate_zakat_amount({"balance_sheet": {"Cash": 50000}})
+
+    db = sqlite3.connect(str(tmp_path / "store" / "index.sqlite3"))
+    db.execute("UPDATE audit SET recorded_at = '2000-01-01T00:00:00' WHERE seq = 1")
+    db.commit()
+    db.close()
+    assert "audit chain broken at entry 1" in store.verify()
+
+
+def test_certificates_are_stored_with_the_calculation(store, tmp_path):
+    cached = CachedZakatCalculator(CountingCalculator(), store)
+    documents = CountingDocuments()
+    entity_info = {"name": "Trading Co", "zakat_year": "1447 AH"}
+
+    first = cached.certificate(entity_info, FINANCIAL_DATA, documents, str(tmp_path / "first.pdf"))
+    second = cached.certificate(entity_info, FINANCIAL_DATA, documents, str(tmp_path / "second.pdf"))
+    with open(first, "rb") as f, open(second, "rb") as g:
+        assert f.read() == g.read()
+    assert documents.calls == 1
+    assert cached.calculator.calls == 1
+
+    cached.certificate(dict(entity_info, name="Other Co"), FINANCIAL_DATA, documents, str(tmp_path / "other.pdf"))
+    assert documents.calls == 2
@@ -0,0 +1,107 @@
+import pytest
+
+from consolidation import GroupConsolidator
+
+
+def ledger(cash, receivables=0.0, payables=0.0, intercompany=None):
+    return {"balance_sheet": {"Cash at bank": cash, "Trade receivables": receivables, "Trade payables": payables},
+            "intercompany": intercompany or {}}
+
+
+def group(a_receivable=1000.0, b_payable=1000.0):
+    """
+    P owns A and B; A reports a receivable from B and B a payable to A
+    """
+    return GroupConsolidator.from_hierarchy({
+        "entity_id": "P", "financial_data": ledger(50000.0),
+        "children": [
+            {"entity_id": "A",
+             "financial_data": ledger(20000.0, receivables=a_receivable,
+                                      intercompany={"receivables": {"B": a_receivable}} if a_receivable else None)},
+            {"entity_id": "B",
+             "financial_data": ledger(30000.0, payables=b_payable,
+                                      intercompany={"payables": {"A": b_payable}} if b_payable else None)}
+        ]
+    })
+
+
+def test_matched_pair_is_eliminated_at_the_common_parent():
+    consolidator = group()
+    result = consolidator.consolidate()
+    assert result["total_zakatable_assets"] == 100000.0
+    assert result["total_deductible_liabilities"] == 0.0
+    assert result["eliminated_intercompany"] == {"receivables": 1000.0, "payables": 1000.0}
+    assert result["unmatched_intercompany"] == 0
+    assert consolidator.intercompany_differences() == []
+
+    # Each subsidiary on its own keeps its side of the balance
+    assert consolidator.consolidate("A")["total_zakatable_assets"] == 21000.0
+    assert consolidator.consolidate("B")["total_deductible_liabilities"] == 1000.0
+
+
+@pytest.mark.parametrize("a_receivable, b_payable", [(1000.0, 0.0), (0.0, 1000.0)])
+def test_one_sided_balances_are_reported_not_eliminated(a_receivable, b_payable):
+    consolidator = group(a_receivable, b_payable)
+    result = consolidator.consolidate()
+    assert result["eliminated_intercompany"] == {"receivables": 0, "payables": 0}
+    assert result["total_zakatable_assets"] == 100000.0 + a_receivable
+    assert result["total_deductible_liabilities"] == b_payable
+    assert result["unmatched_intercompany"] == 1000.0
+    [difference] = consolidator.intercompany_differences()
+    assert (difference["receivable_entity"], difference["payable_entity"]) == ("A", "B")
+    assert difference["difference"] == a_receivable - b_payable
+
+
+def test_mismatched_pair_eliminates_only_the_agreed_amount():
+    result = group(1000.0, 800.0).consolidate()
+    assert result["eliminated_intercompany"] == {"receivables": 800.0, "payables": 800.0}
+    assert result["total_zakatable_assets"] == 100200.0
+    assert result["total_deductible_liabilities"] == 0.0
+    assert result["unmatched_intercompany"] == 200.0
+
+
+def deep_group(depth, width):
+    """
+    A root with width branches, each a chain of depth entities
+    """
+    root = {"entity_id": "root", "financial_data": ledger(1000.0), "children": []}
+    for branch in range(width):
+        parent = root
+        for level in range(depth):
+            node = {"entity_id": f"b{branch}-{level}", "financial_data": ledger(100.0 * (level + 1)), "children": []}
+            parent["children"].append(node)
+            parent = node
+    return root
+
+
+def test_update_recomputes_only_the_path_to_the_root():
+    hierarchy = deep_group(depth=4, width=5)
+    consolidator = GroupConsolidator.from_hierarchy(hierarchy)
+    consolidator.consolidate()
+    assert consolidator.recomputed_nodes == 21
+
+    leaf = ledger(5000.0, receivables=700.0, intercompany={"receivables": {"b0-3": 700.0}})
+    consolidator.update_entity("b3-3", leaf)
+    consolidator.update_entity("b0-3", ledger(400.0, payables=700.0, intercompany={"payables": {"b3-3": 700.0}}))
+    result = consolidator.consolidate()
+    # Two leaves, their three ancestors each and the shared root
+    assert consolidator.recomputed_nodes == 21 + 9
+
+    fresh = GroupConsolidator.from_hierarchy(hierarchy)
+    fresh.update_entity("b3-3", leaf)
+    fresh.update_entity("b0-3", ledger(400.0, payables=700.0, intercompany={"payables": {"b3-3": 700.0}}))
+    expected = fresh.consolidate()
+    for key in ("total_zakatable_assets", "total_deductible_liabilities", "eliminated_intercompany",
+                "unmatched_intercompany"):
+        assert result[key] == expected[key]
+    assert result["eliminated_intercompany"]["receivables"] == 700.0
+
+
+def test_dropping_one_side_stops_the_elimination():
+    consolidator = group()
+    consolidator.consolidate()
+    consolidator.update_entity("B", ledger(30000.0))
+    result = consolidator.consolidate()
+    assert result["eliminated_intercompany"]["receivables"] == 0
+    assert result["unmatched_intercompany"] == 1000.0
+    assert result["total_zakatable_assets"] == 101000.0
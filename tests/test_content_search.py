@@ -0,0 +1,86 @@
+import pytest
+
+from content_search import ContentStore, compile_content_store, normalize_arabic, tokenize
+
+STANDARDS = {
+    "FAS 4": {"title_en": "Musharaka Financing", "title_ar": "التمويل بالمشاركة",
+              "description_en": "Partnership where profits are shared by agreement and losses by capital.",
+              "description_ar": "شراكة تُوزَّع فيها الأرباح حسب الاتفاق والخسائر حسب رأس المال."},
+    "FAS 8": {"title_en": "Ijarah", "title_ar": "الإجارة",
+              "description_en": "Leasing of assets for rent, with or without transfer of ownership.",
+              "description_ar": "تأجير الأصول مقابل أجرة مع نقل الملكية أو بدونه."}
+}
+EXAMPLES = {
+    "FAS 8": {"title_en": "Equipment lease", "title_ar": "إجارة معدات",
+              "scenario_en": "A bank leases equipment to a customer for monthly rent.",
+              "scenario_ar": "يؤجر البنك معدات لعميل مقابل أجرة شهرية."}
+}
+GLOSSARY = {"Ijarah": {"en": "A lease contract.", "ar": "عقد إجارة."}}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("أحمد", "احمد"),  # Alef with hamza above
+    ("إجارة", "اجاره"),  # Alef with hamza below and taa marbuta
+    ("آمن", "امن"),  # Alef with madda
+    ("مُشَارَكَة", "مشاركه"),  # Diacritics
+    ("مـــشاركة", "مشاركه"),  # Tatweel
+    ("على", "علي"),  # Alef maqsura
+])
+def test_normalize_arabic(text, expected):
+    assert normalize_arabic(text) == expected
+
+
+def test_tokenize_english_and_arabic():
+    assert tokenize("Musharaka: profits & losses (FAS 4)") == ["musharaka", "profits", "losses", "fas", "4"]
+    # The definite article, and conjunctions attached to it, are dropped
+    assert tokenize("الإجارة والمشاركة") == ["اجاره", "مشاركه"]
+    assert tokenize("الإجارة") == tokenize("إجارة")
+    # Two-letter words are not stripped down to a single letter
+    assert tokenize("ال") == ["ال"]
+
+
+@pytest.fixture
+def store():
+    return compile_content_store(STANDARDS, EXAMPLES, GLOSSARY)
+
+
+def test_bm25_ranks_the_most_relevant_english_document_first(store):
+    hits = store.search("lease rent equipment", language="en")
+    assert [hit.document.kind for hit in hits][:1] == ["example"]
+    assert all(hit.document.language == "en" for hit in hits)
+    assert hits[0].score > hits[-1].score
+    assert "leases equipment" in hits[0].snippet
+
+
+def test_bm25_matches_arabic_across_spelling_variants(store):
+    hits = store.search("اجارة", language="ar")
+    assert {hit.document.key for hit in hits} == {"FAS 8", "Ijarah"}
+    assert all(hit.document.language == "ar" for hit in hits)
+    assert store.search("المشاركة", language="ar", kinds={"standard"})[0].document.key == "FAS 4"
+
+
+def test_unknown_terms_find_nothing(store):
+    assert store.search("sukuk") == []
+    assert store.search("") == []
+
+
+def test_compiled_index_is_reused_as_json(tmp_path):
+    path = str(tmp_path / "content_store.json")
+    built = compile_content_store(STANDARDS, EXAMPLES, GLOSSARY, path=path)
+    loaded = compile_content_store(STANDARDS, EXAMPLES, GLOSSARY, path=path)
+    assert isinstance(loaded, ContentStore)
+    assert len(loaded) == len(built)
+    assert [(hit.document.doc_id, hit.score) for hit in loaded.search("lease")] == \
+        [(hit.document.doc_id, hit.score) for hit in built.search("lease")]
+
+    # Documents can still be added to a loaded index
+    loaded.add_document("explanation", "FAS 8", "en", "FAS 8", "Ijarah explained")
+    assert loaded.contains("explanation", "FAS 8", "en")
+
+
+def test_unreadable_compiled_index_is_rebuilt(tmp_path):
+    path = tmp_path / "content_store.json"
+    path.write_bytes(b"\x80\x04not json")
+    store = compile_content_store(STANDARDS, EXAMPLES, GLOSSARY, path=str(path))
+    assert len(store) == 8
+    assert compile_content_store(STANDARDS, EXAMPLES, GLOSSARY, path=str(path)).search("lease")
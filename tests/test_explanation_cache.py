@@ -0,0 +1,37 @@
+import pytest
+
+from translation import TranslationBackend
+
+
+def generated(explainer):
+    return [inputs["scenario"] for feature, inputs in explainer.calls]
+
+
+def test_different_scenarios_for_the_same_standard_are_not_shared(explainer):
+    first = explainer.get_explanation("FAS 4", "Musharaka", "Scenario one")
+    second = explainer.get_explanation("FAS 4", "Musharaka", "Scenario two")
+    assert first == "Explanation of Scenario one"
+    assert second == "Explanation of Scenario two"
+    assert explainer.get_explanation("FAS 4", "Musharaka", "Scenario one") == first
+    assert generated(explainer) == ["Scenario one", "Scenario two"]
+
+
+def test_explanations_without_a_standard_are_cached(explainer):
+    explainer.get_explanation(None, "Custom", "My scenario")
+    explainer.get_explanation(None, "Custom", "My scenario")
+    assert generated(explainer) == ["My scenario"]
+
+
+def test_scenario_key_lets_the_other_language_be_translated(explainer):
+    explainer.get_explanation("FAS 4", "Musharaka", "English scenario", "English", scenario_key="example")
+    arabic = explainer.get_explanation("FAS 4", "المشاركة", "سيناريو", "Arabic", scenario_key="example")
+    assert generated(explainer) == ["English scenario"]
+    assert arabic.startswith("[ar] ")
+
+
+def test_translation_backend_requires_translate_batch():
+    class Incomplete(TranslationBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,111 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from hawl_scheduler import HawlQueue, HawlScheduler, from_hijri, next_hawl_due, to_hijri
+
+
+def entity(cash, hawl_hijri, name):
+    return {"financial_data": {"balance_sheet": {"Cash at bank": cash}}, "hawl_hijri": hawl_hijri,
+            "entity_info": {"name": name}}
+
+
+@pytest.fixture(autouse=True)
+def _no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+
+def test_hijri_round_trip():
+    day = date(2020, 1, 1)
+    for offset in range(0, 3000, 7):
+        assert from_hijri(*to_hijri(day + timedelta(days=offset))) == day + timedelta(days=offset)
+    assert next_hawl_due(9, 1, date(2026, 1, 1)) >= date(2026, 1, 1)
+
+
+def test_certificates_are_not_overwritten(tmp_path):
+    # Two entities share a display name, and the first is run again for its next hawl
+    entities = {"A": entity(100000.0, [1, 10], "Same Name"), "B": entity(200000.0, [1, 10], "Same Name")}
+    queue = HawlQueue(str(tmp_path / "queue.jsonl"))
+    scheduler = HawlScheduler(queue, entities, daily_capacity=10, lead_days=5, horizon_days=400)
+    first_due = next_hawl_due(1, 10, date(2026, 1, 1))
+    second_due = next_hawl_due(1, 10, first_due + timedelta(days=1))
+
+    scheduler.run_day(first_due - timedelta(days=1))
+    scheduler.run_day(second_due - timedelta(days=1))
+
+    paths = [job["stages"]["certificate"]["path"] for job in queue.jobs() if "certificate" in job["stages"]]
+    assert len(paths) == 4
+    assert len(set(paths)) == 4
+    assert all(os.path.dirname(path) == str(tmp_path / "queue_certificates") for path in paths)
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_daily_capacity_spreads_a_shared_due_date(tmp_path):
+    entities = {f"E{i}": entity(100000.0, [12, 29], f"E{i}") for i in range(30)}
+    queue = HawlQueue(str(tmp_path / "queue.jsonl"))
+    scheduler = HawlScheduler(queue, entities, daily_capacity=5, lead_days=10, horizon_days=400)
+
+    today = next_hawl_due(12, 29, date(2026, 1, 1)) - timedelta(days=20)
+    planned = scheduler.schedule(today)
+
+    assert len(planned) == 30
+    assert max(queue.loads(today, 30)) <= 5
+    assert all(run_on < due for _, due, run_on in planned)
+
+
+def test_interrupted_job_resumes_at_the_failed_stage(tmp_path):
+    class FailingDocuments:
+        def generate_zakat_certificate(self, entity_info, calculation_results, filename=None):
+            raise OSError("disk full")
+
+    path = str(tmp_path / "queue.jsonl")
+    entities = {"A": entity(100000.0, [3, 15], "A")}
+    today = next_hawl_due(3, 15, date(2026, 1, 1)) - timedelta(days=1)
+
+    summary = HawlScheduler(HawlQueue(path), entities, doc_generator=FailingDocuments(),
+                            horizon_days=400).run_day(today)
+    assert summary["failed"] == 1
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"event": "done", "job": "A@')  # Crash mid-write
+
+    queue = HawlQueue(path)
+    [job] = queue.jobs()
+    assert list(job["stages"]) == ["calculation", "advisory"]
+
+    scheduler = HawlScheduler(queue, entities, horizon_days=400)
+    scheduler._calculation = lambda *args: pytest.fail("calculation should not be repeated")
+    assert scheduler.run_day(today)["completed"] == 1
+    assert len(HawlQueue(path).jobs()[0]["stages"]) == 3
+
+
+def test_advisor_errors_fail_the_advisory_stage(tmp_path):
+    class FlakyAdvisor:
+        def __init__(self, fail):
+            self.fail = fail
+
+        def get_compliance_advice(self, financial_data, calculation_results, findings=None):
+            return "Error generating compliance advice: rate limited" if self.fail else "Compliant."
+
+        def get_optimization_suggestions(self, financial_data, calculation_results, findings=None):
+            return "Pay early."
+
+    path = str(tmp_path / "queue.jsonl")
+    # The unclassified account is flagged for review, so the LLM advisor is asked
+    flagged = entity(100000.0, [5, 1], "A")
+    flagged["financial_data"]["balance_sheet"]["Suspense account"] = 50000.0
+    entities = {"A": flagged}
+    today = next_hawl_due(5, 1, date(2026, 1, 1)) - timedelta(days=1)
+
+    summary = HawlScheduler(HawlQueue(path), entities, llm_advisor=FlakyAdvisor(fail=True),
+                            horizon_days=400).run_day(today)
+    assert summary["failed"] == 1
+    [job] = HawlQueue(path).jobs()
+    assert list(job["stages"]) == ["calculation"]
+    assert "rate limited" in job["error"]
+
+    summary = HawlScheduler(HawlQueue(path), entities, llm_advisor=FlakyAdvisor(fail=False),
+                            horizon_days=400).run_day(today)
+    assert summary["completed"] == 1
+    [job] = HawlQueue(path).jobs()
+    assert job["stages"]["advisory"]["compliance"] == "Compliant."
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm_coalescing import prompt_key
+
+CALLERS = 8
+
+
+def wait_for_followers(flight, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while flight.coalesced_calls < count:
+        if time.monotonic() > deadline:
+            pytest.fail(f"only {flight.coalesced_calls} of {count} callers joined the call in flight")
+        time.sleep(0.001)
+
+
+def explain_concurrently(explainer):
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(explainer.get_explanation, "FAS 4", "Musharaka", "Scenario")
+                   for _ in range(CALLERS)]
+        return [future.exception() or future.result() for future in futures]
+
+
+def test_identical_concurrent_requests_share_one_upstream_call(explainer):
+    def reply(**inputs):
+        # Hold the leader until every other caller is waiting on it
+        wait_for_followers(explainer.flight, CALLERS - 1)
+        return "Shared explanation"
+
+    explainer.replies["explanation"] = reply
+    results = explain_concurrently(explainer)
+
+    assert results == ["Shared explanation"] * CALLERS
+    assert len(explainer.calls) == 1
+    assert explainer.flight.upstream_calls == 1
+    assert explainer.flight.in_flight() == 0
+
+
+def test_upstream_error_reaches_every_waiter(explainer):
+    def reply(**inputs):
+        wait_for_followers(explainer.flight, CALLERS - 1)
+        raise RuntimeError("provider unavailable")
+
+    explainer.replies["explanation"] = reply
+    results = explain_concurrently(explainer)
+
+    assert all(isinstance(result, RuntimeError) and str(result) == "provider unavailable" for result in results)
+    assert len(explainer.calls) == 1
+    assert explainer.flight.in_flight() == 0
+
+    # Nothing is kept after a failure, so the next request goes upstream again
+    explainer.replies["explanation"] = lambda **inputs: "Recovered"
+    assert explainer.get_explanation("FAS 4", "Musharaka", "Scenario") == "Recovered"
+    assert len(explainer.calls) == 2
+
+
+def test_prompt_key_covers_model_settings_and_prompt():
+    class Model:
+        def __init__(self, model_name, temperature):
+            self.model_name = model_name
+            self.temperature = temperature
+
+    key = prompt_key(Model("fast", 0.0), "prompt")
+    assert prompt_key(Model("fast", 0.0), "prompt") == key
+    assert prompt_key(Model("quality", 0.0), "prompt") != key
+    assert prompt_key(Model("fast", 0.7), "prompt") != key
+    assert prompt_key(Model("fast", 0.0), "other prompt") != key
@@ -0,0 +1,68 @@
+import pytest
+
+from llm_router import ModelRouter, ModelTier, default_router_config
+
+
+@pytest.fixture
+def router():
+    return ModelRouter.from_config(default_router_config(), scheduler=object())
+
+
+@pytest.mark.parametrize("feature", ["compliance_advice", "optimization", "advisory"])
+def test_zakat_advisor_features_stay_on_fast_tier(router, feature):
+    assert router.select(feature, "x" * 20000).name == "fast"
+
+
+def test_explanations_and_long_questions_use_quality_tier(router):
+    assert router.select("explanation", "short").name == "quality"
+    assert router.select("custom_question", "x" * 4000).name == "quality"
+    assert router.select("custom_question", "short question").name == "fast"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class InlineScheduler:
+    def run(self, fn, priority=None, tokens=0):
+        return fn()
+
+
+@pytest.fixture
+def budget_router():
+    tiers = [ModelTier("quality", "quality-model", timeout=10.0, latency_budget=2.0, fallback="fast",
+                       chat_model="quality"),
+             ModelTier("fast", "fast-model", chat_model="fast")]
+    return ModelRouter(tiers, scheduler=InlineScheduler(), min_samples=5, probe_every=10,
+                       window_seconds=60.0, clock=FakeClock())
+
+
+def call(router, seconds=0.5, error=None):
+    def invoke(chat_model):
+        router.clock.now += seconds
+        if error is not None and chat_model == "quality":
+            raise error
+        return chat_model
+    return router.run("explanation", "prompt", invoke)
+
+
+def test_tier_recovers_after_a_burst_of_slow_calls(budget_router):
+    for _ in range(5):
+        assert call(budget_router, seconds=8.0) == "quality"
+    assert budget_router.route("explanation", "prompt").name == "fast"
+
+    # Once the slow calls have aged out of the window the tier is used again
+    budget_router.clock.now += 61.0
+    assert call(budget_router) == "quality"
+    assert budget_router.metrics()["quality"]["p95_seconds"] == 0.5
+
+
+def test_timeout_counts_as_the_tier_timeout(budget_router):
+    assert call(budget_router, seconds=0.1, error=TimeoutError()) == "fast"
+    metrics = budget_router.metrics()["quality"]
+    assert metrics["timeouts"] == 1
+    assert metrics["max_seconds"] == 10.0
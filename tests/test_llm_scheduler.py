@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, TokenBucket, is_retryable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class NoJitter:
+    """
+    Records the backoff ceilings and retries straight away
+    """
+    def __init__(self):
+        self.ceilings = []
+
+    def uniform(self, low, high):
+        self.ceilings.append(high)
+        return 0.0
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not reached")
+        time.sleep(0.001)
+
+
+def settled_metrics(scheduler):
+    """
+    Metrics once the worker threads have finished their bookkeeping
+    """
+    wait_until(lambda: scheduler.metrics()["in_flight"] == 0)
+    return scheduler.metrics()
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (RateLimitError("slow down"), True),
+    (ProviderError(429), True),
+    (ProviderError(503), True),
+    (ProviderError(400), False),
+    (Exception("HTTP 429 Too Many Requests"), True),
+    (ValueError("bad prompt"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_token_bucket_refills_at_capacity_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.consume(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now += 600
+    assert bucket.wait_time(60) == 0.0
+    # Requests larger than the bucket are capped at its capacity instead of waiting forever
+    assert bucket.wait_time(1000) == 0.0
+
+
+def test_interactive_jobs_overtake_queued_batch_jobs():
+    scheduler = LLMScheduler(max_concurrency=1, clock=FakeClock())
+    release = threading.Event()
+    order = []
+    blocker = scheduler.submit(lambda: release.wait(5))
+    wait_until(lambda: scheduler.metrics()["in_flight"] == 1)
+
+    batch = scheduler.submit(lambda: order.append("batch"), priority=BATCH)
+    interactive = scheduler.submit(lambda: order.append("interactive"), priority=INTERACTIVE)
+    assert scheduler.metrics()["queue_depth_by_priority"] == {"interactive": 1, "batch": 1}
+    release.set()
+
+    for future in (blocker, batch, interactive):
+        future.result(timeout=5)
+    assert order == ["interactive", "batch"]
+
+
+@pytest.mark.parametrize("requests_per_minute, tokens_per_minute, tokens", [
+    (2, 100000, 10),  # Held by the request bucket
+    (1000, 1000, 500)  # Held by the token bucket
+])
+def test_buckets_hold_jobs_until_they_refill(requests_per_minute, tokens_per_minute, tokens):
+    clock = FakeClock()
+    scheduler = LLMScheduler(requests_per_minute, tokens_per_minute, clock=clock)
+    futures = [scheduler.submit(lambda: "done", tokens=tokens) for _ in range(3)]
+    assert [future.result(timeout=5) for future in futures[:2]] == ["done", "done"]
+    assert scheduler.metrics()["queue_depth"] == 1
+    assert not futures[2].done()
+
+    # Half a minute refills one request (or half the tokens); a new submission wakes the dispatcher
+    clock.now += 30
+    late = scheduler.submit(lambda: "late", tokens=tokens)
+    assert futures[2].result(timeout=5) == "done"
+    assert scheduler.metrics()["queue_depth"] == 1
+    assert not late.done()
+
+
+def test_transient_errors_are_retried_with_jittered_backoff():
+    rng = NoJitter()
+    scheduler = LLMScheduler(base_delay=1.0, max_delay=3.0, clock=FakeClock(), rng=rng)
+    attempts = []
+
+    def flaky():
+        attempts.append(len(attempts))
+        if len(attempts) < 4:
+            raise ProviderError(503 if len(attempts) % 2 else 429)
+        return "ok"
+
+    assert scheduler.run(flaky) == "ok"
+    assert len(attempts) == 4
+    assert rng.ceilings == [1.0, 2.0, 3.0]  # Doubling, capped at max_delay
+    metrics = settled_metrics(scheduler)
+    assert (metrics["submitted"], metrics["completed"], metrics["failed"], metrics["retries"]) == (1, 1, 0, 3)
+
+
+def test_retries_stop_after_max_retries():
+    scheduler = LLMScheduler(max_retries=2, clock=FakeClock(), rng=NoJitter())
+    attempts = []
+
+    def rate_limited():
+        attempts.append(1)
+        raise RateLimitError("slow down")
+
+    with pytest.raises(RateLimitError):
+        scheduler.run(rate_limited)
+    assert len(attempts) == 3
+    metrics = settled_metrics(scheduler)
+    assert (metrics["completed"], metrics["failed"], metrics["retries"]) == (0, 1, 2)
+
+
+def test_permanent_errors_are_not_retried():
+    scheduler = LLMScheduler(clock=FakeClock(), rng=NoJitter())
+    attempts = []
+
+    def bad_request():
+        attempts.append(1)
+        raise ProviderError(400)
+
+    with pytest.raises(ProviderError):
+        scheduler.run(bad_request)
+    assert len(attempts) == 1
+    assert settled_metrics(scheduler)["retries"] == 0
+
+
+def test_metrics_report_queue_waits_by_priority():
+    clock = FakeClock()
+    scheduler = LLMScheduler(clock=clock)
+    scheduler.run(lambda: None, priority=INTERACTIVE)
+    scheduler.run(lambda: None, priority=BATCH)
+    scheduler.run(lambda: None, priority=BATCH)
+
+    metrics = settled_metrics(scheduler)
+    assert metrics["submitted"] == metrics["completed"] == 3
+    assert metrics["queue_depth"] == 0
+    assert metrics["in_flight"] == 0
+    assert metrics["wait_time"]["interactive"]["count"] == 1
+    assert metrics["wait_time"]["batch"]["count"] == 2
+    assert metrics["wait_time"]["batch"]["max_seconds"] == 0.0
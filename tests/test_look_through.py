@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from look_through import IssuerFundamentals, LookThroughCalculator, LOOK_THROUGH, NO_FUNDAMENTALS
+
+
+def make_fundamentals():
+    return IssuerFundamentals(pd.DataFrame({
+        "issuer_id": ["A", "A", "B"],
+        "as_of": ["2025-04-10", "2025-07-19", "2025-02-19"],
+        "zakatable_assets": [1000.0, 2000.0, 500.0],
+        "shares_outstanding": [100.0, 100.0, 100.0]
+    }))
+
+
+def test_date_before_first_report_of_first_issuer_has_no_fundamentals():
+    fundamentals = make_fundamentals()
+    per_share = dict(zip(fundamentals.issuers, fundamentals.per_share_on("2025-03-01")))
+    assert np.isnan(per_share["A"])
+    assert per_share["B"] == 5.0
+
+
+def test_as_of_join_picks_latest_report_on_or_before_date():
+    fundamentals = make_fundamentals()
+    per_share = dict(zip(fundamentals.issuers, fundamentals.per_share_on("2025-05-01")))
+    assert per_share["A"] == 10.0
+    per_share = dict(zip(fundamentals.issuers, fundamentals.per_share_on("2025-07-19")))
+    assert per_share["A"] == 20.0
+
+
+def test_position_without_usable_report_falls_back_to_market_value():
+    positions = pd.DataFrame({"issuer_id": ["A", "B"], "quantity": [10.0, 10.0], "market_value": [300.0, 70.0]})
+    valued = LookThroughCalculator(make_fundamentals()).apply(positions, "2025-03-01")
+    assert list(valued["valuation"]) == [NO_FUNDAMENTALS, LOOK_THROUGH]
+    assert list(valued["zakatable_amount"]) == [300.0, 50.0]
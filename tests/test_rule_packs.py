@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from rule_packs import RulePackRegistry
+
+BUILTIN = {
+    "id": "FAS_9", "version": "1", "rate": 0.025, "nisab_gold": 85, "nisab_silver": 595,
+    "classification_rules": [{"category": "zakatable_assets", "keywords": ["cash"]}]
+}
+
+
+def write_pack(path, version, pack_id="NATIONAL", rate=0.025, mtime=None):
+    definition = dict(BUILTIN, id=pack_id, version=version, rate=rate)
+    path.write_text(json.dumps(definition), encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = RulePackRegistry(str(tmp_path), check_interval=0)
+    registry.register(BUILTIN)
+    return registry
+
+
+def test_version_bump_keeps_pinned_older_version(registry, tmp_path):
+    path = tmp_path / "national.json"
+    write_pack(path, "1", mtime=1_000_000_000)
+    assert registry.get("NATIONAL").version == "1"
+
+    write_pack(path, "2", rate=0.03, mtime=2_000_000_000)
+    assert registry.get("NATIONAL").version == "2"
+    assert registry.resolve("NATIONAL@1").rate == 0.025
+    assert registry.available()["NATIONAL"] == ["2"]
+
+
+def test_deleted_pack_file_stays_resolvable_when_pinned(registry, tmp_path):
+    path = tmp_path / "national.json"
+    write_pack(path, "1")
+    registry.refresh(force=True)
+    path.unlink()
+    with pytest.raises(KeyError):
+        registry.get("NATIONAL")
+    assert registry.get("NATIONAL", "1").version == "1"
+
+
+def test_file_cannot_shadow_or_remove_builtin(registry, tmp_path):
+    path = tmp_path / "fas9.json"
+    write_pack(path, "1", pack_id="FAS_9", rate=0.5)
+    assert registry.get("FAS_9").rate == 0.025
+    assert str(path) in registry.errors
+
+    path.unlink()
+    assert registry.get("FAS_9").rate == 0.025
+    assert registry.available() == {"FAS_9": ["1"]}
+
+
+@pytest.mark.parametrize("keywords", [[], [""], ["loan", ""]])
+def test_rule_without_keywords_is_rejected(registry, keywords):
+    definition = dict(BUILTIN, id="EMPTY",
+                      classification_rules=[{"category": "zakatable_assets", "keywords": keywords}])
+    with pytest.raises(ValueError, match="non-empty keywords"):
+        registry.register(definition)
@@ -0,0 +1,49 @@
+import pytest
+
+from zakat_core import ZakatCalculator
+from zakat_methods import METHODS, MultiMethodZakatEngine
+
+ENTITIES = {
+    "trader": {"balance_sheet": {"Cash at bank": 250000.0, "Trade receivables": 120000.0, "Inventory": 80000.0,
+                                 "Accounts payable": 60000.0, "Long term loan": 150000.0,
+                                 "Paid-up capital": 200000.0, "Retained earnings": 40000.0}},
+    "holding": {"balance_sheet": {"Cash": 40000.0, "Equipment": 900000.0, "Share capital": 500000.0,
+                                  "Statutory reserve": 75000.0, "Tax payable": 10000.0}},
+    "small": {"balance_sheet": {"Cash": 1000.0}},
+    "empty": {"balance_sheet": {}}
+}
+
+
+@pytest.fixture
+def engine():
+    return MultiMethodZakatEngine(ZakatCalculator())
+
+
+def test_batch_matches_per_entity_calculation(engine):
+    batch = engine.calculate_batch(ENTITIES)
+    assert batch.entity_ids == list(ENTITIES)
+
+    for index, (entity_id, financial_data) in enumerate(ENTITIES.items()):
+        single = engine.calculate(financial_data)
+        for i, method in enumerate(engine.methods):
+            expected = single["methods"][method.name]
+            assert batch.bases[index, i] == pytest.approx(expected["zakat_base"]), (entity_id, method.name)
+            assert bool(batch.exceeds_nisab[index, i]) == expected["exceeds_nisab"], (entity_id, method.name)
+            assert batch.amounts[index, i] == pytest.approx(expected["zakat_amount"]), (entity_id, method.name)
+
+
+def test_net_assets_method_matches_the_calculator(engine):
+    calculator = engine.calculator
+    batch = engine.calculate_batch(ENTITIES)
+    column = [method.name for method in engine.methods].index("net_assets")
+
+    for index, financial_data in enumerate(ENTITIES.values()):
+        result = calculator.calculate_zakat_amount(financial_data)
+        assert batch.bases[index, column] == pytest.approx(result["zakat_base"])
+        assert batch.amounts[index, column] == pytest.approx(result["zakat_amount"])
+
+
+def test_every_method_is_compared(engine):
+    table = engine.comparison_table(ENTITIES["trader"])
+    assert len(table) == len(METHODS)
+    assert table.iloc[0, -1] == 0
@@ -0,0 +1,27 @@
+import pytest
+
+from zakat_calculator import ZakatCalculator
+from zakat_results import ZakatResultSet
+
+
+def make_result_set():
+    entities = {
+        "small": {"balance_sheet": {"Cash": 1000.0}},
+        "large": {"balance_sheet": {"Cash": 500000.0, "Accounts payable": 20000.0}}
+    }
+    return ZakatResultSet.from_portfolio(ZakatCalculator(), entities)
+
+
+def test_negative_index_reads_the_last_entity():
+    result_set = make_result_set()
+    last = result_set[-1]
+    assert last.entity_id == "large"
+    assert last.zakat_base == 480000.0
+    assert last.classified_accounts()["deductible_liabilities"] == {"Accounts payable": 20000.0}
+    assert result_set[-2].entity_id == "small"
+
+
+@pytest.mark.parametrize("index", [2, 100, -3])
+def test_out_of_range_index_raises(index):
+    with pytest.raises(IndexError):
+        make_result_set()[index]
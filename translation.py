@@ -0,0 +1,148 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+
+# Markdown prefixes kept verbatim so only the prose is sent for translation
+SEGMENT_PREFIX = re.compile(r"^(\s*(?:#{1,6}\s+|[-*+]\s+|\d+[.)]\s+|>\s+)*)(.*?)(\s*)$")
+HAS_LETTERS = re.compile(r"[^\W\d_]", re.UNICODE)
+
+
+class TranslationBackend(ABC):
+    """
+    Interface for machine translation services
+    """
+    @abstractmethod
+    def translate_batch(self, texts, src, dest):
+        """
+        Translations of texts from src to dest, in the same order
+        """
+
+
+class GoogleTranslateBackend(TranslationBackend):
+    """
+    googletrans-based backend; sends each batch as one request
+    """
+    def __init__(self, translator=None):
+        if translator is None:
+            from googletrans import Translator
+            translator = Translator()
+        self.translator = translator
+
+    def translate_batch(self, texts, src, dest):
+        results = self.translator.translate(list(texts), src=src, dest=dest)
+        return [result.text for result in results]
+
+
+class LocalTranslationBackend(TranslationBackend):
+    """
+    Offline stand-in for tests and development: uses a phrase table when it knows the segment,
+    otherwise returns the segment tagged with the target language
+    """
+    def __init__(self, phrases=None):
+        self.phrases = phrases or {}
+        self.calls = 0
+        self.segments = 0
+
+    def translate_batch(self, texts, src, dest):
+        self.calls += 1
+        self.segments += len(texts)
+        return [self.phrases.get((text, dest), f"[{dest}] {text}") for text in texts]
+
+
+class TranslationMemory:
+    """
+    Persistent segment-level translation memory backed by SQLite
+    """
+    def __init__(self, path=":memory:"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                src TEXT NOT NULL, dest TEXT NOT NULL, source_hash TEXT NOT NULL,
+                source TEXT NOT NULL, translation TEXT NOT NULL,
+                PRIMARY KEY (src, dest, source_hash)
+            )
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def lookup(self, segments, src, dest):
+        """
+        {segment: translation} for every segment already in memory
+        """
+        found = {}
+        hashes = {self._hash(segment): segment for segment in segments}
+        keys = list(hashes)
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT source_hash, translation FROM segments WHERE src = ? AND dest = ? "
+                    f"AND source_hash IN ({','.join('?' * len(chunk))})",
+                    (src, dest, *chunk)
+                ).fetchall()
+                for source_hash, translation in rows:
+                    found[hashes[source_hash]] = translation
+        return found
+
+    def store(self, pairs, src, dest):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO segments (src, dest, source_hash, source, translation) VALUES (?, ?, ?, ?, ?)",
+                [(src, dest, self._hash(source), source, translation) for source, translation in pairs]
+            )
+            self._db.commit()
+
+
+class TranslationPipeline:
+    """
+    Translates generated explanations segment by segment.
+
+    Text is split into lines, markdown prefixes and non-prose lines are kept as-is, segments
+    already in the translation memory are reused, and only the remaining ones are sent to the
+    backend in batches.
+    """
+    def __init__(self, backend, memory=None, batch_size=25):
+        self.backend = backend
+        self.memory = memory or TranslationMemory()
+        self.batch_size = batch_size
+
+    def translate(self, text, src, dest):
+        if src == dest or not text:
+            return text
+
+        lines = text.split("\n")
+        parsed = []
+        segments = []
+        for line in lines:
+            prefix, body, suffix = SEGMENT_PREFIX.match(line).groups()
+            translatable = bool(HAS_LETTERS.search(body))
+            parsed.append((prefix, body, suffix, translatable))
+            if translatable:
+                segments.append(body)
+
+        translations = self.translate_segments(segments, src, dest)
+        return "\n".join(
+            prefix + (translations[body] if translatable else body) + suffix
+            for prefix, body, suffix, translatable in parsed
+        )
+
+    def translate_segments(self, segments, src, dest):
+        """
+        {segment: translation} for the given segments, filling gaps in memory from the backend
+        """
+        unique = list(dict.fromkeys(segments))
+        translations = self.memory.lookup(unique, src, dest)
+        missing = [segment for segment in unique if segment not in translations]
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            translated = self.backend.translate_batch(batch, src, dest)
+            pairs = list(zip(batch, translated))
+            self.memory.store(pairs, src, dest)
+            translations.update(pairs)
+        return translations
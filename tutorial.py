@@ -1,12 +1,18 @@
 import os
+import hashlib
+import csv
 import streamlit as st
 from dotenv import load_dotenv
 from langchain.llms import OpenAI
-from langchain.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate, ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain.memory import ConversationBufferMemory
-from googletrans import Translator
+from llm_coalescing import default_flight, prompt_key
+from llm_scheduler import get_scheduler, estimate_tokens, INTERACTIVE, BATCH
+from llm_router import get_router
+from content_search import compile_content_store
+from translation import TranslationPipeline, TranslationMemory, GoogleTranslateBackend
+from answer_grading import AnswerPreScorer, BulkGrader
 
 # Load environment variables
 load_dotenv()
@@ -16,9 +22,6 @@ os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 if not os.getenv("OPENAI_API_KEY"):
     os.environ["OPENAI_API_KEY"] = st.secrets["openai_api_key"]
 
-# Initialize translator
-translator = Translator()
-
 # Define AAOIFI standards dictionary (simplified versions)
 standards = {
     "FAS 4": {
@@ -156,9 +159,27 @@ examples = {
 }
 
 class IslamicFinanceStandardsExplainer:
-    def __init__(self):
-        # Initialize language model
-        self.chat_model = ChatOpenAI(model_name="gpt-4", temperature=0.5)
+    def __init__(self, chat_model=None, flight=None, scheduler=None, priority=INTERACTIVE,
+                 translator=None, explanation_cache=None, pre_scorer=None, router=None):
+        # Requests are routed to a model tier per feature, language and prompt size; passing a
+        # chat model (e.g. a local fake for testing) pins every request to it instead
+        self.chat_model = chat_model
+        self.router = None if chat_model is not None else (router or get_router())
+        
+        # Identical in-flight requests from all sessions share one upstream call
+        self.flight = flight or default_flight
+        
+        # All upstream calls go through the process-wide rate-limited scheduler
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        
+        # Explanations keyed by (standard, scenario key, language code); the second language is
+        # translated from the first instead of being generated again
+        self.translator = translator
+        self.explanation_cache = explanation_cache if explanation_cache is not None else {}
+        
+        # Local scorer that answers empty or clearly wrong submissions without the LLM
+        self.pre_scorer = pre_scorer or AnswerPreScorer()
         
         # Initialize explanation chain with English system message
         self.explanation_template_en = ChatPromptTemplate.from_messages([
@@ -224,91 +245,152 @@ class IslamicFinanceStandardsExplainer:
             )
         ])
         
-        # Initialize chains
-        self.explanation_chain_en = LLMChain(
-            llm=self.chat_model,
-            prompt=self.explanation_template_en
-        )
+    def get_explanation(self, standard, standard_title, scenario, language="English", scenario_key=None):
+        """Get AI explanation for a specific standard and scenario
+
+        Explanations are cached per (standard, scenario, language). scenario_key names a scenario
+        across languages (e.g. "example" for the built-in examples), which lets an explanation
+        generated in one language be translated for the other; without it the scenario is
+        identified by a hash of its title and text and is only reused in the same language.
+        """
+        if language == "English":
+            lang_code, other_code = "en", "ar"
+            template = self.explanation_template_en
+        else:  # Arabic
+            lang_code, other_code = "ar", "en"
+            template = self.explanation_template_ar
         
-        self.explanation_chain_ar = LLMChain(
-            llm=self.chat_model,
-            prompt=self.explanation_template_ar
-        )
+        if scenario_key is None:
+            scenario_key = hashlib.sha256(f"{lang_code}\0{standard_title}\0{scenario}".encode("utf-8")).hexdigest()
+        cached = self.explanation_cache.get((standard, scenario_key, lang_code))
+        if cached is not None:
+            return cached
         
-        self.feedback_chain = LLMChain(
-            llm=self.chat_model,
-            prompt=self.feedback_template
-        )
+        explanation = None
+        source = self.explanation_cache.get((standard, scenario_key, other_code))
+        if source is not None and self.translator is not None:
+            try:
+                explanation = self.translator.translate(source, src=other_code, dest=lang_code)
+            except Exception:
+                explanation = None  # Translation service unavailable; generate instead
         
-        self.feedback_chain_ar = LLMChain(
-            llm=self.chat_model,
-            prompt=self.feedback_template_ar
-        )
-    
-    def get_explanation(self, standard, standard_title, scenario, language="English"):
-        """Get AI explanation for a specific standard and scenario"""
-        if language == "English":
-            return self.explanation_chain_en.run(
-                standard_title=standard_title,
-                scenario=scenario
+        if explanation is None:
+            # Coalesce concurrent identical requests on the rendered prompt
+            rendered = template.format(standard_title=standard_title, scenario=scenario)
+            explanation = self.flight.do(
+                prompt_key(self.chat_model or self.router.select("explanation", rendered, language), rendered),
+                lambda: self.run_chain(template, rendered, "explanation", language,
+                                       standard_title=standard_title, scenario=scenario)
             )
-        else:  # Arabic
-            return self.explanation_chain_ar.run(
-                standard_title=standard_title,
-                scenario=scenario
+        
+        self.explanation_cache[(standard, scenario_key, lang_code)] = explanation
+        return explanation
+    
+    def run_chain(self, prompt, rendered_prompt, feature, language="English", **inputs):
+        """Run a prompt through the shared rate-limited scheduler on the routed (or pinned) model"""
+        if self.router is not None:
+            return self.router.run(
+                feature,
+                rendered_prompt,
+                lambda llm: LLMChain(llm=llm, prompt=prompt).run(**inputs),
+                language=language,
+                priority=self.priority,
+                temperature=0.5,
+                scheduler=self.scheduler
             )
+        chain = LLMChain(llm=self.chat_model, prompt=prompt)
+        return self.scheduler.run(
+            lambda: chain.run(**inputs),
+            priority=self.priority,
+            tokens=estimate_tokens(rendered_prompt)
+        )
     
-    def get_feedback(self, scenario, user_solution, expert_solution, language="English"):
-        """Get feedback on user's solution"""
+    def get_feedback(self, scenario, user_solution, expert_solution, language="English", pre_score=None):
+        """Get feedback on user's solution; pass pre_score when the answer has already been pre-scored"""
+        if pre_score is None:
+            pre_score = self.pre_scorer.score(user_solution, expert_solution, language)
+        if pre_score.short_circuit:
+            return pre_score.feedback
+        
         if language == "English":
-            return self.feedback_chain.run(
-                scenario=scenario,
-                user_solution=user_solution,
-                expert_solution=expert_solution
-            )
+            template = self.feedback_template
         else:  # Arabic
-            return self.feedback_chain_ar.run(
-                scenario=scenario,
-                user_solution=user_solution,
-                expert_solution=expert_solution
-            )
+            template = self.feedback_template_ar
+        
+        inputs = {"scenario": scenario, "user_solution": user_solution, "expert_solution": expert_solution}
+        return self.run_chain(template, template.format(**inputs), "feedback", language, **inputs)
+
+# Glossary of Islamic finance terms
+GLOSSARY_TERMS = {
+    "Ijarah": {
+        "en": "A lease contract where one party transfers the right to use an asset to another party for an agreed period at an agreed consideration.",
+        "ar": "عقد إيجار حيث ينقل طرف حق استخدام أصل إلى طرف آخر لفترة متفق عليها بمقابل متفق عليه."
+    },
+    "Murabaha": {
+        "en": "A sales contract where the seller expressly mentions the cost incurred on the sold commodity and sells it to another person by adding some profit.",
+        "ar": "عقد بيع حيث يذكر البائع صراحةً التكلفة التي تكبدها على السلعة المباعة ويبيعها لشخص آخر بإضافة بعض الربح."
+    },
+    "Wakala": {
+        "en": "An agency contract where one party appoints another party to act on their behalf for a specific task.",
+        "ar": "عقد وكالة حيث يعين طرف طرفًا آخر للتصرف نيابة عنه لمهمة محددة."
+    },
+    "Istisna'a": {
+        "en": "A contract of sale where a commodity is transacted before it comes into existence, requiring the manufacturer to make it with payment from the buyer either in advance or by installments.",
+        "ar": "عقد بيع حيث يتم تداول سلعة قبل وجودها، مما يتطلب من المصنع صنعها مع دفع المشتري إما مقدمًا أو على أقساط."
+    },
+    "Sukuk": {
+        "en": "Islamic financial certificates, similar to bonds, that comply with Shariah law.",
+        "ar": "شهادات مالية إسلامية، مشابهة للسندات، تتوافق مع الشريعة الإسلامية."
+    }
+}
+
+# Per-language views of the glossary, built once at import
+GLOSSARY_BY_LANGUAGE = {
+    lang: {term: GLOSSARY_TERMS[term][lang] for term in GLOSSARY_TERMS}
+    for lang in ("en", "ar")
+}
 
 def generate_glossary(language):
     """Generate a glossary of Islamic finance terms"""
-    
-    terms = {
-        "Ijarah": {
-            "en": "A lease contract where one party transfers the right to use an asset to another party for an agreed period at an agreed consideration.",
-            "ar": "عقد إيجار حيث ينقل طرف حق استخدام أصل إلى طرف آخر لفترة متفق عليها بمقابل متفق عليه."
-        },
-        "Murabaha": {
-            "en": "A sales contract where the seller expressly mentions the cost incurred on the sold commodity and sells it to another person by adding some profit.",
-            "ar": "عقد بيع حيث يذكر البائع صراحةً التكلفة التي تكبدها على السلعة المباعة ويبيعها لشخص آخر بإضافة بعض الربح."
-        },
-        "Wakala": {
-            "en": "An agency contract where one party appoints another party to act on their behalf for a specific task.",
-            "ar": "عقد وكالة حيث يعين طرف طرفًا آخر للتصرف نيابة عنه لمهمة محددة."
-        },
-        "Istisna'a": {
-            "en": "A contract of sale where a commodity is transacted before it comes into existence, requiring the manufacturer to make it with payment from the buyer either in advance or by installments.",
-            "ar": "عقد بيع حيث يتم تداول سلعة قبل وجودها، مما يتطلب من المصنع صنعها مع دفع المشتري إما مقدمًا أو على أقساط."
-        },
-        "Sukuk": {
-            "en": "Islamic financial certificates, similar to bonds, that comply with Shariah law.",
-            "ar": "شهادات مالية إسلامية، مشابهة للسندات، تتوافق مع الشريعة الإسلامية."
-        }
-    }
-    
     if language == "English":
-        return {term: terms[term]["en"] for term in terms}
+        return GLOSSARY_BY_LANGUAGE["en"]
     else:  # Arabic
-        return {term: terms[term]["ar"] for term in terms}
+        return GLOSSARY_BY_LANGUAGE["ar"]
+
+@st.cache_resource
+def get_content_store():
+    """Compiled search index over standards, examples, glossary and cached explanations, shared by all sessions"""
+    return compile_content_store(
+        standards, examples, GLOSSARY_TERMS,
+        path=os.getenv("CONTENT_STORE_PATH", "content_store.json")
+    )
+
+@st.cache_resource
+def get_translation_pipeline():
+    """Machine translation with a persistent translation memory, shared by all sessions"""
+    memory = TranslationMemory(os.getenv("TRANSLATION_MEMORY_PATH", "translation_memory.sqlite3"))
+    return TranslationPipeline(GoogleTranslateBackend(), memory)
+
+@st.cache_resource
+def get_explanation_cache():
+    """Process-wide cache of generated explanations keyed by (standard, scenario key, language code)"""
+    return {}
+
+def index_explanation(standard, lang_code, explanation):
+    """Add a generated explanation to the search index (once per standard and language)"""
+    content_store = get_content_store()
+    if not content_store.contains("explanation", standard, lang_code):
+        title = f"{standard} - {standards[standard][f'title_{lang_code}']}"
+        content_store.add_document("explanation", standard, lang_code, title, explanation)
 
 def main():
     st.set_page_config(page_title="Islamic Finance Standards Simplified", layout="wide")
     
     # Initialize explanations class
-    explanations = IslamicFinanceStandardsExplainer()
+    explanations = IslamicFinanceStandardsExplainer(
+        translator=get_translation_pipeline(),
+        explanation_cache=get_explanation_cache()
+    )
     
     # Initialize session state for memory
     if "memory" not in st.session_state:
@@ -328,10 +410,10 @@ def main():
     # Sidebar navigation
     if language == "English":
         st.sidebar.header("Navigation")
-        page = st.sidebar.radio("Go to", ["Home", "Standards Explorer", "Interactive Tutorial", "Glossary", "Custom Question"])
+        page = st.sidebar.radio("Go to", ["Home", "Standards Explorer", "Interactive Tutorial", "Glossary", "Search", "Custom Question"])
     else:  # Arabic
         st.sidebar.header("التنقل")
-        page = st.sidebar.radio("اذهب إلى", ["الصفحة الرئيسية", "مستكشف المعايير", "الدروس التفاعلية", "المصطلحات", "سؤال مخصص"])
+        page = st.sidebar.radio("اذهب إلى", ["الصفحة الرئيسية", "مستكشف المعايير", "الدروس التفاعلية", "المصطلحات", "بحث", "سؤال مخصص"])
     
     # Map Arabic page selections to English for processing
     if language == "Arabic / العربية":
@@ -340,6 +422,7 @@ def main():
             "مستكشف المعايير": "Standards Explorer",
             "الدروس التفاعلية": "Interactive Tutorial",
             "المصطلحات": "Glossary",
+            "بحث": "Search",
             "سؤال مخصص": "Custom Question"
         }
         page = page_map.get(page, page)
@@ -411,10 +494,12 @@ def main():
                     standard=selected_standard,
                     standard_title=standards[selected_standard][f'title_{lang_code}'],
                     scenario=examples[selected_standard][f'scenario_{lang_code}'],
-                    language=language
+                    language=language,
+                    scenario_key="example"
                 )
                 st.markdown("### " + ("Explanation" if language == "English" else "الشرح"))
                 st.markdown(explanation)
+                index_explanation(selected_standard, lang_code, explanation)
                 
                 # Save to session memory
                 st.session_state.memory.save_context(
@@ -457,8 +542,10 @@ def main():
                     standard=tutorial_standard,
                     standard_title=standards[tutorial_standard][f'title_{lang_code}'],
                     scenario=examples[tutorial_standard][f'scenario_{lang_code}'],
-                    language=language
+                    language=language,
+                    scenario_key="example"
                 )
+                index_explanation(tutorial_standard, lang_code, expert_solution)
                 
                 # Compare with user solution
                 try:
@@ -478,6 +565,54 @@ def main():
                 
                 except Exception as e:
                     st.error(f"Error generating feedback: {str(e)}")
+        
+        # Bulk grading for instructors
+        with st.expander("Bulk Grading (Instructors)" if language == "English" else "التصحيح الجماعي (للمدرسين)"):
+            st.markdown(
+                "Upload a CSV with columns `submission_id`, `standard`, `answer` and optionally `language`."
+                if language == "English" else
+                "ارفع ملف CSV يحتوي على الأعمدة `submission_id` و `standard` و `answer` واختياريًا `language`."
+            )
+            submissions = st.file_uploader("Submissions CSV" if language == "English" else "ملف الإجابات", type="csv")
+            if submissions is not None and st.button("Grade All" if language == "English" else "تصحيح الكل"):
+                data = submissions.getvalue()
+                
+                # Output is named after the upload's content so rerunning the same file resumes it
+                output_dir = os.getenv("GRADING_OUTPUT_DIR", "grading_results")
+                os.makedirs(output_dir, exist_ok=True)
+                output_path = os.path.join(output_dir, f"grades_{hashlib.sha256(data).hexdigest()[:16]}.csv")
+                
+                batch_explainer = IslamicFinanceStandardsExplainer(
+                    chat_model=explanations.chat_model,
+                    router=explanations.router,
+                    priority=BATCH,
+                    translator=explanations.translator,
+                    explanation_cache=explanations.explanation_cache
+                )
+                grader = BulkGrader(batch_explainer, standards, examples, output_path)
+                progress_bar = st.progress(0.0)
+                
+                def show_progress(done, total):
+                    progress_bar.progress(done / total if total else 1.0, text=f"{done}/{total}")
+                
+                try:
+                    graded = grader.grade_csv(data, progress=show_progress)
+                except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                    st.error(str(e))
+                else:
+                    st.success(
+                        f"Graded {graded} submissions" if language == "English" else f"تم تصحيح {graded} إجابة"
+                    )
+                    for failure in grader.failures:
+                        st.error(failure)
+                    if os.path.exists(output_path):
+                        with open(output_path, "rb") as f:
+                            st.download_button(
+                                "Download Grades" if language == "English" else "تنزيل النتائج",
+                                f.read(),
+                                file_name="grades.csv",
+                                mime="text/csv"
+                            )
     
     elif page == "Glossary":
         if language == "English":
@@ -495,6 +630,34 @@ def main():
             st.markdown(f"**{term}**: {definition}")
             st.markdown("---")
     
+    elif page == "Search":
+        if language == "English":
+            st.markdown("## Search")
+            st.markdown("Search standards, examples, glossary terms and previous explanations")
+        else:  # Arabic
+            st.markdown("## بحث")
+            st.markdown("ابحث في المعايير والأمثلة والمصطلحات والشروحات السابقة")
+        
+        query = st.text_input("Search" if language == "English" else "بحث")
+        all_languages = st.checkbox("Both languages" if language == "English" else "كلتا اللغتين", False)
+        
+        if query:
+            lang_code = "en" if language == "English" else "ar"
+            hits = get_content_store().search(query, language=None if all_languages else lang_code, limit=20)
+            if not hits:
+                st.info("No results found" if language == "English" else "لم يتم العثور على نتائج")
+            kind_labels = {
+                "standard": ("Standard", "معيار"),
+                "example": ("Example", "مثال"),
+                "glossary": ("Glossary", "مصطلح"),
+                "explanation": ("Explanation", "شرح")
+            }
+            for hit in hits:
+                label = kind_labels[hit.document.kind][0 if language == "English" else 1]
+                st.markdown(f"**{hit.document.title}** · _{label}_")
+                st.markdown(hit.snippet)
+                st.markdown("---")
+    
     elif page == "Custom Question":
         if language == "English":
             st.markdown("## Ask Your Own Question")
@@ -538,15 +701,15 @@ def main():
                     template=template
                 )
                 
-                # Create chain for custom questions
-                custom_chain = LLMChain(
-                    llm=explanations.chat_model,
-                    prompt=prompt_template
+                # Get answer (short questions are routed to the fast model tier)
+                answer = explanations.run_chain(
+                    prompt_template,
+                    prompt_template.format(question=custom_question),
+                    "custom_question",
+                    language,
+                    question=custom_question
                 )
                 
-                # Get answer
-                answer = custom_chain.run(question=custom_question)
-                
                 st.markdown("### " + ("Answer" if language == "English" else "الإجابة"))
                 st.markdown(answer)
                 
@@ -2,145 +2,64 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import io
 import json
+import hashlib
 from fpdf import FPDF
+from report_tables import PDFTable, TableColumn, currency
+from zakat_export import entity_sheets, xlsx_bytes, csv_bytes, XLSX_MIME, CSV_MIME, xlsxwriter
 import streamlit as st
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
+from llm_scheduler import get_scheduler, estimate_tokens, INTERACTIVE
+from llm_router import get_router
+from zakat_core import AAOIFI_STANDARDS, RULE_PACKS, METAL_PRICES, ZakatCalculator
+from zakat_methods import MultiMethodZakatEngine
+from advisory_rules import RuleBasedAdvisor
+from metal_holdings import MetalHoldings
 import warnings
 warnings.filterwarnings('ignore')
 
-# Define AAOIFI standards for Zakat calculation
-AAOIFI_STANDARDS = {
-    "FAS_9": {
-        "name": "Zakat",
-        "nisab_gold": 85,  # grams of gold
-        "nisab_silver": 595,  # grams of silver
-        "rate": 0.025,  # 2.5%
-        "zakatable_assets": [
-            "Cash and cash equivalents",
-            "Trade receivables",
-            "Inventory",
-            "Investments (short-term)",
-            "Gold and silver",
-            "Agricultural produce"
-        ],
-        "non_zakatable_assets": [
-            "Fixed assets",
-            "Intangible assets",
-            "Long-term investments for operations",
-            "Properties for personal use"
-        ],
-        "deductible_liabilities": [
-            "Short-term liabilities",
-            "Operational expenses due",
-            "Taxes payable"
-        ],
-        "non_deductible_liabilities": [
-            "Long-term debts",
-            "Capital investments"
-        ]
-    }
-}
-
-# Current gold and silver prices (these would normally be fetched via API)
-METAL_PRICES = {
-    "gold_per_gram": 70,  # USD
-    "silver_per_gram": 0.85  # USD
-}
-
-class ZakatCalculator:
+class ZakatComplianceAdvisor:
     """
-    Core class for calculating Zakat based on AAOIFI standards
+    Uses AI to provide compliance advice and optimization suggestions
     """
-    def __init__(self, standard="FAS_9"):
-        self.standard = AAOIFI_STANDARDS[standard]
-        self.nisab_value = max(
-            self.standard["nisab_gold"] * METAL_PRICES["gold_per_gram"],
-            self.standard["nisab_silver"] * METAL_PRICES["silver_per_gram"]
-        )
-        self.rate = self.standard["rate"]
-        
-    def classify_accounts(self, financial_data):
-        """
-        Classifies accounts as zakatable, non-zakatable, or deductible
-        """
-        classified = {
-            "zakatable_assets": {},
-            "non_zakatable_assets": {},
-            "deductible_liabilities": {},
-            "non_deductible_liabilities": {}
-        }
-        
-        # For each account in balance sheet
-        for account, value in financial_data["balance_sheet"].items():
-            account_lower = account.lower()
-            
-            # Classify using simple keyword matching (would be more sophisticated in production)
-            if any(keyword in account_lower for keyword in ["cash", "bank", "receivable", "inventory", "investment", "gold", "silver"]):
-                classified["zakatable_assets"][account] = value
-            elif any(keyword in account_lower for keyword in ["property", "equipment", "building", "intangible", "goodwill"]):
-                classified["non_zakatable_assets"][account] = value
-            elif any(keyword in account_lower for keyword in ["payable", "accrued", "tax", "short term"]):
-                classified["deductible_liabilities"][account] = value
-            elif any(keyword in account_lower for keyword in ["loan", "long term", "capital"]):
-                classified["non_deductible_liabilities"][account] = value
-        
-        return classified
+    # Provider failures are returned as text starting with this, so the UI can show them inline
+    ERROR_PREFIX = "Error generating "
+
+    def __init__(self, api_key=None, llm=None, priority=INTERACTIVE, scheduler=None, router=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "dummy_key")
+        # Requests are routed to a model tier unless a model is passed in (or an explicit API key,
+        # which the shared tiers do not use); retries and backoff are owned by the shared scheduler
+        if llm is None and api_key is not None:
+            llm = ChatOpenAI(temperature=0, openai_api_key=api_key, max_retries=1)
+        self.llm = llm
+        self.router = None if llm is not None else (router or get_router())
+        self.priority = priority
+        self.scheduler = scheduler or get_scheduler()
     
-    def calculate_zakat_base(self, financial_data):
+    def ask(self, messages, feature="advisory"):
         """
-        Calculate Zakat base according to AAOIFI FAS 9
+        Send messages through the shared rate-limited scheduler
         """
-        classified = self.classify_accounts(financial_data)
-        
-        # Net Asset Method (most common in AAOIFI)
-        total_zakatable_assets = sum(classified["zakatable_assets"].values())
-        total_deductible_liabilities = sum(classified["deductible_liabilities"].values())
-        
-        zakat_base = total_zakatable_assets - total_deductible_liabilities
-        
-        return {
-            "classified_accounts": classified,
-            "total_zakatable_assets": total_zakatable_assets,
-            "total_deductible_liabilities": total_deductible_liabilities,
-            "zakat_base": zakat_base
-        }
-    
-    def calculate_zakat_amount(self, financial_data):
+        prompt = "".join(message.content for message in messages)
+        if self.router is not None:
+            return self.router.run(feature, prompt, lambda llm: llm(messages), priority=self.priority,
+                                   scheduler=self.scheduler)
+        tokens = estimate_tokens(prompt)
+        return self.scheduler.run(lambda: self.llm(messages), priority=self.priority, tokens=tokens)
+        
+    @staticmethod
+    def _findings_section(findings):
         """
-        Calculate final Zakat amount
+        Findings from the rule-based checks, appended to the prompt so the model addresses them
         """
-        calculation = self.calculate_zakat_base(financial_data)
-        zakat_base = calculation["zakat_base"]
-        
-        # Check if wealth meets Nisab threshold
-        if zakat_base < self.nisab_value:
-            calculation["zakat_due"] = 0
-            calculation["exceeds_nisab"] = False
-            calculation["zakat_amount"] = 0
-        else:
-            calculation["zakat_due"] = True
-            calculation["exceeds_nisab"] = True
-            calculation["zakat_amount"] = zakat_base * self.rate
-        
-        # Add additional information
-        calculation["nisab_value"] = self.nisab_value
-        calculation["zakat_rate"] = self.rate
-        calculation["calculation_date"] = datetime.now().strftime("%Y-%m-%d")
-        
-        return calculation
-
-
-class ZakatComplianceAdvisor:
-    """
-    Uses AI to provide compliance advice and optimization suggestions
-    """
-    def __init__(self, api_key=None):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "dummy_key")
-        self.llm = ChatOpenAI(temperature=0, openai_api_key=self.api_key)
+        if not findings:
+            return ""
+        lines = "\n".join(f"        - {finding['title']}: {finding['message']}" for finding in findings)
+        return f"\n        Automated checks flagged:\n{lines}\n"
         
-    def get_compliance_advice(self, financial_data, calculation_results):
+    def get_compliance_advice(self, financial_data, calculation_results, findings=None):
         """
         Generate compliance advice based on financial data and calculation results
         """
@@ -154,7 +73,7 @@ class ZakatComplianceAdvisor:
         - Zakat base: ${calculation_results['zakat_base']:,.2f}
         - Nisab threshold: ${calculation_results['nisab_value']:,.2f}
         - Zakat amount due: ${calculation_results['zakat_amount']:,.2f}
-        
+        {self._findings_section(findings)}
         Please provide:
         1. An assessment of compliance with AAOIFI standards
         2. Any potential issues or concerns with the classification of assets/liabilities
@@ -170,12 +89,12 @@ class ZakatComplianceAdvisor:
         ]
         
         try:
-            response = self.llm(messages)
+            response = self.ask(messages, "compliance_advice")
             return response.content
         except Exception as e:
-            return f"Error generating compliance advice: {str(e)}"
+            return f"{self.ERROR_PREFIX}compliance advice: {str(e)}"
     
-    def get_optimization_suggestions(self, financial_data, calculation_results):
+    def get_optimization_suggestions(self, financial_data, calculation_results, findings=None):
         """
         Generate Zakat optimization suggestions within Shariah boundaries
         """
@@ -187,7 +106,7 @@ class ZakatComplianceAdvisor:
         - Total deductible liabilities: ${calculation_results['total_deductible_liabilities']:,.2f}
         - Zakat base: ${calculation_results['zakat_base']:,.2f}
         - Zakat amount due: ${calculation_results['zakat_amount']:,.2f}
-        
+        {self._findings_section(findings)}
         Provide 3-5 specific, actionable suggestions for Zakat optimization that:
         1. Comply fully with Shariah principles
         2. Follow AAOIFI FAS 9 standards
@@ -202,19 +121,20 @@ class ZakatComplianceAdvisor:
         ]
         
         try:
-            response = self.llm(messages)
+            response = self.ask(messages, "optimization")
             return response.content
         except Exception as e:
-            return f"Error generating optimization suggestions: {str(e)}"
+            return f"{self.ERROR_PREFIX}optimization suggestions: {str(e)}"
 
 
 class ZakatDocumentGenerator:
     """
     Generates Zakat compliance documentation
     """
-    def generate_zakat_certificate(self, entity_info, calculation_results):
+    def generate_zakat_certificate(self, entity_info, calculation_results, filename=None):
         """
-        Generate a Zakat payment certificate
+        Generate a Zakat payment certificate; filename defaults to one named after the entity
+        in the working directory
         """
         pdf = FPDF()
         pdf.add_page()
@@ -258,7 +178,9 @@ class ZakatDocumentGenerator:
         pdf.set_font("Arial", "B", 12)
         pdf.cell(0, 10, "Compliance Statement", ln=True)
         pdf.set_font("Arial", "", 12)
-        compliance_text = "This is to certify that the above Zakat calculation has been performed in accordance with AAOIFI FAS 9 standards."
+        pack = RULE_PACKS.resolve(calculation_results.get("rule_pack", "FAS_9"))
+        compliance_text = (f"This is to certify that the above Zakat calculation has been performed in accordance with "
+                           f"the {pack.definition.get('name', pack.id)} rule pack ({pack.id}, version {pack.version}).")
         pdf.multi_cell(0, 8, compliance_text)
         pdf.ln(10)
         
@@ -270,7 +192,8 @@ class ZakatDocumentGenerator:
         pdf.cell(0, 8, "_________________________", ln=True)
         
         # Save the PDF to a temporary file
-        filename = f"zakat_certificate_{entity_info.get('name', 'entity').replace(' ', '_')}.pdf"
+        if filename is None:
+            filename = f"zakat_certificate_{entity_info.get('name', 'entity').replace(' ', '_')}.pdf"
         pdf.output(filename)
         return filename
     
@@ -303,39 +226,28 @@ class ZakatDocumentGenerator:
         pdf.cell(0, 10, "Asset Classification", ln=True)
         pdf.set_font("Arial", "", 12)
         
-        # Zakatable Assets
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 8, "Zakatable Assets:", ln=True)
-        pdf.set_font("Arial", "", 11)
-        for asset, value in calculation_results["classified_accounts"]["zakatable_assets"].items():
-            pdf.cell(100, 6, asset, 0)
-            pdf.cell(0, 6, f"${value:,.2f}", ln=True)
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(100, 8, "Total Zakatable Assets:", 0)
-        pdf.cell(0, 8, f"${calculation_results['total_zakatable_assets']:,.2f}", ln=True)
-        pdf.ln(5)
-        
-        # Non-Zakatable Assets
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 8, "Non-Zakatable Assets:", ln=True)
-        pdf.set_font("Arial", "", 11)
-        for asset, value in calculation_results["classified_accounts"]["non_zakatable_assets"].items():
-            pdf.cell(100, 6, asset, 0)
-            pdf.cell(0, 6, f"${value:,.2f}", ln=True)
+        # Account tables paginate themselves, repeating headers and carrying subtotals across pages
+        classified = calculation_results["classified_accounts"]
+        sections = [
+            ("Zakatable Assets:", "zakatable_assets", "Total Zakatable Assets"),
+            ("Non-Zakatable Assets:", "non_zakatable_assets", None),
+            ("Deductible Liabilities:", "deductible_liabilities", "Total Deductible Liabilities")
+        ]
+        for title, category, total_label in sections:
+            pdf.set_font("Arial", "B", 11)
+            pdf.cell(0, 8, title, ln=True)
+            table = PDFTable(
+                pdf,
+                [TableColumn("Account", width=130), TableColumn("Amount", align="R", formatter=currency)],
+                font=("Arial", "", 11),
+                header_font=("Arial", "B", 11),
+                total_columns=[1],
+                carry_forward=True
+            )
+            table.render(classified[category].items(), subtotal_label=total_label)
+            pdf.ln(5)
         pdf.ln(5)
         
-        # Deductible Liabilities
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 8, "Deductible Liabilities:", ln=True)
-        pdf.set_font("Arial", "", 11)
-        for liability, value in calculation_results["classified_accounts"]["deductible_liabilities"].items():
-            pdf.cell(100, 6, liability, 0)
-            pdf.cell(0, 6, f"${value:,.2f}", ln=True)
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(100, 8, "Total Deductible Liabilities:", 0)
-        pdf.cell(0, 8, f"${calculation_results['total_deductible_liabilities']:,.2f}", ln=True)
-        pdf.ln(10)
-        
         # Calculation Summary
         pdf.set_font("Arial", "B", 12)
         pdf.cell(0, 10, "Zakat Calculation Summary", ln=True)
@@ -367,6 +279,23 @@ class ZakatDocumentGenerator:
         return filename
 
 
+def calculate_portfolio(entities, standard="FAS_9", rule_packs=None):
+    """
+    Calculate {entity_id: financial_data} choosing a rule pack per entity: from rule_packs
+    ({entity_id: "ID" or "ID@version"}), else financial_data["rule_pack"], else standard
+    """
+    rule_packs = rule_packs or {}
+    calculators = {}
+    results = {}
+    for entity_id, financial_data in entities.items():
+        pack = RULE_PACKS.resolve(rule_packs.get(entity_id) or financial_data.get("rule_pack") or standard)
+        calculator = calculators.get(pack.key)
+        if calculator is None or calculator.rule_pack is not pack:
+            calculator = calculators[pack.key] = ZakatCalculator(rule_pack=pack)
+        results[entity_id] = calculator.calculate_zakat_amount(financial_data)
+    return results
+
+
 def create_sample_financial_data():
     """
     Create sample financial data for demonstration
@@ -392,213 +321,297 @@ def create_sample_financial_data():
     }
 
 
-def main():
-    st.set_page_config(page_title="Islamic Finance Zakat Calculator", layout="wide")
+def _inputs_key(financial_data, rule_pack):
+    """
+    Fingerprint of the inputs a calculation depends on, used to tell whether stored results are stale
+    """
+    raw = json.dumps({"financial_data": financial_data, "rule_pack": rule_pack}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _store_calculation(financial_data, rule_pack):
+    """
+    Recalculate only if the financial inputs or rule pack changed; advice and documents that
+    depend on the old results are dropped
+    """
+    key = _inputs_key(financial_data, rule_pack)
+    stored = st.session_state.get("zakat_calculation")
+    if stored is not None and stored["key"] == key:
+        return stored
     
-    st.title("Islamic Finance Zakat Calculator")
-    st.write("Based on AAOIFI FAS 9 Standards")
+    calculator = ZakatCalculator(rule_pack=RULE_PACKS.resolve(rule_pack))
+    calculation_results = calculator.calculate_zakat_amount(financial_data)
+    stored = {
+        "key": key,
+        "financial_data": financial_data,
+        "results": calculation_results,
+        "comparison": MultiMethodZakatEngine(calculator).comparison_table(financial_data)
+    }
+    st.session_state.zakat_calculation = stored
+    st.session_state.pop("zakat_advice", None)
+    st.session_state.pop("zakat_documents", None)
+    return stored
+
+
+def _export_bytes(stored):
+    """
+    Excel and CSV downloads of the breakdown, built once per stored calculation rather than on every rerun
+    """
+    exports = stored.get("exports")
+    if exports is None:
+        sheets = entity_sheets(stored["results"])
+        exports = stored["exports"] = {
+            "xlsx": xlsx_bytes(sheets) if xlsxwriter is not None else None,
+            "csv": csv_bytes(sheets[1])
+        }
+    return exports
+
+
+def render_results(stored, entity_name):
+    calculation_results = stored["results"]
     
-    # Input section
-    st.header("Entity Information")
-    col1, col2 = st.columns(2)
+    st.header("Zakat Calculation Results")
+    
+    # Summary
+    st.subheader("Summary")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Zakatable Assets", f"${calculation_results['total_zakatable_assets']:,.2f}")
+    with col2:
+        st.metric("Total Deductible Liabilities", f"${calculation_results['total_deductible_liabilities']:,.2f}")
+    with col3:
+        st.metric("Zakat Base", f"${calculation_results['zakat_base']:,.2f}")
+        
+    col1, col2, col3 = st.columns(3)
     with col1:
-        entity_name = st.text_input("Entity Name", "Sample Business LLC")
-        registration_number = st.text_input("Registration Number", "REG12345")
+        st.metric("Nisab Threshold", f"${calculation_results['nisab_value']:,.2f}")
     with col2:
-        zakat_year = st.text_input("Zakat Year", "2025")
-        calculation_date = st.date_input("Calculation Date", datetime.now())
+        st.metric("Exceeds Nisab", "Yes" if calculation_results['exceeds_nisab'] else "No")
+    with col3:
+        st.metric("Zakat Amount Due", f"${calculation_results['zakat_amount']:,.2f}")
     
-    # Financial data input
-    st.header("Financial Data")
-    st.write("Enter your balance sheet information:")
+    # Net assets and net invested funds side by side
+    st.subheader("Method Comparison")
+    comparison = stored["comparison"]
+    st.dataframe(comparison.style.format({column: "${:,.2f}" for column in comparison.columns
+                                          if column not in ("Method", "Exceeds Nisab")}))
     
-    # Load sample data
-    sample_data = create_sample_financial_data()
-    use_sample = st.checkbox("Use sample data for demonstration", True)
+    # Detailed breakdown
+    st.subheader("Detailed Breakdown")
+    
+    # Zakatable Assets
+    st.write("**Zakatable Assets**")
+    asset_df = pd.DataFrame(list(calculation_results["classified_accounts"]["zakatable_assets"].items()), 
+                           columns=["Account", "Amount"])
+    st.dataframe(asset_df)
     
-    if use_sample:
-        financial_data = sample_data
+    # Deductible Liabilities
+    st.write("**Deductible Liabilities**")
+    liability_df = pd.DataFrame(list(calculation_results["classified_accounts"]["deductible_liabilities"].items()), 
+                              columns=["Account", "Amount"])
+    st.dataframe(liability_df)
+    
+    # Spreadsheet export of the full breakdown, built in memory for download
+    export_name = (entity_name or "entity").replace(" ", "_")
+    exports = _export_bytes(stored)
+    col1, col2 = st.columns(2)
+    with col1:
+        if exports["xlsx"] is not None:
+            st.download_button("Download Breakdown (Excel)", data=exports["xlsx"],
+                               file_name=f"Zakat_Breakdown_{export_name}.xlsx", mime=XLSX_MIME)
+    with col2:
+        st.download_button("Download Breakdown (CSV)", data=exports["csv"],
+                           file_name=f"Zakat_Breakdown_{export_name}.csv", mime=CSV_MIME)
+
+
+@st.fragment
+def render_compliance_analysis():
+    """
+    Advisor output for the stored calculation. Routine entities are answered by the rule-based
+    checks; the LLM is only called for flagged entities, or when the user asks for it, and this
+    section reruns on its own
+    """
+    stored = st.session_state.zakat_calculation
+    st.header("Compliance Analysis")
+    
+    # Without an API key the app runs on the rule-based checks alone
+    llm_available = bool(os.getenv("OPENAI_API_KEY"))
+    ask_llm = st.button("Ask AI Advisor", disabled=not llm_available)
+    advice = st.session_state.get("zakat_advice")
+    if advice is None or advice["key"] != stored["key"] or ask_llm:
+        llm_advisor = ZakatComplianceAdvisor() if llm_available else None
+        with st.spinner("Generating compliance analysis..."):
+            advice = RuleBasedAdvisor().advise(stored["financial_data"], stored["results"], llm_advisor,
+                                               force_llm=ask_llm)
+        advice["key"] = stored["key"]
+        st.session_state.zakat_advice = advice
+        if st.session_state.pop("zakat_documents", None) and ask_llm:
+            st.rerun()  # Documents built from the old advice were dropped; refresh that section too
+    
+    if advice["source"] == "rules":
+        st.caption("Advice from the automated compliance checks"
+                   + (" (flagged for expert review)" if advice["needs_review"] else ""))
     else:
-        financial_data = {"balance_sheet": {}}
-        
-        # Dynamic form for balance sheet entries
-        st.subheader("Assets")
-        col1, col2 = st.columns(2)
-        with col1:
-            cash = st.number_input("Cash and bank balances", value=0.0, format="%.2f")
-            receivables = st.number_input("Trade receivables", value=0.0, format="%.2f")
-            inventory = st.number_input("Inventory", value=0.0, format="%.2f")
-            short_investments = st.number_input("Short-term investments", value=0.0, format="%.2f")
-            prepaid = st.number_input("Prepaid expenses", value=0.0, format="%.2f")
-        with col2:
-            property_equipment = st.number_input("Property and equipment", value=0.0, format="%.2f")
-            intangible = st.number_input("Intangible assets", value=0.0, format="%.2f")
-            long_investments = st.number_input("Long-term investments", value=0.0, format="%.2f")
-        
-        st.subheader("Liabilities and Equity")
-        col1, col2 = st.columns(2)
-        with col1:
-            payables = st.number_input("Trade payables", value=0.0, format="%.2f")
-            accrued = st.number_input("Accrued expenses", value=0.0, format="%.2f")
-            short_borrowings = st.number_input("Short-term borrowings", value=0.0, format="%.2f")
-            tax_payable = st.number_input("Tax payable", value=0.0, format="%.2f")
-        with col2:
-            long_loans = st.number_input("Long-term loans", value=0.0, format="%.2f")
-            share_capital = st.number_input("Share capital", value=0.0, format="%.2f")
-            retained = st.number_input("Retained earnings", value=0.0, format="%.2f")
-            
-        # Update financial data
-        financial_data["balance_sheet"] = {
-            "Cash and bank balances": cash,
-            "Trade receivables": receivables,
-            "Inventory": inventory,
-            "Short-term investments": short_investments,
-            "Prepaid expenses": prepaid,
-            "Property and equipment": property_equipment,
-            "Intangible assets": intangible,
-            "Long-term investments": long_investments,
-            "Trade payables": payables,
-            "Accrued expenses": accrued,
-            "Short-term borrowings": short_borrowings,
-            "Tax payable": tax_payable,
-            "Long-term loans": long_loans,
-            "Share capital": share_capital,
-            "Retained earnings": retained
-        }
+        st.caption("Advice from the AI advisor")
     
-    # Process button
-    if st.button("Calculate Zakat"):
-        # Calculate Zakat
-        calculator = ZakatCalculator()
-        calculation_results = calculator.calculate_zakat_amount(financial_data)
-        
-        # Display results
-        st.header("Zakat Calculation Results")
-        
-        # Summary
-        st.subheader("Summary")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Total Zakatable Assets", f"${calculation_results['total_zakatable_assets']:,.2f}")
-        with col2:
-            st.metric("Total Deductible Liabilities", f"${calculation_results['total_deductible_liabilities']:,.2f}")
-        with col3:
-            st.metric("Zakat Base", f"${calculation_results['zakat_base']:,.2f}")
+    st.subheader("Compliance Assessment")
+    st.write(advice["compliance"])
+    
+    st.subheader("Optimization Suggestions")
+    st.write(advice["optimization"])
+
+
+@st.fragment
+def render_documentation(entity_info):
+    """
+    Certificate and report generation from the stored results and advice; clicking a button
+    reruns only this section and never recalculates or calls the LLM
+    """
+    stored = st.session_state.zakat_calculation
+    advice = st.session_state.get("zakat_advice")
+    st.header("Documentation")
+    
+    documents = st.session_state.setdefault("zakat_documents", {})
+    doc_generator = ZakatDocumentGenerator()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Generate Zakat Certificate"):
+            documents["certificate"] = doc_generator.generate_zakat_certificate(entity_info, stored["results"])
+        if "certificate" in documents:
+            st.success(f"Zakat Certificate generated: {documents['certificate']}")
+            with open(documents["certificate"], "rb") as f:
+                st.download_button("Download Certificate", data=f.read(),
+                                   file_name=os.path.basename(documents["certificate"]), mime="application/pdf")
             
-        col1, col2, col3 = st.columns(3)
+    with col2:
+        if st.button("Generate Detailed Report", disabled=advice is None):
+            documents["report"] = doc_generator.generate_detailed_report(entity_info, stored["financial_data"],
+                                                                         stored["results"], advice["compliance"])
+        if "report" in documents:
+            st.success(f"Detailed Report generated: {documents['report']}")
+            with open(documents["report"], "rb") as f:
+                st.download_button("Download Report", data=f.read(),
+                                   file_name=os.path.basename(documents["report"]), mime="application/pdf")
+
+
+def main():
+    st.set_page_config(page_title="Islamic Finance Zakat Calculator", layout="wide")
+    
+    st.title("Islamic Finance Zakat Calculator")
+    st.write("Based on AAOIFI FAS 9 Standards")
+    
+    # Switching between sample and manual data changes the form layout, so it sits outside the form
+    use_sample = st.checkbox("Use sample data for demonstration", True)
+    
+    # Inputs are collected in a form: editing a field does not rerun anything until it is submitted
+    with st.form("zakat_inputs"):
+        st.header("Entity Information")
+        col1, col2 = st.columns(2)
         with col1:
-            st.metric("Nisab Threshold", f"${calculation_results['nisab_value']:,.2f}")
+            entity_name = st.text_input("Entity Name", "Sample Business LLC")
+            registration_number = st.text_input("Registration Number", "REG12345")
         with col2:
-            st.metric("Exceeds Nisab", "Yes" if calculation_results['exceeds_nisab'] else "No")
-        with col3:
-            st.metric("Zakat Amount Due", f"${calculation_results['zakat_amount']:,.2f}")
-        
-        # Detailed breakdown
-        st.subheader("Detailed Breakdown")
+            zakat_year = st.text_input("Zakat Year", "2025")
+            calculation_date = st.date_input("Calculation Date", datetime.now())
         
-        # Zakatable Assets
-        st.write("**Zakatable Assets**")
-        asset_df = pd.DataFrame(list(calculation_results["classified_accounts"]["zakatable_assets"].items()), 
-                               columns=["Account", "Amount"])
-        st.dataframe(asset_df)
+        # Rule packs are re-read from RULE_PACKS_DIR when their files change, without a restart
+        rule_pack_options = [f"{pack_id}@{version}" for pack_id, versions in RULE_PACKS.available().items()
+                             for version in reversed(versions)]
+        rule_pack = st.selectbox("Zakat Regime (rule pack)", rule_pack_options,
+                                 index=rule_pack_options.index(RULE_PACKS.get("FAS_9").key))
         
-        # Deductible Liabilities
-        st.write("**Deductible Liabilities**")
-        liability_df = pd.DataFrame(list(calculation_results["classified_accounts"]["deductible_liabilities"].items()), 
-                                  columns=["Account", "Amount"])
-        st.dataframe(liability_df)
+        # Financial data input
+        st.header("Financial Data")
         
-        # Generate compliance advice (mock for demo purposes)
-        st.header("Compliance Analysis")
-        
-        # Create advisor object
-        advisor = ZakatComplianceAdvisor()
-        
-        # This section would use the LLM in a real implementation
-        # For demo, we'll use sample responses
-        if not os.getenv("OPENAI_API_KEY"):
-            compliance_advice = """
-            Based on the financial data provided and Zakat calculation results:
-            
-            1. **Compliance Assessment:**
-               - The calculation follows AAOIFI FAS 9 requirements for classifying zakatable assets and deductible liabilities
-               - The net asset method has been correctly applied
-               - The Nisab threshold comparison is appropriate
-            
-            2. **Potential Issues:**
-               - Short-term investments should be further classified to ensure they don't include non-zakatable securities
-               - Verify that trade receivables are expected to be collected (doubtful debts may be excluded)
-            
-            3. **Recommendations:**
-               - Maintain separate accounting records for Zakat throughout the year
-               - Consider distributing Zakat on a quarterly basis for more consistent cash flow management
-               - Document detailed asset classifications for audit purposes
-            
-            4. **Shariah Considerations:**
-               - Ensure Zakat is distributed to eligible recipients as specified in Shariah
-               - Verify timing of calculation aligns with Islamic calendar
-            """
-            
-            optimization_suggestions = """
-            Here are Shariah-compliant Zakat optimization strategies:
-            
-            1. **Accelerate Receivable Collection:**
-               - Collect trade receivables before the Zakat calculation date
-               - This converts potentially uncollectible amounts (which might be excluded) into definite zakatable cash
-               - Shariah-compliant because it represents actual business improvement, not artificial manipulation
-            
-            2. **Advance Payment of Short-term Liabilities:**
-               - Pay outstanding short-term liabilities before calculation date
-               - This is legitimate as these are actual business expenses that reduce zakatable wealth
-               - Compliant because it represents actual settlement of obligations
-            
-            3. **Inventory Management:**
-               - Complete sales of inventory nearing calculation date
-               - Time major inventory purchases after calculation date
-               - Permitted as it represents normal business operations
+        if use_sample:
+            st.write("Using the sample balance sheet.")
+            financial_data = create_sample_financial_data()
+        else:
+            st.write("Enter your balance sheet information:")
+            financial_data = {"balance_sheet": {}}
             
-            4. **Invest in Productive Business Assets:**
-               - Convert zakatable assets into non-zakatable productive business assets
-               - AAOIFI standards exempt assets used in production/operations
-               - Shariah-compliant as it promotes economic development
+            # Dynamic form for balance sheet entries
+            st.subheader("Assets")
+            col1, col2 = st.columns(2)
+            with col1:
+                cash = st.number_input("Cash and bank balances", value=0.0, format="%.2f")
+                receivables = st.number_input("Trade receivables", value=0.0, format="%.2f")
+                inventory = st.number_input("Inventory", value=0.0, format="%.2f")
+                short_investments = st.number_input("Short-term investments", value=0.0, format="%.2f")
+                prepaid = st.number_input("Prepaid expenses", value=0.0, format="%.2f")
+            with col2:
+                property_equipment = st.number_input("Property and equipment", value=0.0, format="%.2f")
+                intangible = st.number_input("Intangible assets", value=0.0, format="%.2f")
+                long_investments = st.number_input("Long-term investments", value=0.0, format="%.2f")
             
-            5. **Timing of Zakat Year:**
-               - Choose a fiscal Zakat year when business typically has lower liquid assets
-               - Permissible as long as a full lunar year (Hawl) passes between calculations
-            """
-        else:
-            compliance_advice = advisor.get_compliance_advice(financial_data, calculation_results)
-            optimization_suggestions = advisor.get_optimization_suggestions(financial_data, calculation_results)
-        
-        st.subheader("Compliance Assessment")
-        st.write(compliance_advice)
-        
-        st.subheader("Optimization Suggestions")
-        st.write(optimization_suggestions)
-        
-        # Document Generation
-        st.header("Documentation")
-        
+            st.subheader("Liabilities and Equity")
+            col1, col2 = st.columns(2)
+            with col1:
+                payables = st.number_input("Trade payables", value=0.0, format="%.2f")
+                accrued = st.number_input("Accrued expenses", value=0.0, format="%.2f")
+                short_borrowings = st.number_input("Short-term borrowings", value=0.0, format="%.2f")
+                tax_payable = st.number_input("Tax payable", value=0.0, format="%.2f")
+            with col2:
+                long_loans = st.number_input("Long-term loans", value=0.0, format="%.2f")
+                share_capital = st.number_input("Share capital", value=0.0, format="%.2f")
+                retained = st.number_input("Retained earnings", value=0.0, format="%.2f")
+                
+            # Update financial data
+            financial_data["balance_sheet"] = {
+                "Cash and bank balances": cash,
+                "Trade receivables": receivables,
+                "Inventory": inventory,
+                "Short-term investments": short_investments,
+                "Prepaid expenses": prepaid,
+                "Property and equipment": property_equipment,
+                "Intangible assets": intangible,
+                "Long-term investments": long_investments,
+                "Trade payables": payables,
+                "Accrued expenses": accrued,
+                "Short-term borrowings": short_borrowings,
+                "Tax payable": tax_payable,
+                "Long-term loans": long_loans,
+                "Share capital": share_capital,
+                "Retained earnings": retained
+            }
+        
+        # Physical gold and silver recorded by weight are valued in bulk and added as zakatable assets
+        holdings_file = st.file_uploader("Gold and silver holdings (CSV with metal, weight, unit, karat or fineness)",
+                                         type="csv")
+        
+        submitted = st.form_submit_button("Calculate Zakat")
+    
+    if submitted:
+        if holdings_file is not None:
+            try:
+                holdings = MetalHoldings.from_csv(io.BytesIO(holdings_file.getvalue()))
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not value the gold and silver holdings: {e}")
+            else:
+                financial_data = holdings.add_to_financial_data(financial_data)
+                st.info(f"Valued {len(holdings):,} gold and silver items")
+        _store_calculation(financial_data, rule_pack)
+        # Entity details only feed the documents, so changing them does not trigger a recalculation
         entity_info = {
             "name": entity_name,
             "registration": registration_number,
             "zakat_year": zakat_year
         }
-        
-        doc_generator = ZakatDocumentGenerator()
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("Generate Zakat Certificate"):
-                cert_file = doc_generator.generate_zakat_certificate(entity_info, calculation_results)
-                st.success(f"Zakat Certificate generated: {cert_file}")
-                
-        with col2:
-            if st.button("Generate Detailed Report"):
-                report_file = doc_generator.generate_detailed_report(entity_info, financial_data, 
-                                                                    calculation_results, compliance_advice)
-                st.success(f"Detailed Report generated: {report_file}")
+        if st.session_state.get("zakat_entity_info") != entity_info:
+            st.session_state.zakat_entity_info = entity_info
+            st.session_state.pop("zakat_documents", None)
+    
+    # Results persist in session state across reruns until the inputs change
+    stored = st.session_state.get("zakat_calculation")
+    if stored is None:
+        return
+    
+    entity_info = st.session_state.zakat_entity_info
+    render_results(stored, entity_info["name"])
+    render_compliance_analysis()
+    render_documentation(entity_info)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,194 @@
+import csv
+import io
+
+import numpy as np
+
+from zakat_results import CATEGORIES, SUMMARY_FIELDS, ZakatResult
+
+try:
+    import xlsxwriter
+except ImportError:  # Excel export is optional
+    xlsxwriter = None
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIME = "text/csv"
+
+# Excel's hard limit is 1,048,576 rows per sheet including the header row
+XLSX_MAX_ROWS = 1048576
+
+CATEGORY_LABELS = {
+    "zakatable_assets": "Zakatable Assets",
+    "non_zakatable_assets": "Non-Zakatable Assets",
+    "deductible_liabilities": "Deductible Liabilities",
+    "non_deductible_liabilities": "Non-Deductible Liabilities"
+}
+
+SUMMARY_LABELS = {
+    "total_zakatable_assets": "Total Zakatable Assets",
+    "total_deductible_liabilities": "Total Deductible Liabilities",
+    "zakat_base": "Zakat Base",
+    "nisab_value": "Nisab Threshold",
+    "zakat_rate": "Zakat Rate",
+    "zakat_amount": "Zakat Amount Due"
+}
+
+BREAKDOWN_HEADERS = ["Category", "Account", "Amount"]
+PORTFOLIO_SUMMARY_HEADERS = ["Entity", *(SUMMARY_LABELS[field] for field in SUMMARY_FIELDS),
+                             "Exceeds Nisab", "Calculation Date"]
+PORTFOLIO_BREAKDOWN_HEADERS = ["Entity", *BREAKDOWN_HEADERS]
+
+
+class Sheet:
+    """
+    One worksheet (or CSV file) to export: headers plus an iterable of row tuples.
+    amount_columns are given the currency number format in Excel.
+    """
+    def __init__(self, name, headers, rows, amount_columns=(), widths=None):
+        self.name = name
+        self.headers = headers
+        self.rows = rows
+        self.amount_columns = set(amount_columns)
+        self.widths = widths or [18] * len(headers)
+
+
+def entity_sheets(calculation):
+    """
+    Summary and breakdown sheets for one calculate_zakat_amount result (dict or ZakatResult)
+    """
+    summary = [(SUMMARY_LABELS[field], calculation[field]) for field in SUMMARY_FIELDS]
+    summary.append(("Exceeds Nisab", "Yes" if calculation["exceeds_nisab"] else "No"))
+    summary.append(("Calculation Date", calculation["calculation_date"]))
+
+    if isinstance(calculation, ZakatResult):
+        # Read straight from the breakdown arrays instead of rebuilding the nested dicts
+        names = np.asarray(calculation.accounts.names, dtype=object)
+        labels = np.asarray([CATEGORY_LABELS[category] for category in CATEGORIES], dtype=object)
+        breakdown = zip(labels[calculation.categories].tolist(), names[calculation.account_ids].tolist(),
+                        calculation.amounts.tolist())
+    else:
+        breakdown = ((CATEGORY_LABELS[category], account, amount)
+                     for category, entries in calculation["classified_accounts"].items()
+                     for account, amount in entries.items())
+
+    return [
+        Sheet("Summary", ["Item", "Value"], summary, widths=[30, 20]),
+        Sheet("Breakdown", BREAKDOWN_HEADERS, breakdown, amount_columns=[2], widths=[26, 50, 18])
+    ]
+
+
+def _portfolio_summary_rows(result_set, chunk_rows):
+    for start in range(0, len(result_set), chunk_rows):
+        stop = min(start + chunk_rows, len(result_set))
+        columns = [result_set.entity_ids[start:stop]]
+        columns += [result_set.column(field)[start:stop].tolist() for field in SUMMARY_FIELDS]
+        columns.append(["Yes" if flag else "No" for flag in result_set.column("exceeds_nisab")[start:stop].tolist()])
+        columns.append(result_set.column("calculation_date")[start:stop].astype(str).tolist())
+        yield from zip(*columns)
+
+
+def _portfolio_breakdown_rows(result_set, chunk_rows):
+    offsets, account_ids, categories, amounts = result_set.breakdown_columns()
+    entity_ids = np.asarray(result_set.entity_ids, dtype=object)
+    names = np.asarray(result_set.accounts.names, dtype=object)
+    labels = np.asarray([CATEGORY_LABELS[category] for category in CATEGORIES], dtype=object)
+
+    # Rows are materialised one chunk at a time, so memory stays bounded by chunk_rows
+    for start in range(0, len(amounts), chunk_rows):
+        stop = min(start + chunk_rows, len(amounts))
+        owners = np.searchsorted(offsets, np.arange(start, stop), side="right") - 1
+        yield from zip(entity_ids[owners].tolist(), labels[categories[start:stop]].tolist(),
+                       names[account_ids[start:stop]].tolist(), amounts[start:stop].tolist())
+
+
+def portfolio_sheets(result_set, chunk_rows=50000):
+    """
+    Summary (one row per entity) and breakdown (one row per entity account) sheets for a ZakatResultSet
+    """
+    return [
+        Sheet("Summary", PORTFOLIO_SUMMARY_HEADERS, _portfolio_summary_rows(result_set, chunk_rows),
+              amount_columns=[1, 2, 3, 4, 6], widths=[20] + [18] * (len(PORTFOLIO_SUMMARY_HEADERS) - 1)),
+        Sheet("Breakdown", PORTFOLIO_BREAKDOWN_HEADERS, _portfolio_breakdown_rows(result_set, chunk_rows),
+              amount_columns=[3], widths=[20, 26, 50, 18])
+    ]
+
+
+def write_xlsx(sheets, output):
+    """
+    Stream sheets into an XLSX workbook; output is a path or a binary file-like object.
+
+    The workbook is written in constant_memory mode, so each row is flushed as soon as it is
+    written and memory does not grow with the row count. Sheets longer than Excel's row
+    limit continue on "<name> (2)", "<name> (3)", ...
+    """
+    if xlsxwriter is None:
+        raise ImportError("xlsxwriter is required for Excel export")
+
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True, "bg_color": "#E6E6E6", "bottom": 1})
+    amount_format = workbook.add_format({"num_format": "#,##0.00"})
+
+    for sheet in sheets:
+        part = 1
+        worksheet = None
+        row_index = XLSX_MAX_ROWS
+        for row in sheet.rows:
+            if row_index >= XLSX_MAX_ROWS:
+                worksheet = _add_worksheet(workbook, sheet, part, header_format)
+                part += 1
+                row_index = 1
+            for column, value in enumerate(row):
+                if column in sheet.amount_columns and isinstance(value, (int, float)):
+                    worksheet.write_number(row_index, column, value, amount_format)
+                else:
+                    worksheet.write(row_index, column, value)
+            row_index += 1
+        if worksheet is None:
+            _add_worksheet(workbook, sheet, part, header_format)
+
+    workbook.close()
+    return output
+
+
+def _add_worksheet(workbook, sheet, part, header_format):
+    worksheet = workbook.add_worksheet(sheet.name if part == 1 else f"{sheet.name} ({part})")
+    for column, width in enumerate(sheet.widths):
+        worksheet.set_column(column, column, width)
+    worksheet.write_row(0, 0, sheet.headers, header_format)
+    worksheet.freeze_panes(1, 0)
+    return worksheet
+
+
+def write_csv(sheet, output, chunk_rows=10000, encoding="utf-8-sig"):
+    """
+    Write one sheet as CSV to a binary file-like object, encoding and flushing every chunk_rows rows.
+    The default utf-8-sig encoding keeps Arabic account names readable when opened in Excel.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(sheet.headers)
+    pending = 0
+    for row in sheet.rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            output.write(buffer.getvalue().encode(encoding))
+            encoding = "utf-8" if encoding == "utf-8-sig" else encoding  # BOM only once
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    output.write(buffer.getvalue().encode(encoding))
+    return output
+
+
+def xlsx_bytes(sheets):
+    """
+    XLSX workbook as bytes, for st.download_button
+    """
+    return write_xlsx(sheets, io.BytesIO()).getvalue()
+
+
+def csv_bytes(sheet, chunk_rows=10000):
+    """
+    CSV file as bytes, for st.download_button
+    """
+    return write_csv(sheet, io.BytesIO(), chunk_rows).getvalue()
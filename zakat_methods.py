@@ -0,0 +1,178 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from zakat_core import ZakatCalculator
+
+# Buckets every balance sheet account is aggregated into. The first four are the categories of
+# ZakatCalculator.classify_accounts; the net invested funds method additionally needs the equity
+# reserves that the net asset method ignores.
+BUCKETS = (
+    "zakatable_assets",
+    "non_zakatable_assets",
+    "deductible_liabilities",
+    "non_deductible_liabilities",
+    "equity_reserves",
+    "unclassified"
+)
+BUCKET_CODES = {name: code for code, name in enumerate(BUCKETS)}
+
+EQUITY_KEYWORDS = ["retained earnings", "reserve", "equity", "surplus", "accumulated loss"]
+
+
+class ZakatMethod:
+    """
+    A zakat base method expressed as a signed sum of bucket totals
+    """
+    def __init__(self, name, label, weights, description=""):
+        self.name = name
+        self.label = label
+        self.weights = weights
+        self.description = description
+
+    def coefficients(self):
+        return np.array([self.weights.get(bucket, 0) for bucket in BUCKETS], dtype=np.float64)
+
+
+METHODS = {
+    "net_assets": ZakatMethod(
+        "net_assets", "Net Assets",
+        {"zakatable_assets": 1, "deductible_liabilities": -1},
+        "Zakatable assets less liabilities due within the year"
+    ),
+    "net_invested_funds": ZakatMethod(
+        "net_invested_funds", "Net Invested Funds",
+        {"non_deductible_liabilities": 1, "equity_reserves": 1, "non_zakatable_assets": -1},
+        "Paid-up capital, reserves and long-term financing less fixed and non-zakatable assets"
+    )
+}
+
+
+class MultiMethodZakatEngine:
+    """
+    Computes the zakat base under every configured FAS 9 method from a single classification pass.
+
+    Each account name is classified once (through the calculator's own rules, so the net asset
+    figures match calculate_zakat_amount) and cached, balances are summed per bucket, and every
+    method is then a weighted sum of the same bucket totals. In batch mode the bucket totals of
+    all entities are built with one bincount and all methods evaluated as one matrix product.
+    """
+    def __init__(self, calculator=None, methods=None):
+        self.calculator = calculator or ZakatCalculator()
+        self.methods = list(methods or METHODS.values())
+        self._coefficients = np.vstack([method.coefficients() for method in self.methods])
+        self._bucket_cache = {}
+
+    def classify_account(self, account):
+        code = self._bucket_cache.get(account)
+        if code is None:
+            classified = self.calculator.classify_accounts({"balance_sheet": {account: 0}})
+            category = next((category for category, entries in classified.items() if entries), None)
+            if category is None:
+                account_lower = account.lower()
+                category = ("equity_reserves" if any(keyword in account_lower for keyword in EQUITY_KEYWORDS)
+                            else "unclassified")
+            code = self._bucket_cache[account] = BUCKET_CODES[category]
+        return code
+
+    def bucket_totals(self, financial_data):
+        totals = np.zeros(len(BUCKETS), dtype=np.float64)
+        for account, value in financial_data["balance_sheet"].items():
+            totals[self.classify_account(account)] += value
+        return totals
+
+    def _evaluate(self, totals):
+        """
+        Bases, nisab flags and zakat amounts for an (entities x buckets) matrix of totals
+        """
+        bases = totals @ self._coefficients.T
+        exceeds_nisab = bases >= self.calculator.nisab_value
+        amounts = np.where(exceeds_nisab, bases * self.calculator.rate, 0.0)
+        return bases, exceeds_nisab, amounts
+
+    def calculate(self, financial_data):
+        """
+        Zakat under every method for one entity:
+        {"methods": {name: {...}}, "bucket_totals": {...}, ...}
+        """
+        totals = self.bucket_totals(financial_data)
+        bases, exceeds_nisab, amounts = self._evaluate(totals[np.newaxis, :])
+        return {
+            "methods": {
+                method.name: {
+                    "label": method.label,
+                    "zakat_base": float(bases[0, i]),
+                    "exceeds_nisab": bool(exceeds_nisab[0, i]),
+                    "zakat_amount": float(amounts[0, i])
+                }
+                for i, method in enumerate(self.methods)
+            },
+            "bucket_totals": dict(zip(BUCKETS, totals.tolist())),
+            "nisab_value": self.calculator.nisab_value,
+            "zakat_rate": self.calculator.rate,
+            "calculation_date": datetime.now().strftime("%Y-%m-%d")
+        }
+
+    def calculate_batch(self, entities):
+        """
+        Zakat under every method for {entity_id: financial_data} (or (entity_id, financial_data) pairs)
+        """
+        items = entities.items() if isinstance(entities, dict) else entities
+        entity_ids, owners, codes, values = [], [], [], []
+        for index, (entity_id, financial_data) in enumerate(items):
+            entity_ids.append(entity_id)
+            balance_sheet = financial_data["balance_sheet"]
+            owners.extend([index] * len(balance_sheet))
+            codes.extend(map(self.classify_account, balance_sheet))
+            values.extend(balance_sheet.values())
+
+        n_buckets = len(BUCKETS)
+        flat_index = np.asarray(owners, dtype=np.int64) * n_buckets + np.asarray(codes, dtype=np.int64)
+        totals = np.bincount(flat_index, weights=np.asarray(values, dtype=np.float64),
+                             minlength=len(entity_ids) * n_buckets).reshape(len(entity_ids), n_buckets)
+        return MultiMethodResults(self, entity_ids, totals, *self._evaluate(totals))
+
+    def comparison_table(self, financial_data):
+        """
+        One row per method for a single entity, with the difference from the first method
+        """
+        return self.calculate_batch([(None, financial_data)]).comparison_table(0)
+
+
+class MultiMethodResults:
+    """
+    Batch output: per-entity bucket totals and (entities x methods) bases, flags and amounts
+    """
+    def __init__(self, engine, entity_ids, bucket_totals, bases, exceeds_nisab, amounts):
+        self.methods = engine.methods
+        self.entity_ids = entity_ids
+        self.bucket_totals = bucket_totals
+        self.bases = bases
+        self.exceeds_nisab = exceeds_nisab
+        self.amounts = amounts
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def comparison_table(self, index):
+        reference = self.bases[index, 0]
+        return pd.DataFrame({
+            "Method": [method.label for method in self.methods],
+            "Zakat Base": self.bases[index],
+            "Exceeds Nisab": np.where(self.exceeds_nisab[index], "Yes", "No"),
+            "Zakat Amount": self.amounts[index],
+            "Difference vs " + self.methods[0].label: self.bases[index] - reference
+        })
+
+    def to_frame(self):
+        """
+        Wide table with one row per entity and base/amount columns per method
+        """
+        columns = {"entity_id": self.entity_ids}
+        for i, method in enumerate(self.methods):
+            columns[f"{method.name}_base"] = self.bases[:, i]
+            columns[f"{method.name}_amount"] = self.amounts[:, i]
+        if len(self.methods) > 1:
+            columns["max_base_difference"] = self.bases.max(axis=1) - self.bases.min(axis=1)
+        return pd.DataFrame(columns)
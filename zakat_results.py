@@ -0,0 +1,343 @@
+import numpy as np
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet export is optional
+    pa = None
+    pq = None
+
+from rule_packs import CATEGORIES
+
+# Account categories produced by ZakatCalculator.classify_accounts, stored as small integer codes
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+
+SUMMARY_FIELDS = (
+    "total_zakatable_assets",
+    "total_deductible_liabilities",
+    "zakat_base",
+    "nisab_value",
+    "zakat_rate",
+    "zakat_amount"
+)
+
+EPOCH = date(1970, 1, 1)
+
+
+def _to_days(calculation_date):
+    """
+    Convert a 'YYYY-MM-DD' string (as stamped by ZakatCalculator) or date to days since epoch
+    """
+    if isinstance(calculation_date, str):
+        calculation_date = datetime.strptime(calculation_date, "%Y-%m-%d").date()
+    elif isinstance(calculation_date, datetime):
+        calculation_date = calculation_date.date()
+    return (calculation_date - EPOCH).days
+
+
+def _from_days(days):
+    return date.fromordinal(EPOCH.toordinal() + int(days)).strftime("%Y-%m-%d")
+
+
+class AccountTable:
+    """
+    Shared dictionary of account names; results refer to accounts by integer id
+    """
+    def __init__(self):
+        self.names = []
+        self._ids = {}
+
+    def intern(self, name):
+        account_id = self._ids.get(name)
+        if account_id is None:
+            account_id = len(self.names)
+            self._ids[name] = account_id
+            self.names.append(name)
+        return account_id
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, account_id):
+        return self.names[account_id]
+
+
+class ZakatResult:
+    """
+    Compact, slotted form of a calculate_zakat_amount result.
+
+    The per-account breakdown is held as three parallel arrays (account id, category code,
+    amount) referring to a shared AccountTable instead of nested dicts per entity.
+    Dict-style access is supported so the object can be handed to existing consumers
+    such as ZakatDocumentGenerator.
+    """
+    __slots__ = ("entity_id", "total_zakatable_assets", "total_deductible_liabilities", "zakat_base",
+                 "nisab_value", "zakat_rate", "zakat_amount", "exceeds_nisab", "calculation_date",
+                 "accounts", "account_ids", "categories", "amounts")
+
+    def __init__(self, entity_id, total_zakatable_assets, total_deductible_liabilities, zakat_base,
+                 nisab_value, zakat_rate, zakat_amount, exceeds_nisab, calculation_date,
+                 accounts, account_ids, categories, amounts):
+        self.entity_id = entity_id
+        self.total_zakatable_assets = total_zakatable_assets
+        self.total_deductible_liabilities = total_deductible_liabilities
+        self.zakat_base = zakat_base
+        self.nisab_value = nisab_value
+        self.zakat_rate = zakat_rate
+        self.zakat_amount = zakat_amount
+        self.exceeds_nisab = exceeds_nisab
+        self.calculation_date = calculation_date
+        self.accounts = accounts
+        self.account_ids = account_ids
+        self.categories = categories
+        self.amounts = amounts
+
+    @classmethod
+    def from_calculation(cls, calculation, accounts=None, entity_id=None):
+        """
+        Build from the dict returned by ZakatCalculator.calculate_zakat_amount
+        """
+        accounts = accounts if accounts is not None else AccountTable()
+        account_ids, categories, amounts = _flatten_breakdown(calculation["classified_accounts"], accounts)
+        return cls(
+            entity_id,
+            *(float(calculation[field]) for field in SUMMARY_FIELDS),
+            bool(calculation["exceeds_nisab"]),
+            calculation["calculation_date"],
+            accounts,
+            account_ids,
+            categories,
+            amounts
+        )
+
+    @property
+    def zakat_due(self):
+        # Always a bool, unlike the legacy dict where it is either 0 or True
+        return self.exceeds_nisab
+
+    def classified_accounts(self):
+        """
+        Rebuild the legacy {category: {account: amount}} breakdown on demand
+        """
+        classified = {category: {} for category in CATEGORIES}
+        for account_id, category, amount in zip(self.account_ids.tolist(), self.categories.tolist(), self.amounts.tolist()):
+            classified[CATEGORIES[category]][self.accounts[account_id]] = amount
+        return classified
+
+    def to_dict(self):
+        result = {field: getattr(self, field) for field in SUMMARY_FIELDS}
+        result.update({
+            "classified_accounts": self.classified_accounts(),
+            "zakat_due": self.zakat_due,
+            "exceeds_nisab": self.exceeds_nisab,
+            "calculation_date": self.calculation_date
+        })
+        return result
+
+    def __getitem__(self, key):
+        if key == "classified_accounts":
+            return self.classified_accounts()
+        if key == "zakat_due":
+            return self.zakat_due
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"ZakatResult(entity_id={self.entity_id!r}, zakat_base={self.zakat_base:,.2f}, zakat_amount={self.zakat_amount:,.2f})"
+
+
+def _flatten_breakdown(classified_accounts, accounts):
+    account_ids, categories, amounts = [], [], []
+    for category, entries in classified_accounts.items():
+        code = CATEGORY_CODES[category]
+        for account, amount in entries.items():
+            account_ids.append(accounts.intern(account))
+            categories.append(code)
+            amounts.append(amount)
+    return (
+        np.asarray(account_ids, dtype=np.int32),
+        np.asarray(categories, dtype=np.int8),
+        np.asarray(amounts, dtype=np.float64)
+    )
+
+
+class _Column:
+    """
+    Growable 1-D NumPy column with amortised doubling. view() is a zero-copy slice of the
+    current buffer: it does not see later appends, and once the column grows it keeps pointing
+    at the old buffer, so take a fresh view after adding rows
+    """
+    def __init__(self, dtype, capacity=1024):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.zeros(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def append(self, value):
+        self.extend([value])
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class ZakatResultSet:
+    """
+    Columnar store for many entity results.
+
+    Summary figures are kept one contiguous NumPy array per field, and all per-account
+    breakdowns share flat account/category/amount columns addressed through an offsets
+    column (CSR layout). Numeric columns are handed to Arrow without copying, and the
+    breakdown is exported as a list column over those same buffers.
+    """
+    def __init__(self, accounts=None):
+        self.accounts = accounts if accounts is not None else AccountTable()
+        self.entity_ids = []
+        self._summary = {field: _Column(np.float64) for field in SUMMARY_FIELDS}
+        self._exceeds_nisab = _Column(np.bool_)
+        self._calculation_date = _Column(np.int32)
+        self._offsets = _Column(np.int64)
+        self._offsets.append(0)
+        self._account_ids = _Column(np.int32, 8192)
+        self._categories = _Column(np.int8, 8192)
+        self._amounts = _Column(np.float64, 8192)
+
+    @classmethod
+    def from_portfolio(cls, calculator, entities):
+        """
+        Calculate {entity_id: financial_data} straight into a result set
+        """
+        result_set = cls()
+        for entity_id, financial_data in entities.items():
+            result_set.append(entity_id, calculator.calculate_zakat_amount(financial_data))
+        return result_set
+
+    def append(self, entity_id, calculation):
+        """
+        Add one calculate_zakat_amount result (dict or ZakatResult)
+        """
+        if isinstance(calculation, ZakatResult):
+            account_ids, categories, amounts = calculation.account_ids, calculation.categories, calculation.amounts
+            if calculation.accounts is not self.accounts:
+                account_ids = np.fromiter((self.accounts.intern(calculation.accounts[i]) for i in account_ids.tolist()),
+                                          dtype=np.int32, count=len(account_ids))
+            summary = {field: getattr(calculation, field) for field in SUMMARY_FIELDS}
+            exceeds_nisab = calculation.exceeds_nisab
+        else:
+            account_ids, categories, amounts = _flatten_breakdown(calculation["classified_accounts"], self.accounts)
+            summary = calculation
+            exceeds_nisab = bool(calculation["exceeds_nisab"])
+
+        self.entity_ids.append(entity_id)
+        for field in SUMMARY_FIELDS:
+            self._summary[field].append(summary[field])
+        self._exceeds_nisab.append(exceeds_nisab)
+        self._calculation_date.append(_to_days(calculation["calculation_date"]))
+        self._account_ids.extend(account_ids)
+        self._categories.extend(categories)
+        self._amounts.extend(amounts)
+        self._offsets.append(self._amounts.size)
+
+    def __len__(self):
+        return len(self.entity_ids)
+
+    def column(self, field):
+        """
+        Zero-copy view of one summary column
+        """
+        if field == "exceeds_nisab":
+            return self._exceeds_nisab.view()
+        if field == "calculation_date":
+            return self._calculation_date.view().astype("datetime64[D]")
+        return self._summary[field].view()
+
+    def __getitem__(self, index):
+        """
+        ZakatResult for one entity; its breakdown arrays are views into the shared columns
+        """
+        # The column buffers are over-allocated, so negative indexes must be resolved against len()
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result set index out of range")
+        start, stop = self._offsets.data[index], self._offsets.data[index + 1]
+        return ZakatResult(
+            self.entity_ids[index],
+            *(float(self._summary[field].data[index]) for field in SUMMARY_FIELDS),
+            bool(self._exceeds_nisab.data[index]),
+            _from_days(self._calculation_date.data[index]),
+            self.accounts,
+            self._account_ids.data[start:stop],
+            self._categories.data[start:stop],
+            self._amounts.data[start:stop]
+        )
+
+    def breakdown_columns(self):
+        """
+        Zero-copy views of the flat breakdown: (offsets, account_ids, categories, amounts).
+        Entity i owns rows offsets[i]:offsets[i + 1].
+        """
+        return self._offsets.view(), self._account_ids.view(), self._categories.view(), self._amounts.view()
+
+    def to_records(self):
+        """
+        Summary as a NumPy record array (one row per entity)
+        """
+        columns = [np.asarray(self.entity_ids, dtype=object)]
+        columns += [self._summary[field].view() for field in SUMMARY_FIELDS]
+        columns += [self._exceeds_nisab.view(), self.column("calculation_date")]
+        names = ["entity_id", *SUMMARY_FIELDS, "exceeds_nisab", "calculation_date"]
+        return np.rec.fromarrays(columns, names=names)
+
+    def totals_by_category(self):
+        """
+        Portfolio-wide total per account category, aggregated over the flat breakdown columns
+        """
+        totals = np.bincount(self._categories.view(), weights=self._amounts.view(), minlength=len(CATEGORIES))
+        return dict(zip(CATEGORIES, totals.tolist()))
+
+    def to_arrow(self):
+        """
+        Arrow table with one row per entity and the breakdown as a list<struct> column
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required for Arrow and Parquet export")
+
+        n = len(self)
+        entity_ids = [str(entity_id) for entity_id in self.entity_ids]
+        dates = pa.Array.from_buffers(pa.date32(), n, [None, pa.py_buffer(self._calculation_date.view())])
+
+        account_names = pa.array(self.accounts.names, type=pa.string())
+        breakdown = pa.StructArray.from_arrays(
+            [
+                pa.DictionaryArray.from_arrays(pa.array(self._account_ids.view()), account_names),
+                pa.DictionaryArray.from_arrays(pa.array(self._categories.view()), pa.array(CATEGORIES)),
+                pa.array(self._amounts.view())
+            ],
+            names=["account", "category", "amount"]
+        )
+
+        columns = {"entity_id": pa.array(entity_ids, type=pa.string())}
+        columns.update({field: pa.array(self._summary[field].view()) for field in SUMMARY_FIELDS})
+        columns["exceeds_nisab"] = pa.array(self._exceeds_nisab.view())
+        columns["calculation_date"] = dates
+        columns["breakdown"] = pa.LargeListArray.from_arrays(pa.array(self._offsets.view()), breakdown)
+        return pa.table(columns)
+
+    def to_parquet(self, path, compression="zstd"):
+        """
+        Write the result set to a single Parquet file for downstream BI tools
+        """
+        if pq is None:
+            raise ImportError("pyarrow is required for Arrow and Parquet export")
+        pq.write_table(self.to_arrow(), path, compression=compression)
+        return path